@@ -0,0 +1,81 @@
+"""
+Alembic environment: metadata là Base.metadata của app, URL lấy từ DATABASE_URL.
+
+Có thể truyền sẵn connection qua config.attributes["connection"] (chạy migration
+từ code, không mở engine mới), hoặc đặt sqlalchemy.url trong config (test).
+"""
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine
+
+from app.db.database import Base
+from app.model import abac, feature, rbac, token, user  # noqa: F401 (đăng ký bảng vào metadata)
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def _url() -> str:
+    url = config.get_main_option("sqlalchemy.url")
+    if url:
+        return url
+    from app.core.config import DB_URL
+    return DB_URL
+
+
+# Index tìm kiếm user của revision 0004, theo dialect nên không có trong metadata
+_SEARCH_INDEX_OBJECTS = {"users_fts", "ix_users_name_trgm", "ix_users_email_trgm", "ix_users_phone_number_trgm"}
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    # Bỏ qua đúng các object đó (và bảng shadow users_fts_* của FTS5) để
+    # autogenerate không sinh lệnh drop; object lạ khác vẫn bị báo
+    if reflected and compare_to is None:
+        return not (name in _SEARCH_INDEX_OBJECTS or name.startswith("users_fts_"))
+    return True
+
+
+def _configure(**kwargs) -> None:
+    context.configure(
+        target_metadata=target_metadata,
+        include_object=include_object,
+        compare_type=True,
+        # SQLite không ALTER được nhiều thứ: dùng batch mode (copy bảng)
+        render_as_batch=True,
+        **kwargs,
+    )
+
+
+def run_migrations_offline() -> None:
+    _configure(url=_url(), literal_binds=True, dialect_opts={"paramstyle": "named"})
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    engine = create_engine(_url())
+    try:
+        with engine.connect() as connection:
+            _configure(connection=connection)
+            with context.begin_transaction():
+                context.run_migrations()
+    finally:
+        engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
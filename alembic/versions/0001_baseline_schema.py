@@ -0,0 +1,286 @@
+"""baseline schema
+
+Đúng schema mà Base.metadata.create_all đã tạo trước khi có Alembic (chưa có
+role hierarchy, rbac_state, revoked_tokens, users.last_login_at, index keyset:
+các thứ đó ở 0002). DB cũ đã có bảng nào thì bỏ qua bảng đó; bảng và cột mới
+luôn do các revision sau thêm vào.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 01:57:40.327590
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # DB do create_all tạo trước khi có Alembic: bỏ qua từng bảng đã có
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    if 'attributes' not in existing:
+        op.create_table('attributes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('display_name', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('attribute_type', sa.String(length=50), nullable=False),
+        sa.Column('data_type', sa.String(length=50), nullable=False),
+        sa.Column('is_required', sa.Boolean(), nullable=True),
+        sa.Column('is_multivalued', sa.Boolean(), nullable=True),
+        sa.Column('allowed_values', sa.JSON(), nullable=True),
+        sa.Column('default_value', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+        )
+        with op.batch_alter_table('attributes', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_attributes_id'), ['id'], unique=False)
+
+    if 'features' not in existing:
+        op.create_table('features',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('code', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('service', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('code')
+        )
+        with op.batch_alter_table('features', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_features_id'), ['id'], unique=False)
+
+    if 'permissions' not in existing:
+        op.create_table('permissions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('display_name', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('resource', sa.String(length=100), nullable=False),
+        sa.Column('action', sa.String(length=50), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+        )
+        with op.batch_alter_table('permissions', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_permissions_id'), ['id'], unique=False)
+
+    if 'policies' not in existing:
+        op.create_table('policies',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('policy_type', sa.String(length=50), nullable=False),
+        sa.Column('priority', sa.Integer(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('subject_conditions', sa.JSON(), nullable=True),
+        sa.Column('resource_conditions', sa.JSON(), nullable=True),
+        sa.Column('action_conditions', sa.JSON(), nullable=True),
+        sa.Column('environment_conditions', sa.JSON(), nullable=True),
+        sa.Column('effect', sa.String(length=20), nullable=False),
+        sa.Column('obligations', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+        )
+        with op.batch_alter_table('policies', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_policies_id'), ['id'], unique=False)
+
+    if 'resources' not in existing:
+        op.create_table('resources',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('display_name', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('resource_type', sa.String(length=50), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+        )
+        with op.batch_alter_table('resources', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_resources_id'), ['id'], unique=False)
+
+    if 'roles' not in existing:
+        op.create_table('roles',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('display_name', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('is_system', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+        )
+        with op.batch_alter_table('roles', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_roles_id'), ['id'], unique=False)
+
+    if 'users' not in existing:
+        op.create_table('users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=False),
+        sa.Column('password_hash', sa.String(length=255), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=True),
+        sa.Column('dob', sa.Date(), nullable=True),
+        sa.Column('gender', sa.String(length=10), nullable=True),
+        sa.Column('phone_number', sa.String(length=15), nullable=True),
+        sa.Column('avatar_url', sa.Text(), nullable=True),
+        sa.Column('is_verified', sa.Boolean(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('department', sa.String(length=100), nullable=True),
+        sa.Column('position', sa.String(length=100), nullable=True),
+        sa.Column('location', sa.String(length=100), nullable=True),
+        sa.Column('clearance_level', sa.String(length=50), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email')
+        )
+        with op.batch_alter_table('users', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_users_id'), ['id'], unique=False)
+
+    if 'access_logs' not in existing:
+        op.create_table('access_logs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('resource_type', sa.String(length=100), nullable=False),
+        sa.Column('resource_id', sa.Integer(), nullable=True),
+        sa.Column('action', sa.String(length=100), nullable=False),
+        sa.Column('decision', sa.String(length=20), nullable=False),
+        sa.Column('policy_id', sa.Integer(), nullable=True),
+        sa.Column('context', sa.JSON(), nullable=True),
+        sa.Column('ip_address', sa.String(length=45), nullable=True),
+        sa.Column('user_agent', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['policy_id'], ['policies.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('access_logs', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_access_logs_id'), ['id'], unique=False)
+
+    if 'policy_assignments' not in existing:
+        op.create_table('policy_assignments',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('policy_id', sa.Integer(), nullable=False),
+        sa.Column('assignment_type', sa.String(length=50), nullable=False),
+        sa.Column('assignment_id', sa.Integer(), nullable=True),
+        sa.Column('assignment_name', sa.String(length=200), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['policy_id'], ['policies.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('policy_assignments', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_policy_assignments_id'), ['id'], unique=False)
+
+    if 'resource_attributes' not in existing:
+        op.create_table('resource_attributes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('resource_id', sa.Integer(), nullable=False),
+        sa.Column('resource_type', sa.String(length=100), nullable=False),
+        sa.Column('attribute_id', sa.Integer(), nullable=False),
+        sa.Column('value', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['attribute_id'], ['attributes.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('resource_attributes', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_resource_attributes_id'), ['id'], unique=False)
+
+    if 'role_permissions' not in existing:
+        op.create_table('role_permissions',
+        sa.Column('role_id', sa.Integer(), nullable=False),
+        sa.Column('permission_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['permission_id'], ['permissions.id'], ),
+        sa.ForeignKeyConstraint(['role_id'], ['roles.id'], ),
+        sa.PrimaryKeyConstraint('role_id', 'permission_id')
+        )
+
+    if 'user_attributes' not in existing:
+        op.create_table('user_attributes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('attribute_id', sa.Integer(), nullable=False),
+        sa.Column('value', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['attribute_id'], ['attributes.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('user_attributes', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_user_attributes_id'), ['id'], unique=False)
+
+    if 'user_roles' not in existing:
+        op.create_table('user_roles',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('role_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['role_id'], ['roles.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'role_id')
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('user_roles')
+    with op.batch_alter_table('user_attributes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_attributes_id'))
+
+    op.drop_table('user_attributes')
+    op.drop_table('role_permissions')
+    with op.batch_alter_table('resource_attributes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_resource_attributes_id'))
+
+    op.drop_table('resource_attributes')
+    with op.batch_alter_table('policy_assignments', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_policy_assignments_id'))
+
+    op.drop_table('policy_assignments')
+    with op.batch_alter_table('access_logs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_access_logs_id'))
+
+    op.drop_table('access_logs')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_id'))
+
+    op.drop_table('users')
+    with op.batch_alter_table('roles', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_roles_id'))
+
+    op.drop_table('roles')
+    with op.batch_alter_table('resources', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_resources_id'))
+
+    op.drop_table('resources')
+    with op.batch_alter_table('policies', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_policies_id'))
+
+    op.drop_table('policies')
+    with op.batch_alter_table('permissions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_permissions_id'))
+
+    op.drop_table('permissions')
+    with op.batch_alter_table('features', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_features_id'))
+
+    op.drop_table('features')
+    with op.batch_alter_table('attributes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_attributes_id'))
+
+    op.drop_table('attributes')
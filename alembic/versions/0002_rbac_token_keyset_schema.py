@@ -0,0 +1,107 @@
+"""role hierarchy, rbac_state, revoked_tokens, last_login_at, keyset indexes
+
+Bảng, cột và index được thêm sau baseline:
+- role_parents, role_closure (+ dòng depth 0 cho mọi role đã có)
+- rbac_state (RBAC revision), revoked_tokens
+- users.last_login_at
+- index keyset: users(created_at, id), policies(priority, id),
+  access_logs(created_at, id), access_logs(user_id, created_at, id)
+
+DB đã chạy create_all của các bản giữa chừng có thể đã có một phần: kiểm tra
+từng bảng / cột, index dùng if_not_exists.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 09:12:03.418202
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_role_closure_descendant', 'role_closure', ['descendant_id', 'ancestor_id']),
+    ('ix_revoked_tokens_expires_at', 'revoked_tokens', ['expires_at']),
+    ('ix_revoked_tokens_id', 'revoked_tokens', ['id']),
+    ('ix_users_created_at_id', 'users', ['created_at', 'id']),
+    ('ix_policies_priority_id', 'policies', ['priority', 'id']),
+    ('ix_access_logs_created_at_id', 'access_logs', ['created_at', 'id']),
+    ('ix_access_logs_user_id_created_at_id', 'access_logs', ['user_id', 'created_at', 'id']),
+]
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    existing = set(inspector.get_table_names())
+    if 'role_parents' not in existing:
+        op.create_table('role_parents',
+        sa.Column('role_id', sa.Integer(), nullable=False),
+        sa.Column('parent_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['parent_id'], ['roles.id'], ),
+        sa.ForeignKeyConstraint(['role_id'], ['roles.id'], ),
+        sa.PrimaryKeyConstraint('role_id', 'parent_id')
+        )
+
+    if 'role_closure' not in existing:
+        op.create_table('role_closure',
+        sa.Column('ancestor_id', sa.Integer(), nullable=False),
+        sa.Column('descendant_id', sa.Integer(), nullable=False),
+        sa.Column('depth', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['ancestor_id'], ['roles.id'], ),
+        sa.ForeignKeyConstraint(['descendant_id'], ['roles.id'], ),
+        sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id')
+        )
+
+    if 'rbac_state' not in existing:
+        op.create_table('rbac_state',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('revision', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'revoked_tokens' not in existing:
+        op.create_table('revoked_tokens',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('jti', sa.String(length=100), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('reason', sa.String(length=50), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('revoked_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('jti')
+        )
+
+    if 'last_login_at' not in {c['name'] for c in inspector.get_columns('users')}:
+        with op.batch_alter_table('users', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('last_login_at', sa.DateTime(), nullable=True))
+
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+    # Role có trước role hierarchy chưa có cha: closure chỉ cần dòng của chính nó
+    op.execute(
+        "INSERT INTO role_closure (ancestor_id, descendant_id, depth)"
+        " SELECT id, id, 0 FROM roles WHERE id NOT IN ("
+        " SELECT descendant_id FROM role_closure WHERE depth = 0)"
+    )
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('last_login_at')
+
+    op.drop_table('revoked_tokens')
+    op.drop_table('rbac_state')
+    op.drop_table('role_closure')
+    op.drop_table('role_parents')
@@ -0,0 +1,53 @@
+"""hot path indexes
+
+Composite index cho các truy vấn của authorize / RBAC / ABAC:
+- user_attributes(user_id, attribute_id), unique: set_user_attribute ghi đè nên
+  mỗi cặp chỉ có một dòng; dòng trùng cũ (do ghi đồng thời) bị xoá, giữ dòng mới nhất
+- resource_attributes(resource_type, resource_id, attribute_id)
+- policy_assignments(assignment_type, assignment_id, is_active)
+- permissions(resource, action)
+- policies(is_active, priority)
+access_logs(user_id, created_at) đã có sẵn: ix_access_logs_user_id_created_at_id.
+
+Index có thể đã được tạo bởi startup (create_all / index.create), nên dùng if_not_exists.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 01:58:08.208526
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_permissions_resource_action', 'permissions', ['resource', 'action'], False),
+    ('ix_policies_is_active_priority', 'policies', ['is_active', 'priority'], False),
+    ('ix_policy_assignments_assignment_type_assignment_id_is_active', 'policy_assignments',
+     ['assignment_type', 'assignment_id', 'is_active'], False),
+    ('ix_resource_attributes_resource_type_resource_id_attribute_id', 'resource_attributes',
+     ['resource_type', 'resource_id', 'attribute_id'], False),
+    ('uq_user_attributes_user_id_attribute_id', 'user_attributes', ['user_id', 'attribute_id'], True),
+]
+
+
+def upgrade() -> None:
+    op.execute(
+        "DELETE FROM user_attributes WHERE id NOT IN ("
+        " SELECT MAX(id) FROM user_attributes GROUP BY user_id, attribute_id)"
+    )
+    for name, table, columns, unique in INDEXES:
+        op.create_index(name, table, columns, unique=unique, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,105 @@
+"""user search index
+
+Index cho tìm kiếm user theo name / email / phone_number (app/services/user_search.py):
+- Postgres: extension pg_trgm + GIN index trigram trên từng cột, tạo
+  CONCURRENTLY (không khoá ghi bảng users) trong autocommit_block. Index
+  INVALID còn sót lại từ lần build bị ngắt được drop rồi build lại.
+- SQLite: bảng FTS5 `users_fts` tokenizer trigram (external content, đồng bộ
+  bằng trigger): MATCH một chuỗi là tìm chuỗi con, đúng như ILIKE '%term%'.
+  Bảng users_fts cũ (tokenizer prefix, do startup tạo trước đây) được thay.
+  SQLite không có FTS5 / trigram (< 3.34) thì bỏ qua, tìm kiếm quay về ILIKE.
+
+Các object này không có trong Base.metadata: alembic/env.py bỏ qua chúng
+theo tên khi autogenerate.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 10:41:27.905113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRGM_COLUMNS = ('name', 'email', 'phone_number')
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS users_fts_ai",
+    "DROP TRIGGER IF EXISTS users_fts_ad",
+    "DROP TRIGGER IF EXISTS users_fts_au",
+    "DROP TABLE IF EXISTS users_fts",
+]
+
+SQLITE_CREATE = [
+    """CREATE VIRTUAL TABLE users_fts USING fts5(
+        name, email, phone_number, content='users', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER users_fts_ai AFTER INSERT ON users BEGIN
+        INSERT INTO users_fts(rowid, name, email, phone_number)
+        VALUES (new.id, new.name, new.email, new.phone_number);
+    END""",
+    """CREATE TRIGGER users_fts_ad AFTER DELETE ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, name, email, phone_number)
+        VALUES ('delete', old.id, old.name, old.email, old.phone_number);
+    END""",
+    """CREATE TRIGGER users_fts_au AFTER UPDATE OF name, email, phone_number ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, name, email, phone_number)
+        VALUES ('delete', old.id, old.name, old.email, old.phone_number);
+        INSERT INTO users_fts(rowid, name, email, phone_number)
+        VALUES (new.id, new.name, new.email, new.phone_number);
+    END""",
+    "INSERT INTO users_fts(users_fts) VALUES ('rebuild')",
+]
+
+
+def _sqlite_has_trigram(bind) -> bool:
+    try:
+        bind.exec_driver_sql("CREATE VIRTUAL TABLE temp.users_fts_probe USING fts5(x, tokenize='trigram')")
+    except sa.exc.OperationalError:
+        return False
+    bind.exec_driver_sql("DROP TABLE temp.users_fts_probe")
+    return True
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            for column in TRGM_COLUMNS:
+                name = f"ix_users_{column}_trgm"
+                invalid = bind.execute(sa.text(
+                    "SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+                    "WHERE pg_class.relname = :name AND NOT pg_index.indisvalid"
+                ), {"name": name}).first()
+                if invalid:
+                    op.execute(f"DROP INDEX CONCURRENTLY {name}")
+                op.execute(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+                    f"ON users USING gin ({column} gin_trgm_ops)"
+                )
+    elif bind.dialect.name == 'sqlite':
+        for statement in SQLITE_DROP:
+            op.execute(statement)
+        if _sqlite_has_trigram(bind):
+            for statement in SQLITE_CREATE:
+                op.execute(statement)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for column in TRGM_COLUMNS:
+                op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS ix_users_{column}_trgm")
+    elif bind.dialect.name == 'sqlite':
+        for statement in SQLITE_DROP:
+            op.execute(statement)
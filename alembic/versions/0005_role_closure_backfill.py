@@ -0,0 +1,50 @@
+"""role closure backfill
+
+Bổ sung các dòng role_closure còn thiếu (trước đây do startup làm qua
+ensure_role_closure): dòng depth 0 cho mọi role, và mọi cặp (tổ tiên, hậu
+duệ) suy ra từ role_parents với depth ngắn nhất. Chỉ thêm dòng thiếu, dòng
+đã có giữ nguyên; chạy lại không đổi gì.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 11:52:08.314270
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "INSERT INTO role_closure (ancestor_id, descendant_id, depth)"
+        " SELECT id, id, 0 FROM roles WHERE id NOT IN ("
+        " SELECT descendant_id FROM role_closure WHERE ancestor_id = descendant_id)"
+    )
+    # Hierarchy không có cycle (service chặn); depth < số role chặn vòng lặp nếu dữ liệu hỏng
+    op.execute(
+        "WITH RECURSIVE paths (ancestor_id, descendant_id, depth) AS ("
+        " SELECT parent_id, role_id, 1 FROM role_parents"
+        " UNION"
+        " SELECT role_parents.parent_id, paths.descendant_id, paths.depth + 1"
+        " FROM role_parents JOIN paths ON role_parents.role_id = paths.ancestor_id"
+        " WHERE paths.depth < (SELECT count(*) FROM roles))"
+        " INSERT INTO role_closure (ancestor_id, descendant_id, depth)"
+        " SELECT ancestor_id, descendant_id, min(depth) FROM paths"
+        " WHERE NOT EXISTS (SELECT 1 FROM role_closure"
+        " WHERE role_closure.ancestor_id = paths.ancestor_id"
+        " AND role_closure.descendant_id = paths.descendant_id)"
+        " GROUP BY ancestor_id, descendant_id"
+    )
+
+
+def downgrade() -> None:
+    # Chỉ là dữ liệu suy ra từ roles / role_parents: không có gì để gỡ
+    pass
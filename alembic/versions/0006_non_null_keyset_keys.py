@@ -0,0 +1,42 @@
+"""non-null keyset keys
+
+Keyset pagination so sánh row value `(sort_key, id) > cursor`: dòng có sort
+key NULL không bao giờ thoả điều kiện nên bị bỏ qua ở các trang sau. Các
+sort key còn nullable được backfill rồi chuyển sang NOT NULL:
+- policies.priority: NULL -> 100 (default của model)
+- access_logs.created_at: NULL -> 1970-01-01 (không rõ thời điểm: xếp cũ nhất)
+users.created_at vốn đã NOT NULL.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 13:20:44.610392
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("UPDATE policies SET priority = 100 WHERE priority IS NULL")
+    op.execute("UPDATE access_logs SET created_at = '1970-01-01 00:00:00' WHERE created_at IS NULL")
+    # SQLite: batch tạo lại bảng (không ALTER COLUMN được); Postgres: SET NOT NULL
+    with op.batch_alter_table('policies') as batch_op:
+        batch_op.alter_column('priority', existing_type=sa.Integer(), nullable=False)
+    with op.batch_alter_table('access_logs') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('access_logs') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
+    with op.batch_alter_table('policies') as batch_op:
+        batch_op.alter_column('priority', existing_type=sa.Integer(), nullable=True)
@@ -9,8 +9,19 @@ if ENV != "production":
 # ==== Security ====
 SECRET_KEY = os.getenv("SECRET_KEY", "super-secret")  # nhớ đặt trên Railway
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+# RS256/ES256: ký bằng private key (xem app/core/keys.py), public key publish qua JWKS
+JWT_KEYS_DIR = os.getenv("JWT_KEYS_DIR")
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID")
+JWT_PRIVATE_KEY = os.getenv("JWT_PRIVATE_KEY")  # PEM inline (Railway), "\n" được đổi thành xuống dòng
+JWKS_CACHE_MAX_AGE_SECONDS = int(os.getenv("JWKS_CACHE_MAX_AGE_SECONDS", "86400"))
+# /metrics: chỉ trả lời khi có "Authorization: Bearer <METRICS_TOKEN>"; không đặt thì chỉ cho localhost
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+# Nhúng role/permission (bit-packed) + RBAC revision vào access token khi login
+JWT_EMBED_AUTHZ_CLAIMS = os.getenv("JWT_EMBED_AUTHZ_CLAIMS", "false").lower() in ("1", "true", "yes")
+# Permission id lớn hơn ngưỡng này thì không nhúng (bit-pack dài theo id lớn nhất), request đọc từ DB
+JWT_AUTHZ_MAX_PERMISSION_ID = int(os.getenv("JWT_AUTHZ_MAX_PERMISSION_ID", "2048"))
 
 # ==== Database URL ====
 DB_URL = os.getenv("DATABASE_URL")
@@ -26,6 +37,110 @@ if not DB_URL:
         # Trên Railway/production: bắt buộc phải có, để tránh trỏ nhầm localhost
         raise RuntimeError("DATABASE_URL is not set. Configure it in Railway Variables.")
 
+# URL cho engine async của request handler; mặc định suy ra từ DATABASE_URL
+# (postgresql -> postgresql+asyncpg, sqlite -> sqlite+aiosqlite)
+ASYNC_DB_URL = os.getenv("ASYNC_DATABASE_URL")
+
+# Lúc boot: DB chưa ở Alembic head thì tự `alembic upgrade head` (một worker, có lock);
+# tắt nếu migration chạy ở bước release riêng, khi đó boot lỗi nếu DB chưa được migrate
+DB_MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+# Read replica (tuỳ chọn), phân tách bằng dấu phẩy; request GET đọc từ đây (xem app/db/replicas.py)
+REPLICA_DB_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+REPLICA_HEALTH_CHECK_INTERVAL_SECONDS = float(os.getenv("REPLICA_HEALTH_CHECK_INTERVAL_SECONDS", "10"))
+REPLICA_HEALTH_CHECK_TIMEOUT_SECONDS = float(os.getenv("REPLICA_HEALTH_CHECK_TIMEOUT_SECONDS", "2"))
+# Sau khi client ghi, đọc từ primary trong N giây (đủ cho replication lag)
+REPLICA_STICKINESS_SECONDS = float(os.getenv("REPLICA_STICKINESS_SECONDS", "5"))
+REPLICA_STICKY_COOKIE = os.getenv("REPLICA_STICKY_COOKIE", "db_primary_until")
+
+# ==== Connection pool (mỗi worker) ====
+# Tổng connection tới DB = số worker x (size + overflow) của cả hai engine; giữ dưới max_connections
+# Engine async phục vụ request
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Engine sync chỉ còn dùng cho startup, background task, import
+DB_SYNC_POOL_SIZE = int(os.getenv("DB_SYNC_POOL_SIZE", "3"))
+DB_SYNC_MAX_OVERFLOW = int(os.getenv("DB_SYNC_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+# "pre_ping" | "recycle" | "invalidate" (xem app/db/pool.py)
+DB_POOL_LIVENESS = os.getenv("DB_POOL_LIVENESS", "pre_ping").lower()
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "300"))
+# Số connection mở sẵn cho engine async lúc startup (0 = tắt), tối đa DB_POOL_SIZE
+DB_POOL_WARMUP_CONNECTIONS = int(os.getenv("DB_POOL_WARMUP_CONNECTIONS", "0"))
+
+# ==== Password hashing ====
+# Scheme cho hash mới: "bcrypt" hoặc "argon2"; hash của scheme còn lại vẫn verify được
+# và được hash lại khi user login (xem calibrate_password_hash.py để chọn cost)
+PASSWORD_HASH_SCHEME = os.getenv("PASSWORD_HASH_SCHEME", "bcrypt").lower()
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST_KIB = int(os.getenv("ARGON2_MEMORY_COST_KIB", "65536"))
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+# Thời gian verify mục tiêu (ms) cho lệnh calibrate
+PASSWORD_HASH_TARGET_MS = float(os.getenv("PASSWORD_HASH_TARGET_MS", "250"))
+# Pool riêng cho bcrypt để login dồn dập không chiếm hết threadpool của API
+# "thread" hoặc "process" (tránh GIL, tốn RAM hơn)
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread").lower()
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+# Số job được chờ thêm khi mọi worker bận; vượt quá thì trả 503 ngay
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "32"))
+
+# ==== Bulk user import ====
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", "500"))
+# Process pool hash password khi import; 0 = số CPU
+BULK_IMPORT_HASH_WORKERS = int(os.getenv("BULK_IMPORT_HASH_WORKERS", "0"))
+# Số lỗi từng dòng tối đa trả về trong báo cáo (vẫn đếm đủ)
+BULK_IMPORT_MAX_ERRORS = int(os.getenv("BULK_IMPORT_MAX_ERRORS", "1000"))
+
+# ==== User export ====
+# GET /users/export: số dòng mỗi lần fetch từ server-side cursor (= cỡ batch IN khi lấy roles)
+USER_EXPORT_BATCH_SIZE = int(os.getenv("USER_EXPORT_BATCH_SIZE", "1000"))
+
+# ==== Login tracking ====
+# users.last_login_at được gom trong RAM và flush theo lô mỗi N giây
+LAST_LOGIN_FLUSH_INTERVAL_SECONDS = float(os.getenv("LAST_LOGIN_FLUSH_INTERVAL_SECONDS", "5"))
+
+# ==== Rate limiting ====
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+# "local" (RAM từng worker) hoặc "module:factory" trả về một RateLimitBackend dùng chung
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "local")
+RATE_LIMIT_SHARDS = int(os.getenv("RATE_LIMIT_SHARDS", "64"))
+RATE_LIMIT_SWEEP_INTERVAL_SECONDS = float(os.getenv("RATE_LIMIT_SWEEP_INTERVAL_SECONDS", "60"))
+# Chỉ bật khi chạy sau reverse proxy (Railway...) tự thêm X-Forwarded-For
+RATE_LIMIT_TRUST_X_FORWARDED_FOR = os.getenv("RATE_LIMIT_TRUST_X_FORWARDED_FOR", "false").lower() in ("1", "true", "yes")
+# Dạng "số request/số giây"
+LOGIN_RATE_LIMIT_PER_IP = os.getenv("LOGIN_RATE_LIMIT_PER_IP", "30/60")
+LOGIN_RATE_LIMIT_PER_EMAIL = os.getenv("LOGIN_RATE_LIMIT_PER_EMAIL", "10/300")
+AUTHORIZE_RATE_LIMIT_PER_CLIENT = os.getenv("AUTHORIZE_RATE_LIMIT_PER_CLIENT", "600/60")
+
+# ==== Caching ====
+# Bus phát sự kiện invalidate cache giữa các worker:
+# "postgres" (LISTEN/NOTIFY), "local" (trong process, dùng cho SQLite/test), "auto" chọn theo DB_URL
+CACHE_BUS_BACKEND = os.getenv("CACHE_BUS_BACKEND", "auto").lower()
+CACHE_BUS_CHANNEL = os.getenv("CACHE_BUS_CHANNEL", "iam_invalidation")
+PERMISSION_CACHE_TTL_SECONDS = float(os.getenv("PERMISSION_CACHE_TTL_SECONDS", "300"))
+PERMISSION_CACHE_MAX_USERS = int(os.getenv("PERMISSION_CACHE_MAX_USERS", "50000"))
+# RBAC revision trong RAM được đọc lại từ DB sau chừng này giây (phòng khi lỡ message của bus)
+RBAC_REVISION_TTL_SECONDS = float(os.getenv("RBAC_REVISION_TTL_SECONDS", "5"))
+# Cache ngắn cho kết quả require_permission (key gồm RBAC revision nên không bị stale khi RBAC đổi)
+PERMISSION_CHECK_CACHE_TTL_SECONDS = float(os.getenv("PERMISSION_CHECK_CACHE_TTL_SECONDS", "5"))
+# Cache payload của access token đã verify (theo đúng chuỗi token, không quá exp)
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "60"))
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "20000"))
+# Token bị thu hồi (logout, refresh token đã xoay vòng): Bloom filter + set trong RAM, bảng revoked_tokens
+TOKEN_REVOCATION_BLOOM_CAPACITY = int(os.getenv("TOKEN_REVOCATION_BLOOM_CAPACITY", "100000"))
+TOKEN_REVOCATION_BLOOM_ERROR_RATE = float(os.getenv("TOKEN_REVOCATION_BLOOM_ERROR_RATE", "0.001"))
+# Chu kỳ xoá các bản ghi thu hồi đã hết hạn
+TOKEN_REVOCATION_COMPACT_INTERVAL_SECONDS = float(os.getenv("TOKEN_REVOCATION_COMPACT_INTERVAL_SECONDS", "3600"))
+# Snapshot user (id, email, is_active, department...) dùng khi verify token, invalidate khi user đổi
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "300"))
+PRINCIPAL_CACHE_MAX_USERS = int(os.getenv("PRINCIPAL_CACHE_MAX_USERS", "50000"))
+# count=cached trên list endpoint: số dòng theo (bảng, bộ lọc), tự cộng/trừ khi insert/delete qua ORM
+COUNT_CACHE_TTL_SECONDS = float(os.getenv("COUNT_CACHE_TTL_SECONDS", "60"))
+COUNT_CACHE_MAX_KEYS = int(os.getenv("COUNT_CACHE_MAX_KEYS", "1000"))
+# Đường JSON nhanh cho list endpoint đọc nhiều: select cột + TypeAdapter dựng sẵn, ORJSONResponse (xem app.utils.fast_json)
+JSON_FAST_PATH = os.getenv("JSON_FAST_PATH", "false").lower() in ("1", "true", "yes")
+
 def mask_db_url(url: str) -> str:
     try:
         scheme, rest = url.split("://", 1)
@@ -34,6 +149,3 @@ def mask_db_url(url: str) -> str:
         return f"{scheme}://{user}:***@{host}"
     except Exception:
         return "***"
-
-# Log gọn để debug, KHÔNG lộ mật khẩu
-print("🔍 DATABASE_URL =", mask_db_url(DB_URL))
@@ -0,0 +1,191 @@
+"""
+Invalidation bus giữa các worker.
+
+Mỗi worker giữ cache riêng (permissions, principal...). Khi dữ liệu đổi,
+service gọi publish(db, message) trong transaction của thay đổi đó và mọi
+worker nhận message để xoá cache tương ứng:
+- LocalBus: chỉ trong process (SQLite, test, 1 worker)
+- PostgresBus: LISTEN/NOTIFY, độ trễ cỡ mili-giây giữa các worker
+
+NOTIFY chạy trên chính connection của session (không mở connection riêng,
+không chặn event loop khi session là AsyncSession) và là transactional:
+worker khác chỉ nhận khi commit, rollback thì message mất theo. NOTIFY lỗi
+thì lỗi ném ra và write fail cùng. Subscriber của worker hiện tại chạy ngay
+sau commit.
+"""
+import json
+import select
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import DB_URL, CACHE_BUS_BACKEND, CACHE_BUS_CHANNEL
+
+Message = Dict[str, Any]
+Subscriber = Callable[[Message], None]
+
+# Message gửi khi listener mất kết nối rồi nối lại: có thể đã lỡ message, xoá hết cache
+RESET = {"type": "reset"}
+
+_published = metrics.counter("bus.messages_published")
+_received = metrics.counter("bus.messages_received")
+_errors = metrics.counter("bus.errors")
+
+# session.info: message chờ transaction commit
+_PENDING = "bus_pending_messages"
+
+
+class LocalBus:
+    """In-process bus: publish() calls every subscriber synchronously."""
+
+    def __init__(self):
+        self._subscribers: List[Subscriber] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Subscriber) -> None:
+        with self._lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+
+    def notify(self, db: Session, message: Message) -> None:
+        """Send `message` to the other workers within db's transaction (none in-process)"""
+
+    def publish(self, message: Message) -> None:
+        """Run this worker's subscribers for a committed change"""
+        _published.inc()
+        self._dispatch(message)
+
+    def _dispatch(self, message: Message) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(message)
+            except Exception as e:
+                _errors.inc()
+                print(f"❌ Invalidation subscriber failed for {message.get('type')}: {e}")
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+class PostgresBus(LocalBus):
+    """Bus over Postgres LISTEN/NOTIFY.
+
+    notify() NOTIFYs the channel on the session's own connection; a
+    listener thread per worker dispatches messages coming from other workers
+    (its own are skipped via the origin id).
+    """
+
+    def __init__(self, db_url: str, channel: str):
+        super().__init__()
+        self.dsn = make_url(db_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.channel = channel
+        self.origin = uuid.uuid4().hex
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def notify(self, db: Session, message: Message) -> None:
+        payload = json.dumps({**message, "origin": self.origin})
+        try:
+            db.connection().execute(
+                text("SELECT pg_notify(:channel, :payload)"), {"channel": self.channel, "payload": payload}
+            )
+        except Exception:
+            _errors.inc()
+            raise
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, name="invalidation-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def _listen(self) -> None:
+        import psycopg2
+        import psycopg2.extensions
+
+        connected_before = False
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(self.dsn)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute(f'LISTEN "{self.channel}"')
+                if connected_before:
+                    self._dispatch(RESET)
+                connected_before = True
+
+                while not self._stop.is_set():
+                    # select() thức dậy ngay khi có NOTIFY; timeout chỉ để kiểm tra stop
+                    if select.select([conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        message = json.loads(notify.payload)
+                        if message.pop("origin", None) == self.origin:
+                            continue
+                        _received.inc()
+                        self._dispatch(message)
+            except Exception as e:
+                _errors.inc()
+                print(f"❌ Invalidation listener error, reconnecting: {e}")
+                time.sleep(1)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+
+_bus: Optional[LocalBus] = None
+
+
+def get_bus() -> LocalBus:
+    global _bus
+    if _bus is None:
+        backend = CACHE_BUS_BACKEND
+        if backend == "auto":
+            backend = "postgres" if DB_URL and DB_URL.startswith("postgres") else "local"
+        _bus = PostgresBus(DB_URL, CACHE_BUS_CHANNEL) if backend == "postgres" else LocalBus()
+    return _bus
+
+
+def publish(db: Session, message: Message) -> None:
+    """
+    Publish `message` as part of db's current transaction: other workers get
+    it when the transaction commits, this worker right after the commit, and
+    nobody if it rolls back. Raises if the NOTIFY fails.
+    """
+    get_bus().notify(db, message)
+    db.info.setdefault(_PENDING, []).append(message)
+
+
+def subscribe(callback: Subscriber) -> None:
+    get_bus().subscribe(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session: Session) -> None:
+    for message in session.info.pop(_PENDING, ()):
+        get_bus().publish(message)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session) -> None:
+    session.info.pop(_PENDING, None)
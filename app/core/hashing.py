@@ -0,0 +1,120 @@
+"""
+Executor riêng cho hash/verify password.
+
+bcrypt tốn hàng trăm ms CPU mỗi lần; chạy trong threadpool mặc định của
+Starlette thì một đợt login dồn dập sẽ chiếm hết thread và /health, các
+request đọc rẻ phải xếp hàng sau nó. Ở đây:
+- pool riêng ("thread" hoặc "process" để tránh GIL), số worker cấu hình được
+- hàng đợi có giới hạn: đầy thì từ chối ngay (PasswordHasherBusy -> HTTP 503)
+- metrics: số job đang chạy / đang chờ, số lần từ chối, thời gian chờ,
+  percentile thời gian hash/verify (chi phí CPU của login trên mỗi instance)
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+
+from app.core import metrics
+from app.core.config import PASSWORD_HASH_EXECUTOR, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_SIZE
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hash executor queue is full; mapped to HTTP 503."""
+
+
+def _hash(password: str) -> str:
+    from app.utils.security import hash_password
+    return hash_password(password)
+
+
+def _verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    from app.utils.security import verify_and_update_password
+    return verify_and_update_password(password, hashed)
+
+
+def _timed(fn: Callable, enqueued_at: float, *args) -> Any:
+    # Chạy trong worker (có thể là process khác): đo ở đây, ghi metrics ở process cha
+    started = time.monotonic()
+    result = fn(*args)
+    return started - enqueued_at, time.monotonic() - started, result
+
+
+class HashExecutor:
+    """Bounded executor: at most `workers` running and `queue_size` waiting jobs."""
+
+    def __init__(self, kind: str = "thread", workers: int = 2, queue_size: int = 64):
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._rejected = metrics.counter("password_hash.rejected")
+        self._wait = metrics.histogram("password_hash.queue_wait_seconds")
+        self._duration = metrics.histogram("password_hash.duration_seconds")
+        metrics.gauge("password_hash.in_flight", func=lambda: self._pending)
+        metrics.gauge("password_hash.queue_depth", func=lambda: max(0, self._pending - self.workers))
+        metrics.gauge("password_hash.capacity", func=lambda: self.workers + self.queue_size)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def run(self, fn: Callable, *args, label: str = "") -> Any:
+        """Run fn(*args) in the pool; raise PasswordHasherBusy at once if the queue is full."""
+        if not self._slots.acquire(blocking=False):
+            self._rejected.inc()
+            raise PasswordHasherBusy()
+        with self._lock:
+            self._pending += 1
+        try:
+            future = self._get_executor().submit(_timed, fn, time.monotonic(), *args)
+        except BaseException:
+            self._release()
+            raise
+        # Slot trả lại khi job thực sự xong: request bị huỷ (client ngắt) không
+        # giải phóng chỗ của một job vẫn đang chạy trong pool
+        future.add_done_callback(lambda _: self._release())
+        wait, duration, result = await asyncio.wrap_future(future)
+        self._wait.observe(wait)
+        self._duration.observe(duration, label=label)
+        return result
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_executor = HashExecutor(PASSWORD_HASH_EXECUTOR, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_SIZE)
+
+
+def get_executor() -> HashExecutor:
+    return _executor
+
+
+async def hash_password(password: str) -> str:
+    return await _executor.run(_hash, password, label="hash")
+
+
+async def verify_and_update_password(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """(ok, new_hash); new_hash khác None khi hash cần nâng scheme/cost."""
+    return await _executor.run(_verify_and_update, password, hashed, label="verify")
+
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return (await verify_and_update_password(password, hashed))[0]
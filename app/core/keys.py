@@ -0,0 +1,140 @@
+"""
+Khoá ký JWT.
+
+- HS256 (mặc định): ký bằng SECRET_KEY như trước, không có kid / JWKS
+- RS256 / ES256: mỗi khoá là file <kid>.pem (private key) trong JWT_KEYS_DIR,
+  hoặc một khoá inline qua JWT_PRIVATE_KEY. Token mang header "kid"; public key
+  của mọi khoá được publish ở /.well-known/jwks.json để service khác tự verify.
+
+Xoay khoá: thêm <kid mới>.pem, chờ hết max-age của JWKS (để consumer đã thấy
+khoá mới), rồi đổi JWT_ACTIVE_KID. Khoá cũ chỉ còn dùng để verify; đổi tên
+thành <kid>.pub.pem (chỉ public key) hoặc xoá khi token cũ đã hết hạn.
+
+Tạo khoá:  python -m app.core.keys generate --kid 2025-01 --dir keys/
+(python-jose không hỗ trợ EdDSA, nên chỉ có RS256 / ES256.)
+"""
+import argparse
+import glob
+import os
+from typing import Dict, NamedTuple, Optional
+
+from jose import jwk, jwt, JWTError
+from jose.backends.base import Key
+
+from app.core.config import SECRET_KEY, ALGORITHM, JWT_KEYS_DIR, JWT_ACTIVE_KID, JWT_PRIVATE_KEY
+
+ASYMMETRIC_ALGORITHMS = ("RS256", "ES256")
+
+
+class SigningKey(NamedTuple):
+    kid: str
+    private_key: Optional[Key]  # None cho khoá đã nghỉ (chỉ verify)
+    public_key: Key
+
+
+class KeyRing:
+    """Pre-parsed signing/verification keys for one JWT algorithm."""
+
+    def __init__(self, algorithm: str, keys: Dict[str, SigningKey], active_kid: Optional[str]):
+        self.algorithm = algorithm
+        self.keys = keys
+        self.active_kid = active_kid
+        self._jwks = {"keys": [self._public_jwk(k) for k in keys.values()]}
+
+    @property
+    def symmetric(self) -> bool:
+        return self.algorithm not in ASYMMETRIC_ALGORITHMS
+
+    def _public_jwk(self, key: SigningKey) -> dict:
+        return {**key.public_key.to_dict(), "kid": key.kid, "use": "sig", "alg": self.algorithm}
+
+    def sign(self, claims: dict) -> str:
+        if self.symmetric:
+            return jwt.encode(claims, SECRET_KEY, algorithm=self.algorithm)
+        active = self.keys[self.active_kid]
+        return jwt.encode(claims, active.private_key, algorithm=self.algorithm, headers={"kid": active.kid})
+
+    def verify(self, token: str) -> dict:
+        """Decode and verify a token; raises JWTError (also for unknown kid / wrong alg)."""
+        if self.symmetric:
+            return jwt.decode(token, SECRET_KEY, algorithms=[self.algorithm])
+        header = jwt.get_unverified_header(token)
+        key = self.keys.get(header.get("kid"))
+        if key is None:
+            raise JWTError("Unknown signing key")
+        return jwt.decode(token, key.public_key, algorithms=[self.algorithm])
+
+    def jwks(self) -> dict:
+        return self._jwks
+
+
+def _load_key(kid: str, pem: str, algorithm: str) -> SigningKey:
+    key = jwk.construct(pem, algorithm)
+    if key.is_public():
+        return SigningKey(kid, None, key)
+    return SigningKey(kid, key, key.public_key())
+
+
+def load_keyring(algorithm: str = ALGORITHM, keys_dir: Optional[str] = JWT_KEYS_DIR,
+                 active_kid: Optional[str] = JWT_ACTIVE_KID, inline_pem: Optional[str] = JWT_PRIVATE_KEY) -> KeyRing:
+    if algorithm not in ASYMMETRIC_ALGORITHMS:
+        return KeyRing(algorithm, {}, None)
+
+    keys: Dict[str, SigningKey] = {}
+    if keys_dir:
+        for path in sorted(glob.glob(os.path.join(keys_dir, "*.pem"))):
+            kid = os.path.basename(path)[:-len(".pem")]
+            if kid.endswith(".pub"):
+                kid = kid[:-len(".pub")]
+            with open(path) as f:
+                keys[kid] = _load_key(kid, f.read(), algorithm)
+    if inline_pem:
+        kid = active_kid or "default"
+        keys[kid] = _load_key(kid, inline_pem.replace("\\n", "\n"), algorithm)
+
+    signing_kids = sorted(kid for kid, key in keys.items() if key.private_key is not None)
+    if not signing_kids:
+        raise RuntimeError(f"JWT_ALGORITHM={algorithm} needs a private key (JWT_KEYS_DIR or JWT_PRIVATE_KEY)")
+    active_kid = active_kid or signing_kids[-1]
+    if active_kid not in signing_kids:
+        raise RuntimeError(f"JWT_ACTIVE_KID={active_kid} has no private key")
+    return KeyRing(algorithm, keys, active_kid)
+
+
+_keyring: Optional[KeyRing] = None
+
+
+def get_keyring() -> KeyRing:
+    global _keyring
+    if _keyring is None:
+        _keyring = load_keyring()
+    return _keyring
+
+
+def _generate(args) -> None:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+    if args.alg == "RS256":
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=args.bits)
+    else:
+        private_key = ec.generate_private_key(ec.SECP256R1())
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    os.makedirs(args.dir, exist_ok=True)
+    path = os.path.join(args.dir, f"{args.kid}.pem")
+    with open(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "wb") as f:
+        f.write(pem)
+    print(f"✅ Wrote {args.alg} key {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JWT signing keys")
+    sub = parser.add_subparsers(dest="command", required=True)
+    gen = sub.add_parser("generate", help="Generate a new private key <dir>/<kid>.pem")
+    gen.add_argument("--kid", required=True)
+    gen.add_argument("--dir", default=JWT_KEYS_DIR or "keys")
+    gen.add_argument("--alg", choices=ASYMMETRIC_ALGORITHMS, default="RS256")
+    gen.add_argument("--bits", type=int, default=2048)
+    _generate(parser.parse_args())
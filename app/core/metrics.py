@@ -0,0 +1,158 @@
+"""
+In-process metrics (counters, gauges, histograms) exposed as JSON on /metrics.
+Mỗi worker giữ số liệu riêng; scraper gom theo instance.
+"""
+import bisect
+import threading
+from typing import Callable, Dict, List, Optional
+
+_lock = threading.Lock()
+_metrics: Dict[str, "Metric"] = {}
+
+
+class Metric:
+    kind = "metric"
+
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, description: str = ""):
+        super().__init__(name, description)
+        self._values: Dict[str, float] = {}
+
+    def inc(self, amount: float = 1, label: str = "") -> None:
+        with self._lock:
+            self._values[label] = self._values.get(label, 0) + amount
+
+    def value(self, label: str = "") -> float:
+        return self._values.get(label, 0)
+
+    def snapshot(self):
+        with self._lock:
+            if set(self._values) <= {""}:
+                return self._values.get("", 0)
+            return dict(self._values)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str = "", func: Optional[Callable[[], float]] = None):
+        super().__init__(name, description)
+        self._value = 0.0
+        self._func = func
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value -= amount
+
+    def value(self) -> float:
+        return self._func() if self._func else self._value
+
+    def snapshot(self):
+        return self.value()
+
+
+class Histogram(Metric):
+    """Bucketed histogram with count/sum and approximate percentiles (seconds)."""
+    kind = "histogram"
+
+    DEFAULT_BUCKETS = (
+        0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+        0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+    )
+
+    def __init__(self, name: str, description: str = "", buckets: Optional[List[float]] = None):
+        super().__init__(name, description)
+        self._series: Dict[str, dict] = {}
+        self.buckets = tuple(sorted(buckets or self.DEFAULT_BUCKETS))
+
+    def _new_series(self) -> dict:
+        return {"count": 0, "sum": 0.0, "max": 0.0, "counts": [0] * (len(self.buckets) + 1)}
+
+    def observe(self, value: float, label: str = "") -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                series = self._series[label] = self._new_series()
+            series["count"] += 1
+            series["sum"] += value
+            series["counts"][index] += 1
+            if value > series["max"]:
+                series["max"] = value
+
+    def percentile(self, q: float, label: str = "") -> float:
+        """Upper bucket bound containing the q-th percentile (0 < q <= 100)."""
+        series = self._series.get(label)
+        if not series or not series["count"]:
+            return 0.0
+        rank = series["count"] * q / 100.0
+        seen = 0
+        for index, count in enumerate(series["counts"]):
+            seen += count
+            if seen >= rank:
+                return self.buckets[index] if index < len(self.buckets) else series["max"]
+        return series["max"]
+
+    def _summary(self, label: str) -> dict:
+        series = self._series[label]
+        return {
+            "count": series["count"],
+            "sum": round(series["sum"], 6),
+            "max": round(series["max"], 6),
+            "p50": self.percentile(50, label),
+            "p95": self.percentile(95, label),
+            "p99": self.percentile(99, label),
+        }
+
+    def snapshot(self):
+        with self._lock:
+            labels = list(self._series)
+        if labels == [""]:
+            return self._summary("")
+        return {label: self._summary(label) for label in labels}
+
+
+def _register(metric_cls, name: str, *args, **kwargs):
+    with _lock:
+        existing = _metrics.get(name)
+        if existing is not None:
+            return existing
+        metric = _metrics[name] = metric_cls(name, *args, **kwargs)
+        return metric
+
+
+def counter(name: str, description: str = "") -> Counter:
+    return _register(Counter, name, description)
+
+
+def gauge(name: str, description: str = "", func: Optional[Callable[[], float]] = None) -> Gauge:
+    return _register(Gauge, name, description, func)
+
+
+def histogram(name: str, description: str = "", buckets: Optional[List[float]] = None) -> Histogram:
+    return _register(Histogram, name, description, buckets)
+
+
+def snapshot() -> dict:
+    """All registered metrics keyed by name."""
+    with _lock:
+        metrics = list(_metrics.values())
+    return {m.name: m.snapshot() for m in sorted(metrics, key=lambda m: m.name)}
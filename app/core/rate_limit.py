@@ -0,0 +1,187 @@
+"""
+Rate limit kiểu token bucket.
+
+- LocalBackend: bucket trong RAM, chia shard (mỗi shard một lock) để các
+  thread không tranh nhau một lock chung; mỗi lần check là O(1). Bucket
+  nhàn rỗi đủ lâu để đầy lại được sweeper xoá (xoá bucket đầy = không đổi
+  hành vi, vì bucket mới cũng đầy).
+- Nhiều worker: mỗi worker có giới hạn riêng. Muốn giới hạn chung thì cài
+  một RateLimitBackend dùng chung (Redis, ...) và trỏ RATE_LIMIT_BACKEND
+  tới "module:factory".
+- RateLimitMiddleware: ASGI middleware áp các rule theo method + path, trả
+  429 + Retry-After khi vượt.
+"""
+import importlib
+import json
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from app.core import metrics
+from app.core.config import RATE_LIMIT_BACKEND, RATE_LIMIT_SHARDS, RATE_LIMIT_TRUST_X_FORWARDED_FOR
+
+_rejected = metrics.counter("rate_limit.rejected")
+
+
+class Rate(NamedTuple):
+    per_second: float
+    burst: float
+
+
+def parse_rate(spec: str) -> Rate:
+    """"20/60" -> 20 requests per 60 seconds, bursts of up to 20"""
+    count, seconds = spec.split("/", 1)
+    return Rate(float(count) / float(seconds), float(count))
+
+
+class RateLimitBackend:
+    """Interface: implement hit() (atomically) for a backend shared by all workers."""
+
+    def hit(self, key: str, rate: Rate, cost: float = 1) -> Tuple[bool, float]:
+        """Take `cost` tokens from the bucket `key`; returns (allowed, retry_after_seconds)."""
+        raise NotImplementedError
+
+    def sweep(self) -> int:
+        """Drop idle buckets; returns how many were removed."""
+        return 0
+
+
+class LocalBackend(RateLimitBackend):
+    """Per-process buckets in lock-striped shards."""
+
+    def __init__(self, shards: int = 64, clock: Callable[[], float] = time.monotonic):
+        self._shards: List[Tuple[threading.Lock, Dict[str, list]]] = [
+            (threading.Lock(), {}) for _ in range(max(1, shards))
+        ]
+        self._clock = clock
+        metrics.gauge("rate_limit.buckets", func=lambda: sum(len(b) for _, b in self._shards))
+
+    def hit(self, key: str, rate: Rate, cost: float = 1) -> Tuple[bool, float]:
+        lock, buckets = self._shards[hash(key) % len(self._shards)]
+        now = self._clock()
+        with lock:
+            # bucket = [tokens, last_refill, full_at]
+            bucket = buckets.get(key)
+            if bucket is None:
+                tokens = rate.burst
+            else:
+                tokens = min(rate.burst, bucket[0] + (now - bucket[1]) * rate.per_second)
+            if tokens >= cost:
+                tokens -= cost
+                allowed, retry_after = True, 0.0
+            else:
+                allowed, retry_after = False, (cost - tokens) / rate.per_second
+            buckets[key] = [tokens, now, now + (rate.burst - tokens) / rate.per_second]
+        return allowed, retry_after
+
+    def sweep(self) -> int:
+        now = self._clock()
+        removed = 0
+        for lock, buckets in self._shards:
+            with lock:
+                idle = [key for key, bucket in buckets.items() if bucket[2] <= now]
+                for key in idle:
+                    del buckets[key]
+            removed += len(idle)
+        return removed
+
+
+_backend: Optional[RateLimitBackend] = None
+
+
+def get_backend() -> RateLimitBackend:
+    global _backend
+    if _backend is None:
+        if RATE_LIMIT_BACKEND == "local":
+            _backend = LocalBackend(RATE_LIMIT_SHARDS)
+        else:
+            module, _, factory = RATE_LIMIT_BACKEND.partition(":")
+            _backend = getattr(importlib.import_module(module), factory)()
+    return _backend
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, rule: str, retry_after: float):
+        self.rule = rule
+        self.retry_after = retry_after
+
+
+def check(rule: str, key: str, rate: Rate) -> None:
+    """Raise RateLimitExceeded when `key` is over `rate` for this rule (for checks inside handlers)."""
+    allowed, retry_after = get_backend().hit(f"{rule}:{key}", rate)
+    if not allowed:
+        _rejected.inc(label=rule)
+        raise RateLimitExceeded(rule, retry_after)
+
+
+def too_many_requests(retry_after: float):
+    """(status, headers, body) của response 429"""
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"retry-after", str(max(1, int(retry_after + 0.999))).encode()),
+    ]
+    return 429, headers, json.dumps({"detail": "Too many requests"}).encode()
+
+
+# Key functions cho middleware: lấy định danh từ ASGI scope
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def client_ip(scope) -> str:
+    if RATE_LIMIT_TRUST_X_FORWARDED_FOR:
+        forwarded = _header(scope, b"x-forwarded-for")
+        if forwarded:
+            # Phần tử cuối do proxy của mình thêm vào; các phần tử trước client tự đặt được
+            return forwarded.rsplit(",", 1)[-1].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def client_id(scope) -> str:
+    """Caller đã xác thực (sub của bearer token), nếu không có thì theo IP"""
+    authorization = _header(scope, b"authorization")
+    if authorization and authorization[:7].lower() == "bearer ":
+        from fastapi import HTTPException
+        from app.core.security import decode_access_token
+        try:
+            return "user:" + str(decode_access_token(authorization[7:])["sub"])
+        except (HTTPException, KeyError):
+            pass
+    return "ip:" + client_ip(scope)
+
+
+class RateLimitRule(NamedTuple):
+    name: str
+    method: str
+    path: str
+    rate: Rate
+    key_func: Callable[[dict], str]
+
+
+class RateLimitMiddleware:
+    def __init__(self, app, rules: List[RateLimitRule]):
+        self.app = app
+        self.rules: Dict[Tuple[str, str], List[RateLimitRule]] = {}
+        for rule in rules:
+            self.rules.setdefault((rule.method, rule.path), []).append(rule)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            rules = self.rules.get((scope["method"], scope["path"]), ())
+            if rules and _header(scope, b"authorization"):
+                # client_id đọc danh sách thu hồi: lần nạp đầu chạy trong threadpool, không chặn loop
+                from app.services import token_revocation
+                await token_revocation.ensure_loaded_async()
+            for rule in rules:
+                try:
+                    check(rule.name, rule.key_func(scope), rule.rate)
+                except RateLimitExceeded as e:
+                    status, headers, body = too_many_requests(e.retry_after)
+                    await send({"type": "http.response.start", "status": status, "headers": headers})
+                    await send({"type": "http.response.body", "body": body})
+                    return
+        await self.app(scope, receive, send)
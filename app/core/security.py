@@ -1,44 +1,212 @@
-from typing import Optional
-from fastapi import HTTPException, Depends, status
-from jose import jwt, JWTError
+import time
+from typing import Awaitable, Callable, Optional
+from fastapi import HTTPException, Depends, Request, status
+from jose import JWTError
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordBearer
+from fastapi.security.utils import get_authorization_scheme_param
 
-from app.core.config import SECRET_KEY, ALGORITHM
-from app.db.database import get_db
-from app.model.user import User  # chỉnh import theo đúng model của bạn
+from app.core.config import (
+    PERMISSION_CHECK_CACHE_TTL_SECONDS, TOKEN_CACHE_TTL_SECONDS, TOKEN_CACHE_MAX_SIZE,
+)
+from app.core.keys import get_keyring
+from app.db.database import run_with_async_session
+from app.schemas.abac import AuthorizationRequest
+from app.services import authz as authz_service, principal_cache, token_revocation
+from app.services.authz import AuthzContext
+from app.services.principal_cache import UserPrincipal
+from app.utils.cache import TTLCache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-def verify_token(token: str, db: Session) -> User:
-    """
-    Giải mã JWT, lấy user_id từ 'sub', rồi truy DB trả về User.
-    Ném HTTP 401 nếu token không hợp lệ / user không tồn tại.
-    """
+# Payload của token đã verify chữ ký, key là chính chuỗi token
+_token_cache = TTLCache("access_tokens", maxsize=TOKEN_CACHE_MAX_SIZE, ttl=TOKEN_CACHE_TTL_SECONDS)
+# (AuthzContext, payload) đã resolve, key là chuỗi token (kiểm tra lại revision + thu hồi khi dùng)
+_token_authz_cache = TTLCache("token_authz", maxsize=TOKEN_CACHE_MAX_SIZE, ttl=TOKEN_CACHE_TTL_SECONDS)
+# Kết quả kiểm tra quyền RBAC (không gồm ABAC), key gồm user + RBAC revision
+_decision_cache = TTLCache("permission_checks", maxsize=100000, ttl=PERMISSION_CHECK_CACHE_TTL_SECONDS)
+
+def _raise_revoked():
+    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked")
+
+def decode_access_token(token: str) -> dict:
+    """Giải mã JWT, ném HTTP 401 nếu token không hợp lệ / hết hạn / đã bị thu hồi."""
+    payload = _token_cache.get(token)
+    if payload is not None:
+        if payload.get("exp", 0) > time.time():
+            if token_revocation.is_token_revoked(payload):
+                _raise_revoked()
+            return payload
+        _token_cache.pop(token)
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = get_keyring().verify(token)
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    # Refresh token không được dùng làm access token
+    if payload.get("typ") == "refresh":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token type")
+    if token_revocation.is_token_revoked(payload):
+        _raise_revoked()
 
+    if "exp" in payload:
+        _token_cache.set(token, payload, ttl=min(TOKEN_CACHE_TTL_SECONDS, payload["exp"] - time.time()))
+    return payload
+
+def get_token_subject(payload: dict) -> int:
+    """Lấy user_id từ 'sub' của payload."""
     # 'sub' có thể là str -> ép kiểu an toàn
     user_sub: Optional[str] = payload.get("sub")
     if not user_sub:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
 
     try:
-        user_id = int(user_sub)
+        return int(user_sub)
     except ValueError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token subject")
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+def _check_principal(principal: Optional[UserPrincipal]) -> UserPrincipal:
+    if principal is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    if not principal.is_active:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Inactive user")
+    return principal
+
+async def get_principal(user_id: int) -> UserPrincipal:
+    """Snapshot user từ cache; chỉ mở DB session (async) khi cache miss."""
+    principal = principal_cache.get_cached_principal(user_id)
+    if principal is None:
+        principal = await run_with_async_session(principal_cache.get_principal, user_id)
+    return _check_principal(principal)
+
+def verify_token(token: str, db: Session) -> UserPrincipal:
+    """
+    Giải mã JWT, lấy user_id từ 'sub', trả về snapshot của user (qua principal cache).
+    Ném HTTP 401 nếu token không hợp lệ / user không tồn tại, 403 nếu user bị khoá.
+    """
+    payload = decode_access_token(token)
+    user_id = get_token_subject(payload)
+    return _check_principal(principal_cache.get_principal(db, user_id))
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserPrincipal:
+    """Dependency dùng trong router: lấy user từ Bearer token (không query DB khi cache hit)."""
+    await token_revocation.ensure_loaded_async()
+    payload = decode_access_token(token)
+    return await get_principal(get_token_subject(payload))
+
+
+async def _get_request_authz(request: Request, token: str) -> AuthzContext:
+    """Resolve token -> AuthzContext một lần cho mỗi request (nhớ trong request.state)."""
+    authz = getattr(request.state, "authz", None)
+    if authz is not None:
+        return authz
+
+    await token_revocation.ensure_loaded_async()
+    # Context đã resolve cho đúng token này, còn dùng được khi RBAC revision chưa đổi
+    cached = _token_authz_cache.get(token)
+    if cached is not None and cached[0].revision == authz_service.current_revision():
+        authz, payload = cached
+        if token_revocation.is_token_revoked(payload):
+            _raise_revoked()
+    else:
+        payload = decode_access_token(token)
+        user_id = get_token_subject(payload)
+        authz = authz_service.resolve_authz_from_token(user_id, payload)
+        if authz is None:
+            # Chỉ mở DB session khi token không tự đủ (claims thiếu / stale)
+            authz = await run_with_async_session(authz_service.resolve_authz, user_id, payload)
+        if "exp" in payload:
+            _token_authz_cache.set(token, (authz, payload), ttl=min(TOKEN_CACHE_TTL_SECONDS, payload["exp"] - time.time()))
+    # Kiểm tra user còn tồn tại / active mỗi request (cache hit thì không I/O)
+    request.state.principal = await get_principal(authz.user_id)
+    request.state.authz = authz
+    return authz
+
+
+async def get_authz_context(request: Request, token: str = Depends(oauth2_scheme)) -> AuthzContext:
+    """
+    Dependency: roles/permissions của caller.
+    Dùng claims trong token nếu revision còn khớp, nếu không thì đọc DB (qua permission cache).
+
+    Async để đường nhanh (không I/O) chạy thẳng trên event loop thay vì
+    chiếm 1 thread của threadpool; chỉ khi cần DB mới mở AsyncSession.
+    """
+    return await _get_request_authz(request, token)
+
+
+def _evaluate_permission(db: Session, request: Request, authz: AuthzContext, resource: str, action: str, abac: bool) -> bool:
+    if not authz_service.context_has_permission(db, authz, resource, action):
+        return False
+    if not abac:
+        return True
+
+    from app.services import abac as abac_service
+    decision = abac_service.authorize_request(db, AuthorizationRequest(
+        user_id=authz.user_id,
+        resource_type=resource,
+        action=action,
+        context={"env.ip_address": request.client.host if request.client else None}
+    ))
+    return decision.decision == "allow"
+
+
+def _check_permission_cached(db: Session, request: Request, authz: AuthzContext, resource: str, action: str, abac: bool) -> bool:
+    # Quyết định ABAC phụ thuộc request (IP...) và policy / attribute, mà chúng
+    # không bump RBAC revision: không cache
+    if abac:
+        return _evaluate_permission(db, request, authz, resource, action, abac)
+    cache_key = (authz.user_id, authz.revision, resource, action)
+    return _decision_cache.get_or_load(
+        cache_key, lambda: _evaluate_permission(db, request, authz, resource, action, abac)
+    )
+
+
+def _bearer_token(request: Request) -> str:
+    scheme, token = get_authorization_scheme_param(request.headers.get("Authorization"))
+    if not token or scheme.lower() != "bearer":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return token
+
+
+def require_permission(resource: str, action: str, abac: bool = False) -> Callable[..., Awaitable[AuthzContext]]:
+    """
+    Dependency factory: 403 nếu caller không có permission resource.action
+    (và, nếu abac=True, ABAC policy không cho phép).
+
+        @router.post("/roles", dependencies=[Depends(require_permission("role", "write"))])
+
+    Token chỉ được resolve một lần mỗi request; kết quả kiểm tra được nhớ
+    trong request.state và (trừ khi abac=True) trong cache ngắn theo
+    (user, RBAC revision).
+    Đường nhanh không mở DB session và không dùng threadpool.
+    """
+    check_key = (resource, action, abac)
+
+    async def dependency(request: Request) -> AuthzContext:
+        # Đọc header trực tiếp thay vì Depends(oauth2_scheme): mỗi sub-dependency
+        # tốn vài chục µs trong solve_dependencies của FastAPI
+        authz = await _get_request_authz(request, _bearer_token(request))
+        checks = getattr(request.state, "permission_checks", None)
+        if checks is None:
+            checks = request.state.permission_checks = {}
+
+        allowed = checks.get(check_key)
+        if allowed is None:
+            if not abac:
+                allowed = _decision_cache.get((authz.user_id, authz.revision, resource, action))
+            if allowed is None:
+                allowed = await run_with_async_session(_check_permission_cached, request, authz, resource, action, abac)
+            checks[check_key] = allowed
 
-    return user
+        if not allowed:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Missing permission {resource}.{action}"
+            )
+        return authz
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-) -> User:
-    """Dependency dùng trong router: lấy user từ Bearer token."""
-    return verify_token(token, db)
+    return dependency
@@ -1,19 +1,9 @@
-from jose import jwt, JWTError
-from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
-from app.core.config import SECRET_KEY, ALGORITHM
 
-def verify_token(token: str, db: Session):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        # Convert user_id to user by querying database
-        from app.model.user import User
-        user = db.query(User).filter(User.id == int(user_id)).first()
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
-        return user
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+from app.core.security import verify_token as _verify_token
+from app.services.principal_cache import UserPrincipal
+
+
+def verify_token(token: str, db: Session) -> UserPrincipal:
+    # Giữ cho code cũ; chỉ còn một đường verify duy nhất trong app.core.security
+    return _verify_token(token, db)
@@ -1,15 +1,30 @@
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Optional, TypeVar
+from fastapi import Request, Response
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from app.core.config import DB_URL
+from app.core.config import (
+    DB_URL, ASYNC_DB_URL, REPLICA_DB_URLS, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_SYNC_POOL_SIZE, DB_SYNC_MAX_OVERFLOW,
+)
+from app.db import pool, replicas
+
+T = TypeVar("T")
 
 # Base model cho ORM
 Base = declarative_base()
 
-# Tạo engine (pool_pre_ping để check connection khỏe)
+# Tạo engine (pool + cách kiểm tra connection còn sống: xem app/db/pool.py)
 # Chỉ tạo engine khi DB_URL có sẵn
 engine = None
 SessionLocal = None
+# Engine async cho request handler (asyncpg / aiosqlite); engine sync vẫn dùng cho
+# startup, background task, CLI và import
+async_engine = None
+AsyncSessionLocal = None
+replica_set = None
 
 def get_engine():
     global engine
@@ -18,9 +33,10 @@ def get_engine():
             raise RuntimeError("DATABASE_URL is not set. Please configure it in Railway Variables.")
         engine = create_engine(
             DB_URL,
-            pool_pre_ping=True,  # giúp tránh lỗi connection drop
-            connect_args={"check_same_thread": False} if DB_URL.startswith("sqlite") else {}
+            connect_args={"check_same_thread": False} if DB_URL.startswith("sqlite") else {},
+            **pool.engine_kwargs(make_url(DB_URL), DB_SYNC_POOL_SIZE, DB_SYNC_MAX_OVERFLOW, is_async=False)
         )
+        pool.instrument(engine, "sync")
     return engine
 
 def get_session_local():
@@ -30,6 +46,62 @@ def get_session_local():
         SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     return SessionLocal
 
+def to_async_url(url: str):
+    """postgresql:// -> postgresql+asyncpg://, sqlite:// -> sqlite+aiosqlite://; trả về (url, connect_args)"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    connect_args = {}
+    if backend == "postgresql":
+        # asyncpg không hiểu ?sslmode=..., truyền qua connect_args ssl
+        sslmode = parsed.query.get("sslmode")
+        if sslmode:
+            parsed = parsed.difference_update_query(["sslmode"])
+            connect_args["ssl"] = sslmode
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    elif backend == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed, connect_args
+
+def get_async_engine():
+    global async_engine
+    if async_engine is None:
+        if not DB_URL:
+            raise RuntimeError("DATABASE_URL is not set. Please configure it in Railway Variables.")
+        if ASYNC_DB_URL:
+            url, connect_args = make_url(ASYNC_DB_URL), {}
+        else:
+            url, connect_args = to_async_url(DB_URL)
+        async_engine = _create_async_engine(url, connect_args, "async")
+    return async_engine
+
+def _create_async_engine(url, connect_args, label: str):
+    engine = create_async_engine(
+        url,
+        connect_args=connect_args,
+        **pool.engine_kwargs(url, DB_POOL_SIZE, DB_MAX_OVERFLOW, is_async=True)
+    )
+    pool.instrument(engine.sync_engine, label)
+    return engine
+
+def get_replica_set() -> Optional[replicas.ReplicaSet]:
+    """Async engines cho DATABASE_REPLICA_URLS; None khi không cấu hình replica"""
+    global replica_set
+    if replica_set is None and REPLICA_DB_URLS:
+        replica_set = replicas.ReplicaSet([
+            _create_async_engine(*to_async_url(url), label=f"replica{i}") for i, url in enumerate(REPLICA_DB_URLS)
+        ])
+    return replica_set
+
+def get_async_session_local():
+    global AsyncSessionLocal
+    if AsyncSessionLocal is None:
+        # expire_on_commit=False: response được serialize sau khi handler trả về,
+        # lúc đó không còn lazy load được (không có greenlet)
+        AsyncSessionLocal = async_sessionmaker(
+            get_async_engine(), sync_session_class=replicas.RoutingSession, autoflush=False, expire_on_commit=False
+        )
+    return AsyncSessionLocal
+
 # Dependency để inject DB session vào route
 def get_db():
     session_local = get_session_local()
@@ -37,4 +109,32 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db(request: Request, response: Response):
+    """
+    Dependency cho route async. Service vẫn là hàm sync nhận Session, gọi qua
+    `await db.run_sync(service.fn, ...)`: code ORM chạy trong greenlet trên event
+    loop, chỉ nhường loop khi chờ DB, không chiếm thread của threadpool.
+    Có replica thì request đọc được định tuyến sang replica (app/db/replicas.py).
+    Router dùng DBRoute (app/db/routing.py) đóng session ngay khi endpoint trả về.
+    """
+    async with get_async_session_local()() as db:
+        replicas.route_request(db, request, response, get_replica_set())
+        yield db
+
+@asynccontextmanager
+async def read_session(request: Request) -> AsyncIterator[AsyncSession]:
+    """
+    Session định tuyến như get_async_db cho code chạy sau khi endpoint trả về
+    (body của StreamingResponse). Chỉ dùng để đọc: response đã gửi header nên
+    không đặt được cookie read-your-writes.
+    """
+    async with get_async_session_local()() as db:
+        replicas.route_request(db, request, Response(), get_replica_set())
+        yield db
+
+async def run_with_async_session(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """fn(session, *args, **kwargs) trên một AsyncSession mới, cho code async ngoài route"""
+    async with get_async_session_local()() as db:
+        return await db.run_sync(fn, *args, **kwargs)
\ No newline at end of file
@@ -0,0 +1,108 @@
+"""
+Kiểm tra / áp dụng Alembic migration lúc boot, thay cho create_all ở mỗi worker.
+
+- Đường nhanh: một SELECT trên alembic_version, so với SCHEMA_HEAD. Không
+  reflect bảng nào, không import alembic (~150 ms).
+- DB chưa ở head và DB_MIGRATE_ON_STARTUP bật: lấy lock (Postgres
+  pg_advisory_lock, SQLite flock trên file cạnh DB) rồi `alembic upgrade head`.
+  Worker khác chờ lock, kiểm tra lại và thấy DB đã ở head.
+- DB_MIGRATE_ON_STARTUP tắt: DB chưa ở head thì boot lỗi; chạy
+  `alembic upgrade head` ở bước release.
+
+Thêm revision mới thì cập nhật SCHEMA_HEAD (test so với head của alembic/versions).
+"""
+import os
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+try:
+    import fcntl
+except ImportError:  # Windows: không có flock, bỏ qua lock cho SQLite
+    fcntl = None
+
+SCHEMA_HEAD = "0006"
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Hằng số bất kỳ, dùng chung cho mọi worker / instance trỏ tới cùng DB
+_ADVISORY_LOCK_KEY = 7_310_045_046
+
+
+def alembic_config(connection: Optional[Connection] = None):
+    from alembic.config import Config
+
+    config = Config(os.path.join(ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(ROOT, "alembic"))
+    # Giữ cấu hình logging của uvicorn
+    config.attributes["configure_logger"] = False
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+def current_revision(conn: Connection) -> Optional[str]:
+    """Revision recorded in alembic_version, or None when the table does not exist yet"""
+    try:
+        return conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    except DBAPIError:
+        # Postgres: transaction bị abort sau lỗi
+        conn.rollback()
+        return None
+
+
+@contextmanager
+def _migration_lock(engine: Engine) -> Iterator[Connection]:
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+            conn.commit()
+            try:
+                yield conn
+            finally:
+                conn.rollback()
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+                conn.commit()
+        elif engine.dialect.name == "sqlite" and engine.url.database not in (None, "", ":memory:") and fcntl:
+            with open(f"{engine.url.database}.migrate.lock", "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield conn
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        else:
+            yield conn
+
+
+def upgrade(engine: Engine) -> Optional[str]:
+    """`alembic upgrade head` under the migration lock; returns the revision found before upgrading"""
+    from alembic import command
+
+    with _migration_lock(engine) as conn:
+        before = current_revision(conn)
+        conn.commit()
+        if before != SCHEMA_HEAD:
+            command.upgrade(alembic_config(conn), "head")
+            conn.commit()
+        return before
+
+
+def ensure_schema(engine: Engine, migrate: bool) -> str:
+    """
+    Make sure the database is at SCHEMA_HEAD.
+
+    Returns "current" (nothing to do) or "migrated"; raises RuntimeError when
+    the schema is behind and `migrate` is False.
+    """
+    with engine.connect() as conn:
+        revision = current_revision(conn)
+    if revision == SCHEMA_HEAD:
+        return "current"
+    if not migrate:
+        raise RuntimeError(
+            f"Database schema is at {revision or 'no revision'}, expected {SCHEMA_HEAD}. Run `alembic upgrade head`."
+        )
+    # Worker khác có thể đã migrate trong lúc chờ lock
+    return "migrated" if upgrade(engine) != SCHEMA_HEAD else "current"
@@ -0,0 +1,131 @@
+"""
+Connection pool: cấu hình, metrics và warm-up cho engine sync và async.
+
+Liveness (DB_POOL_LIVENESS), cách phát hiện connection đã chết:
+- "pre_ping": SELECT 1 mỗi lần checkout. An toàn nhất, thêm một round-trip mỗi request.
+- "recycle": không ping; connection sống quá DB_POOL_RECYCLE_SECONDS bị đóng khi
+  checkout. Đặt thấp hơn idle timeout của DB / proxy (PgBouncer, LB...).
+- "invalidate": không ping, không recycle; lỗi disconnect làm vô hiệu connection đó
+  và mọi connection mở trước nó. Request gặp lỗi đầu tiên vẫn fail.
+
+Metrics theo engine ("sync" / "async"): histogram db.pool.checkout_seconds (thời
+gian chờ lấy connection, gồm cả ping), gauge db.pool.{in_use,idle,overflow,size}.<engine>,
+counter db.pool.connects, db.pool.invalidations, db.disconnects.
+Theo route (current_route, set bởi app/db/routing.py): histogram db.pool.hold_seconds,
+thời gian từ checkout tới checkin của connection.
+"""
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import URL, Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core import metrics
+from app.core.config import DB_POOL_LIVENESS, DB_POOL_RECYCLE_SECONDS, DB_POOL_TIMEOUT_SECONDS
+
+LIVENESS_STRATEGIES = ("pre_ping", "recycle", "invalidate")
+
+_checkout = metrics.histogram("db.pool.checkout_seconds")
+_connects = metrics.counter("db.pool.connects")
+_invalidations = metrics.counter("db.pool.invalidations")
+_disconnects = metrics.counter("db.disconnects")
+_hold = metrics.histogram("db.pool.hold_seconds")
+
+# Route đang xử lý, làm label cho hold time; ngoài request (startup, background task) là "background"
+current_route: ContextVar[str] = ContextVar("current_route", default="background")
+
+
+class _InstrumentedPool:
+    # Pool events chỉ báo sau khi đã có connection, nên đo thời gian chờ quanh connect()
+    label = ""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            _checkout.observe(time.perf_counter() - start, label=self.label)
+
+
+class InstrumentedQueuePool(_InstrumentedPool, QueuePool):
+    label = "sync"
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    label = "async"
+
+
+def engine_kwargs(url: URL, pool_size: int, max_overflow: int, is_async: bool) -> Dict[str, Any]:
+    """create_engine / create_async_engine kwargs for the configured pool and liveness strategy"""
+    if DB_POOL_LIVENESS not in LIVENESS_STRATEGIES:
+        raise RuntimeError(f"DB_POOL_LIVENESS must be one of {', '.join(LIVENESS_STRATEGIES)}")
+    kwargs: Dict[str, Any] = {"pool_pre_ping": DB_POOL_LIVENESS == "pre_ping"}
+    if DB_POOL_LIVENESS == "recycle":
+        kwargs["pool_recycle"] = DB_POOL_RECYCLE_SECONDS
+    # SQLite in-memory: mỗi connection là một DB riêng, giữ pool mặc định của dialect
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return kwargs
+    kwargs.update(
+        poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+    )
+    return kwargs
+
+
+def _pool_stat(engine: Engine, name: str) -> float:
+    # engine.dispose() thay pool mới, nên luôn đọc engine.pool lúc lấy số liệu.
+    # QueuePool.overflow() âm khi pool chưa đầy (bắt đầu từ -pool_size)
+    stat = getattr(engine.pool, name, None)
+    return max(0, stat()) if stat else 0
+
+
+def instrument(engine: Engine, label: str) -> None:
+    """Register pool gauges and connection event counters (pass async_engine.sync_engine for async)"""
+    for name, stat in (("in_use", "checkedout"), ("idle", "checkedin"), ("overflow", "overflow"), ("size", "size")):
+        metrics.gauge(f"db.pool.{name}.{label}", func=lambda stat=stat: _pool_stat(engine, stat))
+
+    # Pool events gắn trên Engine vẫn giữ sau dispose()
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        _connects.inc(label=label)
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        _invalidations.inc(label=label)
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(context):
+        if context.is_disconnect:
+            _disconnects.inc(label=label)
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        # Lưu route lúc checkout: checkin có thể chạy sau khi request đã xong
+        connection_record.info["checked_out"] = (time.perf_counter(), current_route.get())
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        checked_out = connection_record.info.pop("checked_out", None)
+        if checked_out:
+            _hold.observe(time.perf_counter() - checked_out[0], label=checked_out[1])
+
+
+def warm_up(engine: Engine, connections: int) -> int:
+    """Open `connections` connections at once and return them to the pool"""
+    opened = [engine.connect() for _ in range(connections)]
+    for connection in opened:
+        connection.close()
+    return len(opened)
+
+
+async def warm_up_async(engine, connections: int) -> int:
+    """warm_up for an AsyncEngine: the connections are opened concurrently"""
+    opened = await asyncio.gather(*(engine.connect() for _ in range(connections)))
+    for connection in opened:
+        await connection.close()
+    return len(opened)
@@ -0,0 +1,115 @@
+"""
+Kiểm tra query plan của các truy vấn nóng (authorize, RBAC, ABAC): lỗi khi
+planner phải quét cả bảng thay vì dùng index.
+
+- SQLite: EXPLAIN QUERY PLAN, dòng "SCAN <bảng>" là quét toàn bộ.
+- Postgres: EXPLAIN (FORMAT JSON) với enable_seqscan = off, nên bảng nhỏ (dev,
+  CI) không bị báo nhầm; node "Seq Scan" còn lại nghĩa là không có index dùng được.
+
+    python -m app.db.query_plans      # kiểm tra DB trong DATABASE_URL, exit 1 nếu có full scan
+"""
+import json
+import re
+import sys
+from typing import Dict, List
+
+from sqlalchemy import exists, select
+from sqlalchemy.engine import Connection, Engine
+
+from app.db.database import Base
+from app.model.abac import AccessLog, Policy, PolicyAssignment, ResourceAttribute, UserAttribute
+from app.model.rbac import Permission
+from app.services.rbac import select_user_permission_ids
+
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)")
+
+
+def hot_queries() -> Dict[str, object]:
+    """Statements shaped like the service queries on the request path (same filters and order)"""
+    return {
+        # abac.set_user_attribute / get_user_attribute_value
+        "user_attribute": select(UserAttribute).where(UserAttribute.user_id == 1, UserAttribute.attribute_id == 1),
+        # abac.get_user_attributes
+        "user_attributes": select(UserAttribute).where(UserAttribute.user_id == 1),
+        # abac.set_resource_attribute / get_resource_attributes
+        "resource_attributes": select(ResourceAttribute).where(
+            ResourceAttribute.resource_id == 1, ResourceAttribute.resource_type == "user"
+        ),
+        # abac.get_user_policies
+        "user_policy_assignments": select(PolicyAssignment).where(
+            PolicyAssignment.assignment_type == "user",
+            PolicyAssignment.assignment_id == 1,
+            PolicyAssignment.is_active == True,
+        ),
+        # abac.evaluate_authorization: policy global
+        "global_policies": select(Policy).where(
+            Policy.is_active == True,
+            Policy.id.in_(select(PolicyAssignment.policy_id).where(PolicyAssignment.assignment_type == "global")),
+        ).order_by(Policy.priority.asc()),
+        # abac.get_active_policies
+        "active_policies": select(Policy).where(Policy.is_active == True).order_by(Policy.priority.asc()),
+        # abac.get_access_logs_page(user_id=...)
+        "user_access_logs": select(AccessLog).where(AccessLog.user_id == 1)
+        .order_by(AccessLog.created_at.desc(), AccessLog.id.desc()).limit(100),
+        # rbac.check_user_permission
+        "check_user_permission": select(exists().where(
+            Permission.id.in_(select_user_permission_ids(1)),
+            Permission.resource == "user",
+            Permission.action == "read",
+        )),
+    }
+
+
+def _sql(conn: Connection, statement) -> str:
+    return str(statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+
+
+def _postgres_seq_scans(plan: dict) -> List[str]:
+    scans = [plan["Relation Name"]] if plan.get("Node Type") == "Seq Scan" else []
+    for child in plan.get("Plans", []):
+        scans.extend(_postgres_seq_scans(child))
+    return scans
+
+
+def full_scans(conn: Connection, statement) -> List[str]:
+    """Tables the planner reads in full for this statement"""
+    sql = _sql(conn, statement)
+    if conn.dialect.name == "sqlite":
+        tables = set(Base.metadata.tables)
+        details = [row[3] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+        return [m.group(1) for m in map(_SQLITE_SCAN.match, details) if m and m.group(1) in tables]
+    if conn.dialect.name == "postgresql":
+        # Connection tự mở transaction (autobegin); SET LOCAL hết hiệu lực khi transaction kết thúc
+        conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + sql).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return _postgres_seq_scans(plan[0]["Plan"])
+    raise ValueError(f"Query plan check not supported for {conn.dialect.name}")
+
+
+def check(engine: Engine) -> Dict[str, List[str]]:
+    """{query name: fully scanned tables} for every hot query that does not use an index"""
+    problems = {}
+    with engine.connect() as conn:
+        for name, statement in hot_queries().items():
+            scans = full_scans(conn, statement)
+            if scans:
+                problems[name] = scans
+    return problems
+
+
+def main() -> int:
+    from app.db.database import get_engine
+
+    problems = check(get_engine())
+    for name in hot_queries():
+        if name in problems:
+            print(f"❌ {name}: full scan on {', '.join(problems[name])}")
+        else:
+            print(f"✅ {name}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
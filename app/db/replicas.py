@@ -0,0 +1,118 @@
+"""
+Read replica (DATABASE_REPLICA_URLS): request đọc đi vào replica, ghi vào primary.
+
+- Request GET/HEAD/OPTIONS nhận một replica (round-robin, bỏ qua replica không
+  healthy); RoutingSession.get_bind gửi SELECT của session đó sang replica.
+  Flush / INSERT / UPDATE / DELETE, và mọi câu lệnh sau lần ghi đầu tiên trong
+  session, luôn đi vào primary. Request khác (POST, PUT...) chỉ dùng primary.
+- Read-your-writes: request ghi đặt cookie REPLICA_STICKY_COOKIE; trong
+  REPLICA_STICKINESS_SECONDS sau đó client đọc từ primary (replica có thể trễ).
+- Health check: SELECT 1 định kỳ; lỗi disconnect khi query cũng đánh dấu replica
+  hỏng ngay. Không còn replica nào healthy thì đọc từ primary.
+"""
+import asyncio
+import itertools
+import time
+from typing import List, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import REPLICA_HEALTH_CHECK_TIMEOUT_SECONDS, REPLICA_STICKINESS_SECONDS, REPLICA_STICKY_COOKIE
+
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+_sessions = metrics.counter("db.replicas.sessions")
+
+
+class RoutingSession(Session):
+    """Session gửi SELECT sang replica trong info["replica"] (nếu có) cho tới lần ghi đầu tiên"""
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        replica = self.info.get("replica")
+        if replica is not None and clause is not None:
+            if clause.is_dml:
+                self.info["wrote"] = True
+            elif clause.is_select and not self._flushing and not self.info.get("wrote"):
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_wrote(session: Session, flush_context) -> None:
+    session.info["wrote"] = True
+
+
+class ReplicaSet:
+    def __init__(self, engines: List[AsyncEngine]):
+        self.engines = engines
+        self.healthy = [True] * len(engines)
+        self._next = itertools.count()
+        metrics.gauge("db.replicas.healthy", func=lambda: sum(self.healthy))
+        for index, engine in enumerate(engines):
+            self._watch_disconnects(index, engine)
+
+    def _watch_disconnects(self, index: int, engine: AsyncEngine) -> None:
+        @event.listens_for(engine.sync_engine, "handle_error")
+        def _on_error(context):
+            if context.is_disconnect:
+                self.healthy[index] = False
+
+    def choose(self) -> Optional[AsyncEngine]:
+        """Next healthy replica (round-robin), or None when all are down"""
+        for _ in range(len(self.engines)):
+            index = next(self._next) % len(self.engines)
+            if self.healthy[index]:
+                return self.engines[index]
+        return None
+
+    async def _ping(self, engine: AsyncEngine) -> bool:
+        try:
+            async with engine.connect() as conn:
+                await asyncio.wait_for(conn.execute(text("SELECT 1")), REPLICA_HEALTH_CHECK_TIMEOUT_SECONDS)
+            return True
+        except Exception:
+            return False
+
+    async def check_health(self) -> List[bool]:
+        results = await asyncio.gather(*(self._ping(engine) for engine in self.engines))
+        for index, ok in enumerate(results):
+            if ok != self.healthy[index]:
+                print(f"{'✅' if ok else '❌'} Replica #{index} is {'back up' if ok else 'down'}.")
+            self.healthy[index] = ok
+        return list(results)
+
+    async def dispose(self) -> None:
+        for engine in self.engines:
+            await engine.dispose()
+
+
+def _is_sticky(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(REPLICA_STICKY_COOKIE, "0")) > time.time()
+    except ValueError:
+        return False
+
+
+def route_request(db: AsyncSession, request: Request, response: Response, replicas: Optional[ReplicaSet]) -> None:
+    """Pick the bind for this request's session (see module docstring)"""
+    if replicas is None:
+        return
+    if request.method not in READ_METHODS:
+        until = time.time() + REPLICA_STICKINESS_SECONDS
+        response.set_cookie(REPLICA_STICKY_COOKIE, f"{until:.0f}", max_age=int(REPLICA_STICKINESS_SECONDS),
+                            httponly=True, samesite="lax")
+        _sessions.inc(label="write")
+        return
+    if _is_sticky(request):
+        _sessions.inc(label="sticky")
+        return
+    engine = replicas.choose()
+    if engine is None:
+        _sessions.inc(label="no_replica")
+        return
+    db.sync_session.info["replica"] = engine.sync_engine
+    _sessions.inc(label="replica")
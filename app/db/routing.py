@@ -0,0 +1,79 @@
+"""
+Route class cho các APIRouter: trả connection về pool ngay khi endpoint trả về.
+
+- Session được inject vào endpoint (get_async_db / get_db) bị đóng ngay sau khi
+  endpoint trả kết quả, trước khi FastAPI validate + encode response và gửi đi.
+  Trước đây dependency có yield chỉ đóng session sau khi response đã gửi xong.
+  Object đã load vẫn đọc được (close không expire, expire_on_commit=False);
+  lazy load lúc serialize vốn đã không chạy được trên AsyncSession.
+- Session không mở connection khi được tạo: connection chỉ được checkout ở query
+  đầu tiên, nên request được cache trả lời không chạm tới pool.
+- Gắn tên route (vd. "GET /users/{user_id}") vào pool.current_route cho
+  histogram db.pool.hold_seconds.
+
+Endpoint trả StreamingResponse đọc DB trong lúc stream phải tự mở session
+trong generator, không dùng session được inject.
+"""
+import asyncio
+import functools
+from typing import Callable
+
+from fastapi.routing import APIRoute
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db import pool
+
+
+async def _close_async(values: dict) -> None:
+    for value in values.values():
+        if isinstance(value, AsyncSession):
+            await value.close()
+        elif isinstance(value, Session):
+            value.close()
+
+
+def _close_sync(values: dict) -> None:
+    for value in values.values():
+        if isinstance(value, Session):
+            value.close()
+
+
+def release_sessions_after(call: Callable) -> Callable:
+    """Wrap an endpoint so the sessions it received are closed as soon as it returns"""
+    if getattr(call, "releases_sessions", False):
+        return call
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def endpoint(**values):
+            try:
+                return await call(**values)
+            finally:
+                await _close_async(values)
+    else:
+        # Endpoint sync chạy trong threadpool, đóng session luôn trong thread đó
+        @functools.wraps(call)
+        def endpoint(**values):
+            try:
+                return call(**values)
+            finally:
+                _close_sync(values)
+    endpoint.releases_sessions = True
+    return endpoint
+
+
+class DBRoute(APIRoute):
+    def get_route_handler(self) -> Callable:
+        # dependant đã phân tích chữ ký của endpoint gốc; chỉ thay hàm được gọi
+        self.dependant.call = release_sessions_after(self.dependant.call)
+        handler = super().get_route_handler()
+        label = f"{','.join(sorted(self.methods))} {self.path_format}"
+
+        async def route_handler(request):
+            token = pool.current_route.set(label)
+            try:
+                return await handler(request)
+            finally:
+                pool.current_route.reset(token)
+
+        return route_handler
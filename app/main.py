@@ -1,15 +1,32 @@
+# Đo thời gian import app (fastapi, pydantic schema, router...) cho báo cáo startup
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+import hmac
 import os
-from fastapi import FastAPI
+from contextlib import contextmanager
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import text
+from fastapi.security.utils import get_authorization_scheme_param
 from sqlalchemy.exc import OperationalError
 
+from app.db import database, migrations, pool
 from app.db.database import get_engine      # engine phải được tạo từ ENV trong app.db.database
-from app.db import Base                     # import để SQLAlchemy biết model
-from app.model import user, feature as feature_model, rbac as rbac_model, abac as abac_model
 from app.routers import auth, feature, rbac, abac
 from app.routers import user as user_router
-from app.core.config import mask_db_url
+from app.services import token_revocation, login_tracker, user_import
+from app.core.config import (
+    TOKEN_REVOCATION_COMPACT_INTERVAL_SECONDS, JWKS_CACHE_MAX_AGE_SECONDS, DB_MIGRATE_ON_STARTUP,
+    DB_POOL_SIZE, DB_POOL_WARMUP_CONNECTIONS, REPLICA_HEALTH_CHECK_INTERVAL_SECONDS,
+    RATE_LIMIT_ENABLED, RATE_LIMIT_SWEEP_INTERVAL_SECONDS, LAST_LOGIN_FLUSH_INTERVAL_SECONDS, LOGIN_RATE_LIMIT_PER_IP, AUTHORIZE_RATE_LIMIT_PER_CLIENT,
+    JSON_FAST_PATH, METRICS_TOKEN,
+)
+from app.core.keys import get_keyring
+from fastapi.concurrency import run_in_threadpool
+from app.core import events, hashing, metrics, rate_limit
+from app.utils import fast_json
 
 
 def _mask_db_url(url: str) -> str:
@@ -23,11 +40,21 @@ def _mask_db_url(url: str) -> str:
         return "***"
 
 
+@contextmanager
+def _timed(timings: dict, phase: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = time.perf_counter() - started
+
+
 # ==== FastAPI app ====
 app = FastAPI(
     title="IAM System API",
     description="Identity and Access Management System with RBAC and ABAC",
     version="1.0.0",
+    default_response_class=fast_json.default_response_class() if JSON_FAST_PATH else JSONResponse,
 )
 
 # ==== CORS ====
@@ -42,18 +69,35 @@ if os.getenv("RAILWAY_ENVIRONMENT"):
     if fe_url and fe_url not in ALLOW_ORIGINS:
         ALLOW_ORIGINS.append(fe_url)
 
+# ==== Rate limiting (thêm trước CORS để response 429 vẫn có CORS header) ====
+if RATE_LIMIT_ENABLED:
+    app.add_middleware(rate_limit.RateLimitMiddleware, rules=[
+        rate_limit.RateLimitRule("login-ip", "POST", "/auth/login",
+                                 rate_limit.parse_rate(LOGIN_RATE_LIMIT_PER_IP), rate_limit.client_ip),
+        rate_limit.RateLimitRule("authorize-client", "POST", "/abac/authorize",
+                                 rate_limit.parse_rate(AUTHORIZE_RATE_LIMIT_PER_CLIENT), rate_limit.client_id),
+    ])
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=ALLOW_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Tổng số dòng của list endpoint (?count=...)
+    expose_headers=["X-Total-Count", "X-Total-Count-Mode"],
 )
 
 
-# ==== Startup: kiểm tra DB + tạo bảng (nếu chưa dùng Alembic) ====
+# ==== Startup: kiểm tra schema (Alembic) + nạp dữ liệu cho cache ====
 @app.on_event("startup")
 async def startup_event():
+    timings = {"import": _IMPORT_SECONDS}
+
+    # Lỗi cấu hình khoá JWT phải làm crash lúc boot, không phải ở request login đầu tiên
+    with _timed(timings, "keys"):
+        get_keyring()
+
     db_url = os.getenv("DATABASE_URL")
     if not db_url:
         # Crash sớm để biết chắc đang thiếu biến môi trường
@@ -64,14 +108,20 @@ async def startup_event():
     try:
         # Lazy initialization của engine
         engine = get_engine()
-        
-        # Test kết nối trước
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-
-        # Nếu chưa dùng Alembic, giữ create_all; nếu có Alembic thì bỏ dòng dưới
-        Base.metadata.create_all(bind=engine)
-        print("✅ Database ready, tables ensured.")
+
+        # Một SELECT trên alembic_version (cũng là kiểm tra kết nối); chỉ migrate khi DB chưa ở head
+        with _timed(timings, "schema"):
+            schema = migrations.ensure_schema(engine, migrate=DB_MIGRATE_ON_STARTUP)
+        if schema == "migrated":
+            print(f"✅ Database migrated to {migrations.SCHEMA_HEAD}.")
+
+        print("✅ Database ready.")
+
+        # Mở sẵn connection để các request đầu không phải chờ connect (TLS + auth)
+        if DB_POOL_WARMUP_CONNECTIONS > 0:
+            with _timed(timings, "pool_warmup"):
+                opened = await pool.warm_up_async(database.get_async_engine(), min(DB_POOL_WARMUP_CONNECTIONS, DB_POOL_SIZE))
+            print(f"🔥 Warmed up {opened} database connections.")
     except OperationalError as e:
         # Trường hợp hay gặp: vẫn trỏ localhost khi chạy trên Railway
         print("❌ Cannot connect to database. Check DATABASE_URL. Detail:", e)
@@ -80,6 +130,109 @@ async def startup_event():
         print("❌ Failed to initialize database:", e)
         raise
 
+    # Lắng nghe invalidation từ các worker khác (LISTEN/NOTIFY trên Postgres)
+    events.get_bus().start()
+    app.state.background_tasks = [
+        asyncio.create_task(_load_revoked_tokens()),
+        asyncio.create_task(_compact_revoked_tokens()),
+        asyncio.create_task(_sweep_rate_limit_buckets()),
+        asyncio.create_task(_flush_last_logins()),
+    ]
+    replica_set = database.get_replica_set()
+    if replica_set is not None:
+        with _timed(timings, "replicas"):
+            healthy = await replica_set.check_health()
+        print(f"✅ Read replicas: {sum(healthy)}/{len(healthy)} healthy.")
+        app.state.background_tasks.append(asyncio.create_task(_check_replicas(replica_set)))
+
+    app.state.startup_timings = timings
+    for phase, seconds in timings.items():
+        metrics.gauge(f"startup.{phase}_seconds").set(seconds)
+    print("🚀 Startup: " + ", ".join(f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in timings.items()))
+
+
+async def _load_revoked_tokens():
+    """Nạp danh sách token bị thu hồi sau khi boot (request đến trước thì tự nạp, xem token_revocation)"""
+    try:
+        await token_revocation.ensure_loaded_async()
+    except Exception as e:
+        print("❌ Token revocation load failed:", e)
+
+
+async def _compact_revoked_tokens():
+    """Định kỳ xoá các bản ghi revoked_tokens đã hết hạn"""
+    while True:
+        await asyncio.sleep(TOKEN_REVOCATION_COMPACT_INTERVAL_SECONDS)
+        try:
+            deleted = await run_in_threadpool(token_revocation.compact_with_session)
+            if deleted:
+                print(f"🧹 Compacted {deleted} expired token revocations.")
+        except Exception as e:
+            print("❌ Token revocation compaction failed:", e)
+
+
+async def _sweep_rate_limit_buckets():
+    """Định kỳ xoá các bucket rate limit đã nhàn rỗi (đầy lại)"""
+    while True:
+        await asyncio.sleep(RATE_LIMIT_SWEEP_INTERVAL_SECONDS)
+        try:
+            rate_limit.get_backend().sweep()
+        except Exception as e:
+            print("❌ Rate limit sweep failed:", e)
+
+
+async def _flush_last_logins():
+    """Ghi users.last_login_at đang đệm xuống DB theo lô"""
+    while True:
+        await asyncio.sleep(LAST_LOGIN_FLUSH_INTERVAL_SECONDS)
+        try:
+            await run_in_threadpool(login_tracker.flush_with_session)
+        except Exception as e:
+            print("❌ Last-login flush failed:", e)
+
+
+async def _check_replicas(replica_set):
+    """Định kỳ ping replica; replica hỏng bị bỏ qua khi chọn, hồi phục thì dùng lại"""
+    while True:
+        await asyncio.sleep(REPLICA_HEALTH_CHECK_INTERVAL_SECONDS)
+        try:
+            await replica_set.check_health()
+        except Exception as e:
+            print("❌ Replica health check failed:", e)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for task in getattr(app.state, "background_tasks", []):
+        task.cancel()
+    try:
+        await run_in_threadpool(login_tracker.flush_with_session)
+    except Exception as e:
+        print("❌ Last-login flush failed:", e)
+    events.get_bus().stop()
+    hashing.get_executor().shutdown()
+    user_import.shutdown_hash_pool()
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
+    if database.replica_set is not None:
+        await database.replica_set.dispose()
+
+
+@app.exception_handler(rate_limit.RateLimitExceeded)
+async def rate_limit_exceeded_handler(request: Request, exc: rate_limit.RateLimitExceeded):
+    status, headers, body = rate_limit.too_many_requests(exc.retry_after)
+    return Response(content=body, status_code=status, headers={k.decode(): v.decode() for k, v in headers})
+
+
+# Hash executor đầy: từ chối nhanh thay vì để request treo trong hàng đợi
+@app.exception_handler(hashing.PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: hashing.PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Authentication service is busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
 
 # ==== Root endpoint ====
 @app.get("/")
@@ -91,10 +244,33 @@ def root():
 def health_check():
     return {"status": "healthy", "message": "Backend is running"}
 
+# ==== JWKS: public key để service khác tự verify access token ====
+@app.get("/.well-known/jwks.json")
+def jwks(response: Response):
+    response.headers["Cache-Control"] = f"public, max-age={JWKS_CACHE_MAX_AGE_SECONDS}"
+    return get_keyring().jwks()
+
+# ==== Metrics (per worker) ====
+def _metrics_allowed(request: Request) -> bool:
+    if METRICS_TOKEN:
+        scheme, token = get_authorization_scheme_param(request.headers.get("Authorization"))
+        return scheme.lower() == "bearer" and hmac.compare_digest(token.encode(), METRICS_TOKEN.encode())
+    # Không có token: chỉ cho scrape từ chính máy đó
+    return request.client is not None and request.client.host in ("127.0.0.1", "::1")
+
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics(request: Request):
+    if not _metrics_allowed(request):
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    return metrics.snapshot()
+
 
 # ==== Routers ====
 app.include_router(auth.router)
 app.include_router(user_router.router)
 app.include_router(feature.router)
 app.include_router(rbac.router)
-app.include_router(abac.router)
\ No newline at end of file
+app.include_router(abac.router)
+
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
@@ -1,5 +1,5 @@
 # ABAC Models
-from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.database import Base
@@ -12,7 +12,8 @@ class Policy(Base):
     name = Column(String(200), unique=True, nullable=False)
     description = Column(Text, nullable=True)
     policy_type = Column(String(50), nullable=False)  # allow, deny, conditional
-    priority = Column(Integer, default=100)  # Lower number = higher priority
+    # Lower number = higher priority; NOT NULL: sort key của keyset pagination
+    priority = Column(Integer, nullable=False, default=100)
     is_active = Column(Boolean, default=True)
     
     # Policy conditions (JSON format)
@@ -27,6 +28,13 @@ class Policy(Base):
     
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Keyset pagination theo (priority, id)
+        Index('ix_policies_priority_id', 'priority', 'id'),
+        # Policy đang bật theo thứ tự ưu tiên (get_active_policies, authorize)
+        Index('ix_policies_is_active_priority', 'is_active', 'priority'),
+    )
     
     # Relationships
     policy_assignments = relationship("PolicyAssignment", back_populates="policy")
@@ -46,6 +54,12 @@ class PolicyAssignment(Base):
     # Relationships
     policy = relationship("Policy", back_populates="policy_assignments")
 
+    __table_args__ = (
+        # Policy gán cho user / global khi authorize
+        Index('ix_policy_assignments_assignment_type_assignment_id_is_active',
+              'assignment_type', 'assignment_id', 'is_active'),
+    )
+
 class Attribute(Base):
     __tablename__ = "attributes"
     
@@ -78,6 +92,11 @@ class UserAttribute(Base):
     user = relationship("User")
     attribute = relationship("Attribute")
 
+    __table_args__ = (
+        # Mỗi user một giá trị cho mỗi attribute (set_user_attribute ghi đè)
+        Index('uq_user_attributes_user_id_attribute_id', 'user_id', 'attribute_id', unique=True),
+    )
+
 class ResourceAttribute(Base):
     __tablename__ = "resource_attributes"
     
@@ -93,6 +112,11 @@ class ResourceAttribute(Base):
     # Relationships
     attribute = relationship("Attribute")
 
+    __table_args__ = (
+        Index('ix_resource_attributes_resource_type_resource_id_attribute_id',
+              'resource_type', 'resource_id', 'attribute_id'),
+    )
+
 class AccessLog(Base):
     __tablename__ = "access_logs"
     
@@ -107,8 +131,15 @@ class AccessLog(Base):
     ip_address = Column(String(45), nullable=True)
     user_agent = Column(Text, nullable=True)
     
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     
     # Relationships
     user = relationship("User")
     policy = relationship("Policy")
+
+    __table_args__ = (
+        # Keyset pagination: mới nhất trước, toàn bộ hoặc theo user
+        # (index theo user cũng phục vụ lọc user_id + created_at)
+        Index('ix_access_logs_created_at_id', 'created_at', 'id'),
+        Index('ix_access_logs_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+    )
@@ -1,5 +1,5 @@
 # RBAC Models
-from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime, ForeignKey, Table, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.database import Base
@@ -20,6 +20,26 @@ role_permissions = Table(
     Column('permission_id', Integer, ForeignKey('permissions.id'), primary_key=True)
 )
 
+# Role hierarchy: a child role inherits every permission of its parent roles
+role_parents = Table(
+    'role_parents',
+    Base.metadata,
+    Column('role_id', Integer, ForeignKey('roles.id'), primary_key=True),
+    Column('parent_id', Integer, ForeignKey('roles.id'), primary_key=True)
+)
+
+# Transitive closure of role_parents, including a depth-0 row for every role.
+# (ancestor_id, descendant_id, depth) means descendant inherits from ancestor
+# through `depth` edges, so effective permissions are a single join.
+role_closure = Table(
+    'role_closure',
+    Base.metadata,
+    Column('ancestor_id', Integer, ForeignKey('roles.id'), primary_key=True),
+    Column('descendant_id', Integer, ForeignKey('roles.id'), primary_key=True),
+    Column('depth', Integer, nullable=False, default=0),
+    Index('ix_role_closure_descendant', 'descendant_id', 'ancestor_id')
+)
+
 class Role(Base):
     __tablename__ = "roles"
     
@@ -36,6 +56,13 @@ class Role(Base):
     # Relationships
     users = relationship("User", secondary=user_roles, back_populates="roles")
     permissions = relationship("Permission", secondary=role_permissions, back_populates="roles")
+    parents = relationship(
+        "Role",
+        secondary=role_parents,
+        primaryjoin=lambda: Role.id == role_parents.c.role_id,
+        secondaryjoin=lambda: Role.id == role_parents.c.parent_id,
+        backref="children"
+    )
 
 class Permission(Base):
     __tablename__ = "permissions"
@@ -54,6 +81,11 @@ class Permission(Base):
     # Relationships
     roles = relationship("Role", secondary=role_permissions, back_populates="permissions")
 
+    __table_args__ = (
+        # check_user_permission, danh sách permission theo resource
+        Index('ix_permissions_resource_action', 'resource', 'action'),
+    )
+
 class Resource(Base):
     __tablename__ = "resources"
     
@@ -66,3 +98,11 @@ class Resource(Base):
     
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class RbacState(Base):
+    """Single row holding the global RBAC revision, bumped on every RBAC change"""
+    __tablename__ = "rbac_state"
+    
+    id = Column(Integer, primary_key=True)
+    revision = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
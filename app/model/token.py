@@ -0,0 +1,25 @@
+# Token revocation
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from app.db.database import Base
+from datetime import datetime
+
+
+class RevokedToken(Base):
+    """Append-only log of revoked token ids.
+
+    `jti` is either the jti of one token or "family:<id>" for a whole
+    refresh-token family. Rows are only deleted by compaction once
+    `expires_at` has passed (the token could not be used anyway).
+    """
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String(100), nullable=False, unique=True)
+    user_id = Column(Integer, nullable=True)
+    reason = Column(String(50), nullable=False)  # logout, rotated, reuse_detected, user_inactive
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_revoked_tokens_expires_at', 'expires_at'),
+    )
@@ -1,5 +1,5 @@
 # app/db/models.py
-from sqlalchemy import Column, String, Integer, Boolean, Date, Text, DateTime
+from sqlalchemy import Column, String, Integer, Boolean, Date, Text, DateTime, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.database import Base
@@ -28,8 +28,15 @@ class User(Base):
 
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Ghi trễ theo lô qua app.services.login_tracker, không commit trong request login
+    last_login_at = Column(DateTime, nullable=True)
     
     # Relationships
     roles = relationship("Role", secondary="user_roles", back_populates="users")
     user_attributes = relationship("UserAttribute", back_populates="user")
     access_logs = relationship("AccessLog", back_populates="user")
+
+    __table_args__ = (
+        # Keyset pagination: ORDER BY created_at DESC, id DESC
+        Index('ix_users_created_at_id', 'created_at', 'id'),
+    )
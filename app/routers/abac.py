@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.db.database import get_db
-from app.services import abac as abac_service
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from typing import List, Optional, Union
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_async_db
+from app.db.routing import DBRoute
+from app.core.config import JSON_FAST_PATH
+from app.core.security import require_permission
+from app.model.abac import AccessLog, UserAttribute
+from app.services import abac as abac_service, list_counts
 from app.schemas.abac import (
     PolicyCreate, PolicyUpdate, PolicyResponse,
     PolicyAssignmentCreate, PolicyAssignmentResponse,
@@ -12,182 +16,244 @@ from app.schemas.abac import (
     AuthorizationRequest, AuthorizationResponse,
     AccessLogResponse
 )
+from app.schemas.fields import parse_fields
+from app.schemas.pagination import CursorPage
+from app.utils import fast_json
 
-router = APIRouter(prefix="/abac", tags=["ABAC"])
+router = APIRouter(prefix="/abac", tags=["ABAC"], route_class=DBRoute)
+
+# JSON_FAST_PATH: select cột + TypeAdapter dựng sẵn thay cho ORM object + response_model
+access_logs_json = fast_json.RowSerializer(AccessLog, AccessLogResponse) if JSON_FAST_PATH else None
+
+FIELDS_DESCRIPTION = "Comma-separated fields to return (and select); nested fields as attribute.name"
+
+
+def _serializer(model, schema, fields: Optional[str], default=None) -> Optional[fast_json.RowSerializer]:
+    try:
+        return fast_json.serializer_for(model, schema, fields, default=default)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 # Policy endpoints
-@router.post("/policies", response_model=PolicyResponse)
-def create_policy(policy_data: PolicyCreate, db: Session = Depends(get_db)):
+@router.post("/policies", response_model=PolicyResponse, dependencies=[Depends(require_permission("policy", "write"))])
+async def create_policy(policy_data: PolicyCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new policy"""
-    return abac_service.create_policy(db, policy_data)
+    return await db.run_sync(abac_service.create_policy, policy_data)
 
-@router.get("/policies", response_model=List[PolicyResponse])
-def list_policies(
+@router.get("/policies", response_model=Union[List[PolicyResponse], CursorPage[PolicyResponse]], dependencies=[Depends(require_permission("policy", "read"))])
+async def list_policies(
+    response: Response,
     page: int = Query(1, ge=1),
     page_size: int = Query(100, ge=1, le=1000),
     active_only: bool = Query(False),
-    db: Session = Depends(get_db)
+    count: Optional[str] = Query(None, pattern="^(exact|estimated|cached)$", description="Also return the total in X-Total-Count"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor; \"\" for the first page. Returns {items, next_cursor}"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """List all policies"""
+    if count:
+        response.headers.update(list_counts.count_headers(await db.run_sync(abac_service.count_policies, count, active_only=active_only), count))
+    if cursor is not None:
+        try:
+            items, next_cursor = await db.run_sync(abac_service.get_policies_page, cursor, page_size, active_only=active_only)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return CursorPage(items=items, next_cursor=next_cursor)
     if active_only:
-        return abac_service.get_active_policies(db)
-    return abac_service.get_all_policies(db, page=page, page_size=page_size)
+        return await db.run_sync(abac_service.get_active_policies)
+    return await db.run_sync(abac_service.get_all_policies, page=page, page_size=page_size)
 
-@router.get("/policies/{policy_id}", response_model=PolicyResponse)
-def get_policy(policy_id: int, db: Session = Depends(get_db)):
+@router.get("/policies/{policy_id}", response_model=PolicyResponse, dependencies=[Depends(require_permission("policy", "read"))])
+async def get_policy(policy_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get policy by ID"""
-    policy = abac_service.get_policy_by_id(db, policy_id)
+    policy = await db.run_sync(abac_service.get_policy_by_id, policy_id)
     if not policy:
         raise HTTPException(status_code=404, detail="Policy not found")
     return policy
 
-@router.put("/policies/{policy_id}", response_model=PolicyResponse)
-def update_policy(policy_id: int, policy_data: PolicyUpdate, db: Session = Depends(get_db)):
+@router.put("/policies/{policy_id}", response_model=PolicyResponse, dependencies=[Depends(require_permission("policy", "write"))])
+async def update_policy(policy_id: int, policy_data: PolicyUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update policy"""
-    policy = abac_service.update_policy(db, policy_id, policy_data)
+    policy = await db.run_sync(abac_service.update_policy, policy_id, policy_data)
     if not policy:
         raise HTTPException(status_code=404, detail="Policy not found")
     return policy
 
-@router.delete("/policies/{policy_id}")
-def delete_policy(policy_id: int, db: Session = Depends(get_db)):
+@router.delete("/policies/{policy_id}", dependencies=[Depends(require_permission("policy", "delete"))])
+async def delete_policy(policy_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete policy"""
-    success = abac_service.delete_policy(db, policy_id)
+    success = await db.run_sync(abac_service.delete_policy, policy_id)
     if not success:
         raise HTTPException(status_code=404, detail="Policy not found")
     return {"message": "Policy deleted successfully"}
 
 # Policy Assignment endpoints
-@router.post("/policy-assignments", response_model=PolicyAssignmentResponse)
-def assign_policy(assignment_data: PolicyAssignmentCreate, db: Session = Depends(get_db)):
+@router.post("/policy-assignments", response_model=PolicyAssignmentResponse, dependencies=[Depends(require_permission("policy", "write"))])
+async def assign_policy(assignment_data: PolicyAssignmentCreate, db: AsyncSession = Depends(get_async_db)):
     """Assign policy to user/role/resource"""
-    return abac_service.assign_policy(db, assignment_data)
+    return await db.run_sync(abac_service.assign_policy, assignment_data)
 
-@router.get("/policies/{policy_id}/assignments", response_model=List[PolicyAssignmentResponse])
-def get_policy_assignments(policy_id: int, db: Session = Depends(get_db)):
+@router.get("/policies/{policy_id}/assignments", response_model=List[PolicyAssignmentResponse], dependencies=[Depends(require_permission("policy", "read"))])
+async def get_policy_assignments(policy_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get all assignments for a policy"""
-    assignments = abac_service.get_policy_assignments(db, policy_id)
+    assignments = await db.run_sync(abac_service.get_policy_assignments, policy_id)
     return assignments
 
-@router.get("/users/{user_id}/policies", response_model=List[PolicyResponse])
-def get_user_policies(user_id: int, db: Session = Depends(get_db)):
+@router.get("/users/{user_id}/policies", response_model=List[PolicyResponse], dependencies=[Depends(require_permission("policy", "read"))])
+async def get_user_policies(user_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get all policies assigned to a user"""
-    policies = abac_service.get_user_policies(db, user_id)
+    policies = await db.run_sync(abac_service.get_user_policies, user_id)
     return policies
 
-@router.delete("/policy-assignments/{assignment_id}")
-def remove_policy_assignment(assignment_id: int, db: Session = Depends(get_db)):
+@router.delete("/policy-assignments/{assignment_id}", dependencies=[Depends(require_permission("policy", "write"))])
+async def remove_policy_assignment(assignment_id: int, db: AsyncSession = Depends(get_async_db)):
     """Remove policy assignment"""
-    success = abac_service.remove_policy_assignment(db, assignment_id)
+    success = await db.run_sync(abac_service.remove_policy_assignment, assignment_id)
     if not success:
         raise HTTPException(status_code=404, detail="Policy assignment not found")
     return {"message": "Policy assignment removed successfully"}
 
 # Attribute endpoints
-@router.post("/attributes", response_model=AttributeResponse)
-def create_attribute(attribute_data: AttributeCreate, db: Session = Depends(get_db)):
+@router.post("/attributes", response_model=AttributeResponse, dependencies=[Depends(require_permission("policy", "write"))])
+async def create_attribute(attribute_data: AttributeCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new attribute"""
-    existing_attribute = abac_service.get_attribute_by_name(db, attribute_data.name)
+    existing_attribute = await db.run_sync(abac_service.get_attribute_by_name, attribute_data.name)
     if existing_attribute:
         raise HTTPException(status_code=400, detail="Attribute with this name already exists")
     
-    return abac_service.create_attribute(db, attribute_data)
+    return await db.run_sync(abac_service.create_attribute, attribute_data)
 
-@router.get("/attributes", response_model=List[AttributeResponse])
-def list_attributes(
+@router.get("/attributes", response_model=Union[List[AttributeResponse], CursorPage[AttributeResponse]], dependencies=[Depends(require_permission("policy", "read"))])
+async def list_attributes(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     data_type: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Keyset cursor; \"\" for the first page. Returns {items, next_cursor}"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """List all attributes"""
+    if cursor is not None:
+        try:
+            items, next_cursor = await db.run_sync(abac_service.get_attributes_page, cursor, limit, data_type=data_type)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return CursorPage(items=items, next_cursor=next_cursor)
     if data_type:
-        return abac_service.get_attributes_by_type(db, data_type)
-    return abac_service.get_all_attributes(db, skip=skip, limit=limit)
+        return await db.run_sync(abac_service.get_attributes_by_type, data_type)
+    return await db.run_sync(abac_service.get_all_attributes, skip=skip, limit=limit)
 
-@router.get("/attributes/{attribute_id}", response_model=AttributeResponse)
-def get_attribute(attribute_id: int, db: Session = Depends(get_db)):
+@router.get("/attributes/{attribute_id}", response_model=AttributeResponse, dependencies=[Depends(require_permission("policy", "read"))])
+async def get_attribute(attribute_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get attribute by ID"""
-    attribute = abac_service.get_attribute_by_id(db, attribute_id)
+    attribute = await db.run_sync(abac_service.get_attribute_by_id, attribute_id)
     if not attribute:
         raise HTTPException(status_code=404, detail="Attribute not found")
     return attribute
 
 # User Attribute endpoints
-@router.post("/users/{user_id}/attributes")
-def set_user_attribute(
+@router.post("/users/{user_id}/attributes", dependencies=[Depends(require_permission("user", "write"))])
+async def set_user_attribute(
     user_id: int,
     attribute_name: str = Query(...),
     value: str = Query(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Set user attribute value"""
     try:
-        user_attribute = abac_service.set_user_attribute(db, user_id, attribute_name, value)
+        user_attribute = await db.run_sync(abac_service.set_user_attribute, user_id, attribute_name, value)
         return {"message": "User attribute set successfully", "attribute": user_attribute}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/users/{user_id}/attributes", response_model=List[UserAttributeResponse])
-def get_user_attributes(user_id: int, db: Session = Depends(get_db)):
+@router.get("/users/{user_id}/attributes", response_model=List[UserAttributeResponse], dependencies=[Depends(require_permission("user", "read"))])
+async def get_user_attributes(
+    user_id: int,
+    response: Response,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db)
+):
     """Get all attributes for a user"""
-    attributes = abac_service.get_user_attributes(db, user_id)
+    try:
+        fieldset = parse_fields(UserAttributeResponse, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    attributes = await db.run_sync(abac_service.get_user_attributes, user_id, fields=fieldset)
+    if fieldset:
+        # ORM object chỉ nạp các cột được chọn (load_only), serialize theo schema con
+        serializer = fast_json.sparse_serializer(UserAttribute, UserAttributeResponse, fieldset)
+        return serializer.list_response(response, attributes, from_attributes=True)
     return attributes
 
-@router.get("/users/{user_id}/attributes/{attribute_name}")
-def get_user_attribute_value(
+@router.get("/users/{user_id}/attributes/{attribute_name}", dependencies=[Depends(require_permission("user", "read"))])
+async def get_user_attribute_value(
     user_id: int,
     attribute_name: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get specific user attribute value"""
-    value = abac_service.get_user_attribute_value(db, user_id, attribute_name)
+    value = await db.run_sync(abac_service.get_user_attribute_value, user_id, attribute_name)
     if value is None:
         raise HTTPException(status_code=404, detail="User attribute not found")
     return {"attribute_name": attribute_name, "value": value}
 
 # Resource Attribute endpoints
-@router.post("/resources/{resource_id}/attributes")
-def set_resource_attribute(
+@router.post("/resources/{resource_id}/attributes", dependencies=[Depends(require_permission("policy", "write"))])
+async def set_resource_attribute(
     resource_id: int,
     resource_type: str = Query(...),
     attribute_name: str = Query(...),
     value: str = Query(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Set resource attribute value"""
     try:
-        resource_attribute = abac_service.set_resource_attribute(
-            db, resource_id, resource_type, attribute_name, value
-        )
+        resource_attribute = await db.run_sync(abac_service.set_resource_attribute, resource_id, resource_type, attribute_name, value)
         return {"message": "Resource attribute set successfully", "attribute": resource_attribute}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/resources/{resource_id}/attributes", response_model=List[ResourceAttributeResponse])
-def get_resource_attributes(
+@router.get("/resources/{resource_id}/attributes", response_model=List[ResourceAttributeResponse], dependencies=[Depends(require_permission("policy", "read"))])
+async def get_resource_attributes(
     resource_id: int,
     resource_type: str = Query(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all attributes for a resource"""
-    attributes = abac_service.get_resource_attributes(db, resource_id, resource_type)
+    attributes = await db.run_sync(abac_service.get_resource_attributes, resource_id, resource_type)
     return attributes
 
 # Authorization endpoint
-@router.post("/authorize", response_model=AuthorizationResponse)
-def authorize_request(request: AuthorizationRequest, db: Session = Depends(get_db)):
+@router.post("/authorize", response_model=AuthorizationResponse, dependencies=[Depends(require_permission("policy", "read"))])
+async def authorize_request(request: AuthorizationRequest, db: AsyncSession = Depends(get_async_db)):
     """Authorize a request using ABAC policies"""
-    return abac_service.authorize_request(db, request)
+    return await db.run_sync(abac_service.authorize_request, request)
 
 # Access Log endpoints
-@router.get("/access-logs", response_model=List[AccessLogResponse])
-def get_access_logs(
+@router.get("/access-logs", response_model=Union[List[AccessLogResponse], CursorPage[AccessLogResponse]], dependencies=[Depends(require_permission("policy", "read"))])
+async def get_access_logs(
+    response: Response,
     user_id: Optional[int] = Query(None),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    count: Optional[str] = Query(None, pattern="^(exact|estimated|cached)$", description="Also return the total in X-Total-Count"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor; \"\" for the first page. Returns {items, next_cursor}"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get access logs"""
-    logs = abac_service.get_access_logs(db, user_id=user_id, skip=skip, limit=limit)
+    serializer = _serializer(AccessLog, AccessLogResponse, fields, default=access_logs_json)
+    columns = serializer.columns if serializer else None
+    if count:
+        response.headers.update(list_counts.count_headers(await db.run_sync(abac_service.count_access_logs, count, user_id=user_id), count))
+    if cursor is not None:
+        try:
+            items, next_cursor = await db.run_sync(abac_service.get_access_logs_page, cursor, limit, user_id=user_id, columns=columns)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if serializer:
+            return serializer.page_response(response, items, next_cursor)
+        return CursorPage(items=items, next_cursor=next_cursor)
+    logs = await db.run_sync(abac_service.get_access_logs, user_id=user_id, skip=skip, limit=limit, columns=columns)
+    if serializer:
+        return serializer.list_response(response, logs)
     return logs
@@ -1,25 +1,34 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_async_db
+from app.db.routing import DBRoute
 from app.schemas import user
 from app.services import auth as auth_service
+from app.services import authz as authz_service
+from app.core import rate_limit
+from app.core.config import JWT_EMBED_AUTHZ_CLAIMS, RATE_LIMIT_ENABLED, LOGIN_RATE_LIMIT_PER_EMAIL
+from app.core.security import get_authz_context, decode_access_token, oauth2_scheme
+from app.services.authz import AuthzContext
 from app.schemas.user import UserCreate
 from app.schemas.user import UserLogin, TokenResponse
 from app.services.auth import get_current_user 
-from app.utils.security import create_access_token, create_refresh_token, decode_token
+from app.utils.security import create_access_token, create_refresh_token, new_token_id
 from datetime import timedelta
+from typing import Optional
 
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=DBRoute)
+
+_login_email_rate = rate_limit.parse_rate(LOGIN_RATE_LIMIT_PER_EMAIL)
 
 
 @router.post("/register")
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    if auth_service.get_user_by_email(db, user.email):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    if await db.run_sync(auth_service.get_user_by_email, user.email):
         raise HTTPException(status_code=400, detail="Email already exists")
     
-    return auth_service.create_user(
+    return await auth_service.create_user_async(
         db,
         email=user.email,
         password=user.password,
@@ -31,15 +40,23 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     )
 
 @router.post("/login", response_model=TokenResponse)
-def login(login_data: UserLogin, db: Session = Depends(get_db)):
-    # Validate user credentials
-    user = auth_service.authenticate_user(db, login_data.email, login_data.password)
+async def login(login_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    # Giới hạn theo email trước khi tốn CPU cho bcrypt (theo IP đã có ở middleware)
+    if RATE_LIMIT_ENABLED:
+        rate_limit.check("login-email", login_data.email.lower(), _login_email_rate)
+    # Validate user credentials (bcrypt chạy trong hash executor, không chiếm threadpool)
+    user = await auth_service.authenticate_user_async(db, login_data.email, login_data.password)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     data = {"sub": str(user.id)}
-    access_token = create_access_token(data, timedelta(minutes=15))
-    refresh_token = create_refresh_token(data)
+    # Access token mang cùng family với refresh token: thu hồi family là vô hiệu cả hai
+    family_id = new_token_id()
+    claims = {**data, "fam": family_id}
+    if JWT_EMBED_AUTHZ_CLAIMS:
+        claims.update(await db.run_sync(authz_service.build_authz_claims, user.id))
+    access_token = create_access_token(claims, timedelta(minutes=15))
+    refresh_token = create_refresh_token(data, family_id)
 
     return TokenResponse(
         access_token=access_token,
@@ -51,26 +68,45 @@ def login(login_data: UserLogin, db: Session = Depends(get_db)):
 def get_me(current_user: user.UserResponse = Depends(get_current_user)):
     return current_user
 
+@router.get("/me/permissions")
+def get_my_permissions(authz: AuthzContext = Depends(get_authz_context)):
+    """Roles and permission ids of the caller, from token claims when still current"""
+    return {
+        "user_id": authz.user_id,
+        "role_ids": sorted(authz.role_ids),
+        "permission_ids": sorted(authz.permission_ids),
+        "revision": authz.revision,
+        "source": "token" if authz.from_token else "database",
+    }
+
 @router.post("/logout")
-def logout(current_user: user.UserResponse = Depends(get_current_user)):
-    """Logout user"""
+async def logout(
+    request: Request,
+    response: Response,
+    refresh_token: Optional[str] = None,
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Logout: revoke the access token and the refresh-token family (query param or cookie)"""
+    payload = decode_access_token(token)
+    await db.run_sync(auth_service.revoke_session, payload, refresh_token or request.cookies.get("refresh_token"))
+    response.delete_cookie("refresh_token")
     return {"message": "Logged out successfully"}
 
-@router.post("/refresh")
-def refresh_token(token: str):
-    try:
-        payload = decode_token(token)
-        username = payload.get("sub")
-        if not username:
-            raise HTTPException(status_code=401)
-    except:
+@router.post("/refresh", response_model=TokenResponse)
+async def refresh_token(token: str, db: AsyncSession = Depends(get_async_db)):
+    """Rotate a refresh token: the old one is revoked, reusing it revokes the whole family"""
+    rotated = await db.run_sync(auth_service.rotate_refresh_token, token)
+    if rotated is None:
         raise HTTPException(status_code=401, detail="Invalid refresh token")
+    user_id, family_id = rotated
 
-    new_access_token = create_access_token({"sub": username})
-    return {"access_token": new_access_token}
-
-
-@router.post("/logout")
-def logout(response: Response):
-    response.delete_cookie("refresh_token")
-    return {"message": "Logged out"}
+    data = {"sub": str(user_id)}
+    claims = {**data, "fam": family_id}
+    if JWT_EMBED_AUTHZ_CLAIMS:
+        claims.update(await db.run_sync(authz_service.build_authz_claims, user_id))
+    return TokenResponse(
+        access_token=create_access_token(claims, timedelta(minutes=15)),
+        refresh_token=create_refresh_token(data, family_id),
+        token_type="bearer"
+    )
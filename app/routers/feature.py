@@ -1,34 +1,36 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_async_db
+from app.db.routing import DBRoute
+from app.core.security import require_permission
 from app.services import feature as service_feature  
 from app.schemas.feature import FeatureCreate, FeatureUpdate, FeatureOut
 
-router = APIRouter(prefix="/features", tags=["Features"])
+router = APIRouter(prefix="/features", tags=["Features"], route_class=DBRoute)
 
-@router.get("/", response_model=list[FeatureOut])
-def list_features(db: Session = Depends(get_db)):
-    return service_feature.get_all_features(db)
+@router.get("/", response_model=list[FeatureOut], dependencies=[Depends(require_permission("feature", "read"))])
+async def list_features(db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(service_feature.get_all_features)
 
-@router.get("/{feature_id}", response_model=FeatureOut)
-def get_feature(feature_id: int, db: Session = Depends(get_db)):
-    feature = service_feature.get_feature_by_id(db, feature_id)
+@router.get("/{feature_id}", response_model=FeatureOut, dependencies=[Depends(require_permission("feature", "read"))])
+async def get_feature(feature_id: int, db: AsyncSession = Depends(get_async_db)):
+    feature = await db.run_sync(service_feature.get_feature_by_id, feature_id)
     if not feature:
         raise HTTPException(status_code=404, detail="Feature not found")
     return feature
 
-@router.post("/", response_model=FeatureOut)
-def create_feature(feature_in: FeatureCreate, db: Session = Depends(get_db)):
-    return service_feature.create_feature(db, feature_in)
+@router.post("/", response_model=FeatureOut, dependencies=[Depends(require_permission("feature", "write"))])
+async def create_feature(feature_in: FeatureCreate, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(service_feature.create_feature, feature_in)
 
-@router.put("/{feature_id}", response_model=FeatureOut)
-def update_feature(feature_id: int, feature_in: FeatureUpdate, db: Session = Depends(get_db)):
-    feature = service_feature.update_feature(db, feature_id, feature_in)
+@router.put("/{feature_id}", response_model=FeatureOut, dependencies=[Depends(require_permission("feature", "write"))])
+async def update_feature(feature_id: int, feature_in: FeatureUpdate, db: AsyncSession = Depends(get_async_db)):
+    feature = await db.run_sync(service_feature.update_feature, feature_id, feature_in)
     if not feature:
         raise HTTPException(status_code=404, detail="Feature not found")
     return feature
 
-@router.delete("/{feature_id}")
-def delete_feature(feature_id: int, db: Session = Depends(get_db)):
-    service_feature.delete_feature(db, feature_id)
+@router.delete("/{feature_id}", dependencies=[Depends(require_permission("feature", "delete"))])
+async def delete_feature(feature_id: int, db: AsyncSession = Depends(get_async_db)):
+    await db.run_sync(service_feature.delete_feature, feature_id)
     return {"detail": "Deleted"}
@@ -1,44 +1,57 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.db.database import get_db
-from app.services import rbac as rbac_service
+from typing import List, Optional, Union
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_async_db
+from app.db.routing import DBRoute
+from app.core.security import require_permission
+from app.services import rbac as rbac_service, permission_cache
 from app.schemas.rbac import (
     RoleCreate, RoleUpdate, RoleResponse, RoleWithPermissions,
     PermissionCreate, PermissionUpdate, PermissionResponse,
     ResourceCreate, ResourceUpdate, ResourceResponse,
-    UserRoleAssignment, RolePermissionAssignment, UserWithRoles
+    UserRoleAssignment, RolePermissionAssignment, RoleParentAssignment, UserWithRoles,
+    BulkUserRoleAssignment, BulkAssignmentResult
 )
+from app.schemas.pagination import CursorPage
 
-router = APIRouter(prefix="/rbac", tags=["RBAC"])
+router = APIRouter(prefix="/rbac", tags=["RBAC"], route_class=DBRoute)
 
 # Role endpoints
-@router.post("/roles", response_model=RoleResponse)
-def create_role(role_data: RoleCreate, db: Session = Depends(get_db)):
+@router.post("/roles", response_model=RoleResponse, dependencies=[Depends(require_permission("role", "write"))])
+async def create_role(role_data: RoleCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new role"""
-    existing_role = rbac_service.get_role_by_name(db, role_data.name)
+    existing_role = await db.run_sync(rbac_service.get_role_by_name, role_data.name)
     if existing_role:
         raise HTTPException(status_code=400, detail="Role with this name already exists")
     
-    return rbac_service.create_role(db, role_data)
+    try:
+        return await db.run_sync(rbac_service.create_role, role_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/roles", response_model=List[RoleResponse])
-def list_roles(
+@router.get("/roles", response_model=Union[List[RoleResponse], CursorPage[RoleResponse]], dependencies=[Depends(require_permission("role", "read"))])
+async def list_roles(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Keyset cursor; \"\" for the first page. Returns {items, next_cursor}"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """List all roles"""
-    return rbac_service.get_all_roles(db, skip=skip, limit=limit)
+    if cursor is not None:
+        try:
+            items, next_cursor = await db.run_sync(rbac_service.get_roles_page, cursor, limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return CursorPage(items=items, next_cursor=next_cursor)
+    return await db.run_sync(rbac_service.get_all_roles, skip=skip, limit=limit)
 
-@router.get("/roles/{role_id}", response_model=RoleWithPermissions)
-def get_role(role_id: int, db: Session = Depends(get_db)):
-    """Get role by ID with permissions"""
-    role = rbac_service.get_role_by_id(db, role_id)
+@router.get("/roles/{role_id}", response_model=RoleWithPermissions, dependencies=[Depends(require_permission("role", "read"))])
+async def get_role(role_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Get role by ID with direct and inherited permissions"""
+    role = await db.run_sync(rbac_service.get_role_by_id, role_id)
     if not role:
         raise HTTPException(status_code=404, detail="Role not found")
     
-    permissions = rbac_service.get_role_permissions(db, role_id)
     return RoleWithPermissions(
         id=role.id,
         name=role.name,
@@ -46,159 +59,224 @@ def get_role(role_id: int, db: Session = Depends(get_db)):
         description=role.description,
         is_active=role.is_active,
         is_system=role.is_system,
-        permissions=permissions
+        parent_ids=await db.run_sync(rbac_service.get_role_parent_ids, role_id),
+        permissions=await db.run_sync(rbac_service.get_role_permissions, role_id),
+        inherited_permissions=await db.run_sync(rbac_service.get_role_inherited_permissions, role_id)
     )
 
-@router.put("/roles/{role_id}", response_model=RoleResponse)
-def update_role(role_id: int, role_data: RoleUpdate, db: Session = Depends(get_db)):
+@router.put("/roles/{role_id}", response_model=RoleResponse, dependencies=[Depends(require_permission("role", "write"))])
+async def update_role(role_id: int, role_data: RoleUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update role"""
-    role = rbac_service.update_role(db, role_id, role_data)
+    try:
+        role = await db.run_sync(rbac_service.update_role, role_id, role_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not role:
         raise HTTPException(status_code=404, detail="Role not found")
     return role
 
-@router.delete("/roles/{role_id}")
-def delete_role(role_id: int, db: Session = Depends(get_db)):
+@router.delete("/roles/{role_id}", dependencies=[Depends(require_permission("role", "delete"))])
+async def delete_role(role_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete role"""
-    success = rbac_service.delete_role(db, role_id)
+    success = await db.run_sync(rbac_service.delete_role, role_id)
     if not success:
         raise HTTPException(status_code=404, detail="Role not found or cannot be deleted")
     return {"message": "Role deleted successfully"}
 
+# Role hierarchy endpoints
+@router.get("/roles/{role_id}/parents", response_model=List[int], dependencies=[Depends(require_permission("role", "read"))])
+async def get_role_parents(role_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Get ids of the roles this role directly inherits from"""
+    if not await db.run_sync(rbac_service.get_role_by_id, role_id):
+        raise HTTPException(status_code=404, detail="Role not found")
+    return await db.run_sync(rbac_service.get_role_parent_ids, role_id)
+
+@router.put("/roles/{role_id}/parents", dependencies=[Depends(require_permission("role", "write"))])
+async def set_role_parents(role_id: int, assignment: RoleParentAssignment, db: AsyncSession = Depends(get_async_db)):
+    """Replace the parent roles of a role"""
+    try:
+        success = await db.run_sync(rbac_service.set_role_parents, role_id, assignment.parent_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not success:
+        raise HTTPException(status_code=404, detail="Role not found")
+    return {"message": "Role parents updated successfully"}
+
+@router.post("/roles/{role_id}/parents/{parent_id}", dependencies=[Depends(require_permission("role", "write"))])
+async def add_role_parent(role_id: int, parent_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Make a role inherit the permissions of another role"""
+    try:
+        success = await db.run_sync(rbac_service.add_role_parent, role_id, parent_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not success:
+        raise HTTPException(status_code=404, detail="Role not found")
+    return {"message": "Role parent added successfully"}
+
+@router.delete("/roles/{role_id}/parents/{parent_id}", dependencies=[Depends(require_permission("role", "write"))])
+async def remove_role_parent(role_id: int, parent_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Stop a role from inheriting the permissions of another role"""
+    success = await db.run_sync(rbac_service.remove_role_parent, role_id, parent_id)
+    if not success:
+        raise HTTPException(status_code=404, detail="Role parent not found")
+    return {"message": "Role parent removed successfully"}
+
 # Permission endpoints
-@router.post("/permissions", response_model=PermissionResponse)
-def create_permission(permission_data: PermissionCreate, db: Session = Depends(get_db)):
+@router.post("/permissions", response_model=PermissionResponse, dependencies=[Depends(require_permission("permission", "write"))])
+async def create_permission(permission_data: PermissionCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new permission"""
-    existing_permission = rbac_service.get_permission_by_name(db, permission_data.name)
+    existing_permission = await db.run_sync(rbac_service.get_permission_by_name, permission_data.name)
     if existing_permission:
         raise HTTPException(status_code=400, detail="Permission with this name already exists")
     
-    return rbac_service.create_permission(db, permission_data)
+    return await db.run_sync(rbac_service.create_permission, permission_data)
 
-@router.get("/permissions", response_model=List[PermissionResponse])
-def list_permissions(
+@router.get("/permissions", response_model=Union[List[PermissionResponse], CursorPage[PermissionResponse]], dependencies=[Depends(require_permission("permission", "read"))])
+async def list_permissions(
     page: int = Query(1, ge=1),
     page_size: int = Query(100, ge=1, le=1000),
     resource: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Keyset cursor; \"\" for the first page. Returns {items, next_cursor}"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """List all permissions"""
+    if cursor is not None:
+        try:
+            items, next_cursor = await db.run_sync(rbac_service.get_permissions_page, cursor, page_size, resource=resource)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return CursorPage(items=items, next_cursor=next_cursor)
     if resource:
-        return rbac_service.get_permissions_by_resource(db, resource)
-    return rbac_service.get_all_permissions(db, page=page, page_size=page_size)
+        return await db.run_sync(rbac_service.get_permissions_by_resource, resource)
+    return await db.run_sync(rbac_service.get_all_permissions, page=page, page_size=page_size)
 
-@router.get("/permissions/{permission_id}", response_model=PermissionResponse)
-def get_permission(permission_id: int, db: Session = Depends(get_db)):
+@router.get("/permissions/{permission_id}", response_model=PermissionResponse, dependencies=[Depends(require_permission("permission", "read"))])
+async def get_permission(permission_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get permission by ID"""
-    permission = rbac_service.get_permission_by_id(db, permission_id)
+    permission = await db.run_sync(rbac_service.get_permission_by_id, permission_id)
     if not permission:
         raise HTTPException(status_code=404, detail="Permission not found")
     return permission
 
-@router.put("/permissions/{permission_id}", response_model=PermissionResponse)
-def update_permission(permission_id: int, permission_data: PermissionUpdate, db: Session = Depends(get_db)):
+@router.put("/permissions/{permission_id}", response_model=PermissionResponse, dependencies=[Depends(require_permission("permission", "write"))])
+async def update_permission(permission_id: int, permission_data: PermissionUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update permission"""
-    permission = rbac_service.update_permission(db, permission_id, permission_data)
+    permission = await db.run_sync(rbac_service.update_permission, permission_id, permission_data)
     if not permission:
         raise HTTPException(status_code=404, detail="Permission not found")
     return permission
 
-@router.delete("/permissions/{permission_id}")
-def delete_permission(permission_id: int, db: Session = Depends(get_db)):
+@router.delete("/permissions/{permission_id}", dependencies=[Depends(require_permission("permission", "delete"))])
+async def delete_permission(permission_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete permission"""
-    success = rbac_service.delete_permission(db, permission_id)
+    success = await db.run_sync(rbac_service.delete_permission, permission_id)
     if not success:
         raise HTTPException(status_code=404, detail="Permission not found")
     return {"message": "Permission deleted successfully"}
 
 # Resource endpoints
-@router.post("/resources", response_model=ResourceResponse)
-def create_resource(resource_data: ResourceCreate, db: Session = Depends(get_db)):
+@router.post("/resources", response_model=ResourceResponse, dependencies=[Depends(require_permission("resource", "write"))])
+async def create_resource(resource_data: ResourceCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new resource"""
-    existing_resource = rbac_service.get_resource_by_name(db, resource_data.name)
+    existing_resource = await db.run_sync(rbac_service.get_resource_by_name, resource_data.name)
     if existing_resource:
         raise HTTPException(status_code=400, detail="Resource with this name already exists")
     
-    return rbac_service.create_resource(db, resource_data)
+    return await db.run_sync(rbac_service.create_resource, resource_data)
 
-@router.get("/resources", response_model=List[ResourceResponse])
-def list_resources(
+@router.get("/resources", response_model=Union[List[ResourceResponse], CursorPage[ResourceResponse]], dependencies=[Depends(require_permission("resource", "read"))])
+async def list_resources(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Keyset cursor; \"\" for the first page. Returns {items, next_cursor}"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """List all resources"""
-    return rbac_service.get_all_resources(db, skip=skip, limit=limit)
+    if cursor is not None:
+        try:
+            items, next_cursor = await db.run_sync(rbac_service.get_resources_page, cursor, limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return CursorPage(items=items, next_cursor=next_cursor)
+    return await db.run_sync(rbac_service.get_all_resources, skip=skip, limit=limit)
 
-@router.get("/resources/{resource_id}", response_model=ResourceResponse)
-def get_resource(resource_id: int, db: Session = Depends(get_db)):
+@router.get("/resources/{resource_id}", response_model=ResourceResponse, dependencies=[Depends(require_permission("resource", "read"))])
+async def get_resource(resource_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get resource by ID"""
-    resource = rbac_service.get_resource_by_id(db, resource_id)
+    resource = await db.run_sync(rbac_service.get_resource_by_id, resource_id)
     if not resource:
         raise HTTPException(status_code=404, detail="Resource not found")
     return resource
 
-@router.put("/resources/{resource_id}", response_model=ResourceResponse)
-def update_resource(resource_id: int, resource_data: ResourceUpdate, db: Session = Depends(get_db)):
+@router.put("/resources/{resource_id}", response_model=ResourceResponse, dependencies=[Depends(require_permission("resource", "write"))])
+async def update_resource(resource_id: int, resource_data: ResourceUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update resource"""
-    resource = rbac_service.update_resource(db, resource_id, resource_data)
+    resource = await db.run_sync(rbac_service.update_resource, resource_id, resource_data)
     if not resource:
         raise HTTPException(status_code=404, detail="Resource not found")
     return resource
 
-@router.delete("/resources/{resource_id}")
-def delete_resource(resource_id: int, db: Session = Depends(get_db)):
+@router.delete("/resources/{resource_id}", dependencies=[Depends(require_permission("resource", "delete"))])
+async def delete_resource(resource_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete resource"""
-    success = rbac_service.delete_resource(db, resource_id)
+    success = await db.run_sync(rbac_service.delete_resource, resource_id)
     if not success:
         raise HTTPException(status_code=404, detail="Resource not found")
     return {"message": "Resource deleted successfully"}
 
 # Assignment endpoints
-@router.post("/users/{user_id}/roles")
-def assign_roles_to_user(user_id: int, assignment: UserRoleAssignment, db: Session = Depends(get_db)):
+@router.post("/users/{user_id}/roles", dependencies=[Depends(require_permission("role", "write"))])
+async def assign_roles_to_user(user_id: int, assignment: UserRoleAssignment, db: AsyncSession = Depends(get_async_db)):
     """Assign roles to user"""
-    success = rbac_service.assign_roles_to_user(db, user_id, assignment.role_ids)
+    success = await db.run_sync(rbac_service.assign_roles_to_user, user_id, assignment.role_ids)
     if not success:
         raise HTTPException(status_code=404, detail="User not found")
     return {"message": "Roles assigned successfully"}
 
-@router.get("/users/{user_id}/roles", response_model=List[RoleResponse])
-def get_user_roles(user_id: int, db: Session = Depends(get_db)):
+@router.post("/user-roles/bulk", response_model=BulkAssignmentResult, dependencies=[Depends(require_permission("role", "write"))])
+async def bulk_assign_roles(assignment: BulkUserRoleAssignment, db: AsyncSession = Depends(get_async_db)):
+    """Add, replace or remove a role set for many users at once"""
+    try:
+        return await db.run_sync(rbac_service.bulk_assign_roles_to_users, assignment.user_ids, assignment.role_ids, mode=assignment.mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/users/{user_id}/roles", response_model=List[RoleResponse], dependencies=[Depends(require_permission("role", "read"))])
+async def get_user_roles(user_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get user's roles"""
-    roles = rbac_service.get_user_roles(db, user_id)
+    roles = await db.run_sync(rbac_service.get_user_roles, user_id)
     return roles
 
-@router.get("/users/{user_id}/permissions", response_model=List[PermissionResponse])
-def get_user_permissions(user_id: int, db: Session = Depends(get_db)):
-    """Get user's permissions through roles"""
-    permissions = rbac_service.get_user_permissions(db, user_id)
+@router.get("/users/{user_id}/permissions", response_model=List[PermissionResponse], dependencies=[Depends(require_permission("permission", "read"))])
+async def get_user_permissions(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Get user's permissions through roles, including inherited ones"""
+    permissions = await db.run_sync(rbac_service.get_user_permissions, user_id)
     return permissions
 
-@router.post("/roles/{role_id}/permissions")
-def assign_permissions_to_role(role_id: int, assignment: RolePermissionAssignment, db: Session = Depends(get_db)):
+@router.post("/roles/{role_id}/permissions", dependencies=[Depends(require_permission("role", "write"))])
+async def assign_permissions_to_role(role_id: int, assignment: RolePermissionAssignment, db: AsyncSession = Depends(get_async_db)):
     """Assign permissions to role"""
-    success = rbac_service.assign_permissions_to_role(db, role_id, assignment.permission_ids)
+    success = await db.run_sync(rbac_service.assign_permissions_to_role, role_id, assignment.permission_ids)
     if not success:
         raise HTTPException(status_code=404, detail="Role not found")
     return {"message": "Permissions assigned successfully"}
 
-@router.get("/roles/{role_id}/permissions", response_model=List[PermissionResponse])
-def get_role_permissions(role_id: int, db: Session = Depends(get_db)):
+@router.get("/roles/{role_id}/permissions", response_model=List[PermissionResponse], dependencies=[Depends(require_permission("role", "read"))])
+async def get_role_permissions(role_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get role's permissions"""
-    permissions = rbac_service.get_role_permissions(db, role_id)
+    permissions = await db.run_sync(rbac_service.get_role_permissions, role_id)
     return permissions
 
 # Authorization check endpoint
-@router.get("/users/{user_id}/check-permission")
-def check_user_permission(
+@router.get("/users/{user_id}/check-permission", dependencies=[Depends(require_permission("permission", "read"))])
+async def check_user_permission(
     user_id: int,
     resource: str = Query(...),
     action: str = Query(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Check if user has specific permission"""
-    has_permission = rbac_service.check_user_permission(db, user_id, resource, action)
+    """Check if user has specific permission (served from the worker permission cache)"""
+    has_permission = await db.run_sync(permission_cache.has_permission, user_id, resource, action)
     return {
         "user_id": user_id,
         "resource": resource,
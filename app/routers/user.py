@@ -1,25 +1,124 @@
-from fastapi import APIRouter, Depends, Query
+import csv
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.db.database import get_db
+from typing import List, Optional, Union
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_async_db, get_db, read_session
+from app.db.routing import DBRoute
+from app.core.config import JSON_FAST_PATH
+from app.core.security import require_permission
+from app.model.user import User
+from app.schemas.pagination import CursorPage
 from app.schemas.user import UserResponse
-from app.services import user as user_service
+from app.services import list_counts, user as user_service, user_export, user_import
+from app.utils import fast_json
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(prefix="/users", tags=["users"], route_class=DBRoute)
 
-@router.get("", response_model=List[UserResponse])
-def list_users(
+# JSON_FAST_PATH: select cột + TypeAdapter dựng sẵn thay cho ORM object + response_model
+users_json = fast_json.RowSerializer(User, UserResponse) if JSON_FAST_PATH else None
+
+FIELDS_DESCRIPTION = "Comma-separated fields to return (and select), e.g. id,email,name"
+
+
+def _serializer(fields: Optional[str]) -> Optional[fast_json.RowSerializer]:
+    try:
+        return fast_json.serializer_for(User, UserResponse, fields, default=users_json)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("", response_model=Union[List[UserResponse], CursorPage[UserResponse]], dependencies=[Depends(require_permission("user", "read"))])
+async def list_users(
+    response: Response,
     page: int = Query(1, ge=1),
     page_size: int = Query(100, ge=1, le=1000),
     search: Optional[str] = Query(None),
     is_active: Optional[bool] = Query(None),
-    db: Session = Depends(get_db)
+    count: Optional[str] = Query(None, pattern="^(exact|estimated|cached)$", description="Also return the total in X-Total-Count"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor; \"\" for the first page. Returns {items, next_cursor}"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """List all users who have logged in to the system"""
-    return user_service.get_logged_in_users(
-        db, 
-        page=page, 
+    serializer = _serializer(fields)
+    columns = serializer.columns if serializer else None
+    if count:
+        # Chỉ đếm được theo bộ lọc cột; search dùng index riêng, không có count rẻ
+        if search:
+            raise HTTPException(status_code=400, detail="count cannot be combined with search")
+        response.headers.update(list_counts.count_headers(await db.run_sync(user_service.count_users, count, is_active=is_active), count))
+    if cursor is not None:
+        # Kết quả search xếp theo độ liên quan, không có sort key ổn định cho cursor
+        if search:
+            raise HTTPException(status_code=400, detail="cursor cannot be combined with search")
+        try:
+            items, next_cursor = await db.run_sync(user_service.get_users_page, cursor, page_size, is_active=is_active, columns=columns)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if serializer:
+            return serializer.page_response(response, items, next_cursor)
+        return CursorPage(items=items, next_cursor=next_cursor)
+    users = await db.run_sync(user_service.get_logged_in_users, page=page, 
         page_size=page_size, 
         search=search, 
-        is_active=is_active
+        is_active=is_active,
+        columns=columns
     )
+    if serializer:
+        return serializer.list_response(response, users)
+    return users
+
+
+# Khai báo trước /{user_id}, không thì "export" bị match làm user_id
+@router.get("/export", response_class=StreamingResponse, dependencies=[Depends(require_permission("user", "read"))])
+async def export_users(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(csv|ndjson)$"),
+    search: Optional[str] = Query(None),
+    is_active: Optional[bool] = Query(None),
+    include_roles: bool = Query(False, description="Embed each user's roles"),
+):
+    """Stream every matching user as NDJSON or CSV, ordered by id, in constant memory"""
+    # Session mở trong lúc stream: DBRoute đóng session inject ngay khi endpoint trả về
+    body = user_export.stream_users(
+        read_session(request), format, search=search, is_active=is_active, include_roles=include_roles
+    )
+    return StreamingResponse(body, media_type=user_export.MEDIA_TYPES[format], headers={
+        "Content-Disposition": f'attachment; filename="users.{format}"',
+    })
+
+
+@router.get("/{user_id}", response_model=UserResponse, dependencies=[Depends(require_permission("user", "read"))])
+async def get_user(
+    user_id: int,
+    response: Response,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a user by ID"""
+    serializer = _serializer(fields)
+    user = await db.run_sync(user_service.get_user_by_id, user_id, columns=serializer.columns if serializer else None)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    if serializer:
+        return serializer.one_response(response, user)
+    return user
+
+
+@router.post("/import", dependencies=[Depends(require_permission("user", "write"))])
+def import_users(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    db: Session = Depends(get_db)
+):
+    """Bulk-create users from a CSV or NDJSON upload (UserCreate fields), streamed in batches"""
+    fmt = format or ("ndjson" if (file.filename or "").endswith((".ndjson", ".jsonl")) else "csv")
+    try:
+        report = user_import.import_users(db, user_import.iter_rows(file.file, fmt))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="File must be UTF-8 encoded")
+    except csv.Error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid CSV: {e}")
+    return report.as_dict()
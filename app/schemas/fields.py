@@ -0,0 +1,94 @@
+"""
+Sparse fieldsets: `?fields=id,email,name` chỉ trả (và chỉ select) các field được chọn.
+
+- Tên field theo response schema. Field của model lồng chọn bằng dấu chấm
+  (`attribute.name`); chọn tên model lồng (`attribute`) là lấy cả model.
+- parse_fields() chuẩn hoá thành tuple theo thứ tự field của schema (dùng làm
+  key cache), project() dựng schema con tương ứng, cache theo bộ field.
+- Service dựa vào tuple này để select đúng cột (xem app.utils.fast_json).
+"""
+from functools import lru_cache
+from typing import Dict, Optional, Tuple, Type
+
+from pydantic import BaseModel, ConfigDict, create_model
+
+
+def _nested_model(schema: Type[BaseModel], name: str) -> Optional[Type[BaseModel]]:
+    annotation = schema.model_fields[name].annotation
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    return None
+
+
+def _group(fields: Tuple[str, ...]) -> Dict[str, Optional[Tuple[str, ...]]]:
+    # {"attribute": ("name",), "value": None}: None = lấy cả field
+    groups: Dict[str, Optional[Tuple[str, ...]]] = {}
+    for field in fields:
+        name, _, rest = field.partition(".")
+        if not rest or groups.get(name, ()) is None:
+            groups[name] = None
+        else:
+            groups[name] = groups.get(name, ()) + (rest,)
+    return groups
+
+
+def parse_fields(schema: Type[BaseModel], fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    '?fields=' value -> canonical tuple of field names in schema order.
+
+    None when no fields were asked for. Raises ValueError for a field the
+    schema does not have.
+    """
+    requested = [f.strip() for f in (fields or "").split(",") if f.strip()]
+    if not requested:
+        return None
+    return _canonical(schema, _group(tuple(requested)))
+
+
+def _canonical(schema: Type[BaseModel], groups: Dict[str, Optional[Tuple[str, ...]]]) -> Tuple[str, ...]:
+    unknown = [name for name in groups if name not in schema.model_fields]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    result = []
+    for name in schema.model_fields:
+        if name not in groups:
+            continue
+        sub = groups[name]
+        if sub is None:
+            result.append(name)
+            continue
+        nested = _nested_model(schema, name)
+        if nested is None:
+            raise ValueError(f"Field {name} has no sub-fields")
+        result.extend(f"{name}.{f}" for f in _canonical(nested, _group(sub)))
+    return tuple(result)
+
+
+def top_level(fields: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Names selected on the schema itself (nested models excluded)"""
+    return tuple(f for f in fields if "." not in f)
+
+
+def nested(fields: Tuple[str, ...], name: str) -> Optional[Tuple[str, ...]]:
+    """Sub-fields asked for inside `name`: None = the whole model, () = not asked for"""
+    if name in fields:
+        return None
+    prefix = f"{name}."
+    return tuple(f[len(prefix):] for f in fields if f.startswith(prefix))
+
+
+@lru_cache(maxsize=256)
+def project(schema: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """Schema with only `fields` (as returned by parse_fields), same types and defaults"""
+    definitions = {}
+    for name, sub in _group(fields).items():
+        info = schema.model_fields[name]
+        if sub is None:
+            definitions[name] = (info.annotation, info)
+        else:
+            definitions[name] = (project(_nested_model(schema, name), sub), ...)
+    return create_model(
+        f"{schema.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **definitions,
+    )
@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+from typing import Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class CursorPage(BaseModel, Generic[T]):
+    """Envelope returned by list endpoints when `cursor` is given ("" for the first page)"""
+    items: List[T]
+    next_cursor: Optional[str] = None
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Optional, List, Literal
 from datetime import datetime
 
 # Role Schemas
@@ -10,13 +10,14 @@ class RoleBase(BaseModel):
     is_active: bool = True
 
 class RoleCreate(RoleBase):
-    pass
+    parent_ids: List[int] = []  # Roles whose permissions this role inherits
 
 class RoleUpdate(BaseModel):
     name: Optional[str] = None
     display_name: Optional[str] = None
     description: Optional[str] = None
     is_active: Optional[bool] = None
+    parent_ids: Optional[List[int]] = None
 
 class RoleResponse(RoleBase):
     id: int
@@ -90,6 +91,20 @@ class RolePermissionAssignment(BaseModel):
     role_id: int
     permission_ids: List[int]
 
+class BulkUserRoleAssignment(BaseModel):
+    user_ids: List[int]
+    role_ids: List[int]
+    mode: Literal["add", "replace", "remove"] = "add"
+
+class BulkAssignmentResult(BaseModel):
+    users_processed: int
+    missing_user_ids: List[int] = []
+    rows_added: int
+    rows_removed: int
+
+class RoleParentAssignment(BaseModel):
+    parent_ids: List[int]
+
 # User with roles
 class UserWithRoles(BaseModel):
     id: int
@@ -109,7 +124,9 @@ class RoleWithPermissions(BaseModel):
     description: Optional[str] = None
     is_active: bool
     is_system: bool
-    permissions: List[PermissionResponse] = []
+    parent_ids: List[int] = []
+    permissions: List[PermissionResponse] = []  # Assigned directly to the role
+    inherited_permissions: List[PermissionResponse] = []  # Inherited from ancestor roles
     
     class Config:
         from_attributes = True
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import List, Optional
 from datetime import date, datetime
 
 class UserResponse(BaseModel):
@@ -22,6 +22,14 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class UserRoleRef(BaseModel):
+    id: int
+    name: str
+
+class UserWithRoles(UserResponse):
+    """Export row with the user's roles embedded (GET /users/export?include_roles=true)"""
+    roles: List[UserRoleRef] = []
+
 class TokenResponse(BaseModel):
     access_token: str
     token_type: str = "bearer"
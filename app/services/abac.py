@@ -1,12 +1,16 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, load_only
 from sqlalchemy import and_, or_
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Sequence, Tuple
 from datetime import datetime
 import json
 import re
 
 from app.model.abac import Policy, PolicyAssignment, Attribute, UserAttribute, ResourceAttribute, AccessLog
 from app.model.user import User
+from app.services import list_counts
+from app.schemas.fields import nested, top_level
+from app.utils.fast_json import as_dicts, with_columns
+from app.utils.pagination import keyset_paginate
 from app.schemas.abac import (
     PolicyCreate, PolicyUpdate, PolicyAssignmentCreate, AttributeCreate, 
     UserAttributeCreate, ResourceAttributeCreate, AuthorizationRequest, AuthorizationResponse
@@ -30,6 +34,17 @@ def get_all_policies(db: Session, page: int = 1, page_size: int = 100) -> List[P
     skip = (page - 1) * page_size
     return db.query(Policy).order_by(Policy.priority.asc()).offset(skip).limit(page_size).all()
 
+def get_policies_page(db: Session, cursor: Optional[str], limit: int = 100, active_only: bool = False) -> Tuple[List[Policy], Optional[str]]:
+    """Keyset page of policies ordered by (priority, id)"""
+    query = db.query(Policy)
+    if active_only:
+        query = query.filter(Policy.is_active == True)
+    return keyset_paginate(query, [Policy.priority, Policy.id], cursor, limit)
+
+def count_policies(db: Session, mode: str, active_only: bool = False) -> int:
+    """Total for list_policies (see app.services.list_counts for the modes)"""
+    return list_counts.count_rows(db, Policy, mode, is_active=True if active_only else None)
+
 def get_active_policies(db: Session) -> List[Policy]:
     """Get all active policies ordered by priority"""
     return db.query(Policy).filter(Policy.is_active == True).order_by(Policy.priority.asc()).all()
@@ -40,7 +55,11 @@ def update_policy(db: Session, policy_id: int, policy_data: PolicyUpdate) -> Opt
     if not policy:
         return None
     
-    for key, value in policy_data.dict(exclude_unset=True).items():
+    updates = policy_data.dict(exclude_unset=True)
+    # priority là sort key (NOT NULL): null nghĩa là giữ nguyên
+    if updates.get("priority", 0) is None:
+        del updates["priority"]
+    for key, value in updates.items():
         setattr(policy, key, value)
     
     db.commit()
@@ -119,6 +138,13 @@ def get_all_attributes(db: Session, skip: int = 0, limit: int = 100) -> List[Att
     """Get all attributes with pagination"""
     return db.query(Attribute).offset(skip).limit(limit).all()
 
+def get_attributes_page(db: Session, cursor: Optional[str], limit: int = 100, data_type: Optional[str] = None) -> Tuple[List[Attribute], Optional[str]]:
+    """Keyset page of attributes ordered by id"""
+    query = db.query(Attribute)
+    if data_type:
+        query = query.filter(Attribute.data_type == data_type)
+    return keyset_paginate(query, [Attribute.id], cursor, limit)
+
 def get_attributes_by_type(db: Session, data_type: str) -> List[Attribute]:
     """Get attributes by data type"""
     return db.query(Attribute).filter(Attribute.data_type == data_type).all()
@@ -151,9 +177,22 @@ def set_user_attribute(db: Session, user_id: int, attribute_name: str, value: st
         db.refresh(user_attribute)
         return user_attribute
 
-def get_user_attributes(db: Session, user_id: int) -> List[UserAttribute]:
-    """Get all attributes for a user"""
-    return db.query(UserAttribute).filter(UserAttribute.user_id == user_id).all()
+def get_user_attributes(db: Session, user_id: int, fields: Optional[Tuple[str, ...]] = None) -> List[UserAttribute]:
+    """Get all attributes for a user, loading only `fields` (app.schemas.fields) when given"""
+    query = db.query(UserAttribute).filter(UserAttribute.user_id == user_id)
+    if fields is None:
+        # Nạp attribute cùng query: response_model đọc nó sau khi session đã đóng
+        return query.options(joinedload(UserAttribute.attribute)).all()
+
+    own = [getattr(UserAttribute, name) for name in top_level(fields) if name != "attribute"]
+    options = [load_only(*own or [UserAttribute.id])]
+    attribute_fields = nested(fields, "attribute")
+    if attribute_fields is None:
+        options.append(joinedload(UserAttribute.attribute))
+    elif attribute_fields:
+        options.append(joinedload(UserAttribute.attribute).load_only(*[getattr(Attribute, name) for name in attribute_fields]))
+    # Không chọn field nào của attribute thì không join bảng attributes
+    return query.options(*options).all()
 
 def get_user_attribute_value(db: Session, user_id: int, attribute_name: str) -> Optional[str]:
     """Get specific user attribute value"""
@@ -353,10 +392,26 @@ def log_access(db: Session, request: AuthorizationRequest, decision: str, policy
     db.refresh(access_log)
     return access_log
 
-def get_access_logs(db: Session, user_id: Optional[int] = None, skip: int = 0, limit: int = 100) -> List[AccessLog]:
-    """Get access logs with optional user filter"""
-    query = db.query(AccessLog)
+def get_access_logs(db: Session, user_id: Optional[int] = None, skip: int = 0, limit: int = 100,
+                    columns: Optional[Sequence] = None) -> List[AccessLog]:
+    """Get access logs with optional user filter (dicts of `columns` instead of AccessLog objects when given)"""
+    query = db.query(*columns) if columns else db.query(AccessLog)
     if user_id:
         query = query.filter(AccessLog.user_id == user_id)
     
-    return query.order_by(AccessLog.created_at.desc()).offset(skip).limit(limit).all()
+    rows = query.order_by(AccessLog.created_at.desc()).offset(skip).limit(limit).all()
+    return as_dicts(rows) if columns else rows
+
+def count_access_logs(db: Session, mode: str, user_id: Optional[int] = None) -> int:
+    """Total for get_access_logs (see app.services.list_counts for the modes)"""
+    return list_counts.count_rows(db, AccessLog, mode, user_id=user_id or None)
+
+def get_access_logs_page(db: Session, cursor: Optional[str], limit: int = 100, user_id: Optional[int] = None,
+                         columns: Optional[Sequence] = None) -> Tuple[List[AccessLog], Optional[str]]:
+    """Keyset page of access logs, newest first"""
+    keys = [AccessLog.created_at, AccessLog.id]
+    query = db.query(*with_columns(columns, keys)) if columns else db.query(AccessLog)
+    if user_id:
+        query = query.filter(AccessLog.user_id == user_id)
+    items, next_cursor = keyset_paginate(query, keys, cursor, limit, descending=True)
+    return (as_dicts(items) if columns else items), next_cursor
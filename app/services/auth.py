@@ -1,10 +1,9 @@
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.utils.security import hash_password, verify_password
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
-from app.core.token import verify_token
-from app.db.database import get_db
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+from app.core import hashing
+from app.services import login_tracker
+from app.utils.security import hash_password, verify_and_update_password
+from app.core.security import get_current_user  # noqa: F401 (giữ import cũ cho router)
 
 
 def get_user_by_email(db: Session, email: str):
@@ -14,28 +13,52 @@ def get_user_by_email(db: Session, email: str):
 
 def authenticate_user(db: Session, email: str, password: str):
     from app.model.user import User
-    from datetime import datetime
     
     user = db.query(User).filter(User.email == email).first()
     if not user:
         return False
-    if not verify_password(password, user.password_hash):
+    ok, new_hash = verify_and_update_password(password, user.password_hash)
+    if not ok:
         return False
     
-    # Update last login time
-    user.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(user)
-    
+    return _record_login(db, user, new_hash)
+
+
+def _record_login(db: Session, user, new_hash=None):
+    # Hash dùng scheme/cost cũ: hash lại bằng cấu hình hiện tại (chỉ làm được lúc có password gốc).
+    # Đây là lần ghi DB duy nhất có thể xảy ra khi login, và chỉ một lần cho mỗi user.
+    if new_hash:
+        user.password_hash = new_hash
+        db.commit()
+    # last_login_at được ghi trễ theo lô, login không mở transaction ghi
+    login_tracker.record_login(user.id)
+    return user
+
+
+async def authenticate_user_async(db: AsyncSession, email: str, password: str):
+    """authenticate_user cho route async: bcrypt chạy trong hash executor, DB qua AsyncSession"""
+    user = await db.run_sync(get_user_by_email, email)
+    if not user:
+        return False
+    ok, new_hash = await hashing.verify_and_update_password(password, user.password_hash)
+    if not ok:
+        return False
+    if new_hash:
+        return await db.run_sync(_record_login, user, new_hash)
+    login_tracker.record_login(user.id)
     return user
 
 
 # app/services/auth.py
 def create_user(db: Session, email: str, password: str, name: str, dob=None, gender=None, phone_number=None, avatar_url=None):
+    return create_user_with_hash(db, email, hash_password(password), name, dob, gender, phone_number, avatar_url)
+
+
+def create_user_with_hash(db: Session, email: str, password_hash: str, name: str, dob=None, gender=None, phone_number=None, avatar_url=None):
     from app.model.user import User
     user = User(
         email=email,
-        password_hash=hash_password(password),
+        password_hash=password_hash,
         name=name,
         dob=dob,
         gender=gender,
@@ -48,9 +71,73 @@ def create_user(db: Session, email: str, password: str, name: str, dob=None, gen
     return user
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    user = verify_token(token, db)
-    if user is None:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    return user
+async def create_user_async(db: AsyncSession, email: str, password: str, name: str, **fields):
+    """create_user cho route async: hash trong hash executor, insert qua AsyncSession"""
+    password_hash = await hashing.hash_password(password)
+    return await db.run_sync(create_user_with_hash, email, password_hash, name, **fields)
+
+
+# Refresh token rotation
+def _token_expiry(payload: dict):
+    from datetime import datetime
+    return datetime.utcfromtimestamp(payload["exp"])
+
+
+def rotate_refresh_token(db: Session, token: str):
+    """
+    Đổi refresh token lấy token mới cùng family; trả về (user_id, family_id) hoặc None.
+    Dùng lại một refresh token đã xoay vòng = token bị lộ -> thu hồi cả family.
+    User đã bị xoá / khoá: không cấp token mới, thu hồi cả family.
+    """
+    from datetime import datetime, timedelta
+    from jose import JWTError
+    from app.core.config import REFRESH_TOKEN_EXPIRE_DAYS
+    from app.services import principal_cache, token_revocation
+    from app.utils.security import decode_token
+
+    try:
+        payload = decode_token(token)
+    except JWTError:
+        return None
+    user_sub, jti, family_id = payload.get("sub"), payload.get("jti"), payload.get("fam")
+    # Token cũ (trước khi có jti/fam) không thể xoay vòng an toàn -> bắt login lại
+    if payload.get("typ") != "refresh" or not (user_sub and jti and family_id):
+        return None
+    if token_revocation.is_revoked(token_revocation.family_key(family_id)):
+        return None
+
+    user_id = int(user_sub)
+    family_expires_at = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    principal = principal_cache.get_principal(db, user_id)
+    if principal is None or not principal.is_active:
+        token_revocation.revoke(db, token_revocation.family_key(family_id), "user_inactive", family_expires_at, user_id)
+        return None
+
+    # Insert unique trên jti là điểm phân xử: chỉ một request được xoay vòng token này
+    if token_revocation.is_revoked(jti) or not token_revocation.revoke(
+        db, jti, "rotated", _token_expiry(payload), user_id
+    ):
+        token_revocation.revoke(db, token_revocation.family_key(family_id), "reuse_detected", family_expires_at, user_id)
+        return None
+    return user_id, family_id
+
+
+def revoke_session(db: Session, access_payload: dict, refresh_token: str = None) -> None:
+    """Logout: thu hồi access token hiện tại và cả family của refresh token (nếu có)"""
+    from jose import JWTError
+    from app.services import token_revocation
+    from app.utils.security import decode_token
+
+    user_id = int(access_payload["sub"])
+    if access_payload.get("jti"):
+        token_revocation.revoke(db, access_payload["jti"], "logout", _token_expiry(access_payload), user_id)
 
+    if refresh_token:
+        try:
+            payload = decode_token(refresh_token)
+        except JWTError:
+            return
+        if payload.get("typ") == "refresh" and payload.get("fam") and payload.get("sub") == access_payload["sub"]:
+            token_revocation.revoke(
+                db, token_revocation.family_key(payload["fam"]), "logout", _token_expiry(payload), user_id
+            )
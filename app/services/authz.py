@@ -0,0 +1,175 @@
+import base64
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core import events, metrics
+from app.core.config import JWT_AUTHZ_MAX_PERMISSION_ID, RBAC_REVISION_TTL_SECONDS
+from app.model.rbac import Permission
+from app.services import permission_cache
+from app.services.rbac import get_rbac_revision
+
+# Token claims are trusted only while their "rev" equals the revision held
+# here. Every worker updates it from bus messages, and re-reads it from the
+# database once it is RBAC_REVISION_TTL_SECONDS old, so a lost message is
+# not trusted for longer than that. None means unknown (startup, or the bus
+# reconnected).
+_current_revision: Optional[int] = None
+_revision_expires_at = 0.0
+_catalog: Dict[Tuple[str, str], int] = {}
+_catalog_revision: Optional[int] = None
+_lock = threading.Lock()
+
+_token_hits = metrics.counter("authz.token_claims_used")
+_token_stale = metrics.counter("authz.token_claims_stale")
+
+
+class AuthzContext(NamedTuple):
+    """Roles and permissions of the caller, resolved from the token or the database"""
+    user_id: int
+    role_ids: FrozenSet[int]
+    permission_ids: FrozenSet[int]
+    revision: Optional[int]
+    from_token: bool
+
+
+# Bit-packing of permission ids: bit N set <=> permission id N granted
+def pack_ids(ids: Iterable[int], max_id: Optional[int] = None) -> Optional[str]:
+    """Packed ids, or None if one is above max_id (the token would grow with the largest id)"""
+    if max_id is None:
+        max_id = JWT_AUTHZ_MAX_PERMISSION_ID
+    bits = 0
+    for i in ids:
+        if i > max_id:
+            return None
+        bits |= 1 << i
+    raw = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+@lru_cache(maxsize=4096)
+def unpack_ids(packed: str) -> FrozenSet[int]:
+    raw = base64.urlsafe_b64decode(packed + "=" * (-len(packed) % 4))
+    bits = int.from_bytes(raw, "little")
+    ids = []
+    index = 0
+    while bits:
+        if bits & 1:
+            ids.append(index)
+        bits >>= 1
+        index += 1
+    return frozenset(ids)
+
+
+# Revision tracking
+def current_revision() -> Optional[int]:
+    """Revision held in memory, without touching the database (None if unknown or expired)"""
+    if time.monotonic() >= _revision_expires_at:
+        return None
+    return _current_revision
+
+
+def _set_revision(revision: Optional[int]) -> None:
+    global _current_revision, _revision_expires_at
+    _current_revision = revision
+    _revision_expires_at = time.monotonic() + RBAC_REVISION_TTL_SECONDS
+
+
+def get_current_revision(db: Session) -> int:
+    revision = current_revision()
+    if revision is None:
+        revision = get_rbac_revision(db)
+        with _lock:
+            _set_revision(revision)
+    return revision
+
+
+def _on_event(message: events.Message) -> None:
+    kind = message.get("type")
+    if kind == "reset":
+        with _lock:
+            _set_revision(None)
+    elif kind in ("rbac.all", "rbac.users") and message.get("revision") is not None:
+        with _lock:
+            if _current_revision is None or message["revision"] > _current_revision:
+                _set_revision(message["revision"])
+
+
+events.subscribe(_on_event)
+
+
+def get_permission_catalog(db: Session) -> Dict[Tuple[str, str], int]:
+    """Map (resource, action) to permission id, reloaded when the revision changes"""
+    global _catalog, _catalog_revision
+    revision = get_current_revision(db)
+    if _catalog_revision != revision:
+        rows = db.execute(select(Permission.resource, Permission.action, Permission.id)).all()
+        _catalog = {(r.resource, r.action): r.id for r in rows}
+        _catalog_revision = revision
+    return _catalog
+
+
+# Token claims
+def build_authz_claims(db: Session, user_id: int) -> dict:
+    """Compact role/permission claims for an access token ({} if the ids are too large to pack).
+
+    The revision is read before the permissions, so a change racing the
+    login can only make the token look stale, never fresh with old data.
+    """
+    revision = get_rbac_revision(db)
+    authz = permission_cache.load_user_authz(db, user_id)
+    packed = pack_ids(authz.permission_ids)
+    if packed is None:
+        # No claims: requests resolve the permissions from the cache / database
+        return {}
+    return {
+        "rev": revision,
+        "roles": sorted(authz.role_ids),
+        "perms": packed,
+    }
+
+
+def resolve_authz_from_token(user_id: int, payload: dict) -> Optional[AuthzContext]:
+    """Authorize from token claims alone; None if they are missing or stale (no I/O)"""
+    revision = payload.get("rev")
+    if revision is None or "perms" not in payload:
+        return None
+    if revision != current_revision():
+        return None
+    _token_hits.inc()
+    return AuthzContext(
+        user_id=user_id,
+        role_ids=frozenset(payload.get("roles", ())),
+        permission_ids=unpack_ids(payload["perms"]),
+        revision=revision,
+        from_token=True
+    )
+
+
+def resolve_authz(db: Session, user_id: int, payload: dict) -> AuthzContext:
+    """Authorize from token claims when their revision is current, else from the cache/database"""
+    get_current_revision(db)
+    context = resolve_authz_from_token(user_id, payload)
+    if context is not None:
+        return context
+
+    if payload.get("rev") is not None:
+        _token_stale.inc()
+    current = get_current_revision(db)
+    authz = permission_cache.get_user_authz(db, user_id)
+    return AuthzContext(
+        user_id=user_id,
+        role_ids=authz.role_ids,
+        permission_ids=authz.permission_ids,
+        revision=current,
+        from_token=False
+    )
+
+
+def context_has_permission(db: Session, context: AuthzContext, resource: str, action: str) -> bool:
+    permission_id = get_permission_catalog(db).get((resource, action))
+    return permission_id is not None and permission_id in context.permission_ids
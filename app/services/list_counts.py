@@ -0,0 +1,114 @@
+"""
+Tổng số dòng cho list endpoint (trả qua header X-Total-Count, body giữ nguyên).
+
+- exact: COUNT(*) trên tập đã lọc.
+- estimated: Postgres dùng ước lượng của planner: pg_class.reltuples khi không
+  lọc, "Plan Rows" của EXPLAIN khi có lọc. DB khác thì như exact.
+- cached: COUNT(*) lần đầu, cache theo (bảng, bộ lọc) trong COUNT_CACHE_TTL_SECONDS.
+  Insert/delete qua ORM trong worker này cộng/trừ thẳng vào các entry đang cache;
+  ghi từ worker khác, bulk insert (import) hay update cột lọc chỉ thấy sau khi hết TTL.
+
+Bộ lọc chỉ là so sánh bằng trên cột (is_active, user_id...), nên một dòng
+mới/bị xoá khớp bộ lọc nào thì kiểm tra được ngay trong RAM.
+"""
+import json
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import event, func, select, text
+from sqlalchemy.orm import Session
+
+from app.core.config import COUNT_CACHE_TTL_SECONDS, COUNT_CACHE_MAX_KEYS
+from app.utils.cache import TTLCache
+
+COUNT_MODES = ("exact", "estimated", "cached")
+
+# key: (tên bảng, ((cột, giá trị), ...)) -> số dòng
+_cache = TTLCache("list_counts", maxsize=COUNT_CACHE_MAX_KEYS, ttl=COUNT_CACHE_TTL_SECONDS)
+
+
+def _filter_key(model, filters: Dict[str, Any]) -> Tuple[str, tuple]:
+    return model.__table__.name, tuple(sorted((k, v) for k, v in filters.items() if v is not None))
+
+
+def _exact(db: Session, model, filters: Dict[str, Any]) -> int:
+    query = select(func.count()).select_from(model.__table__)
+    for column, value in filters.items():
+        query = query.where(model.__table__.c[column] == value)
+    return db.scalar(query)
+
+
+def _estimated(db: Session, model, filters: Dict[str, Any]) -> int:
+    if db.get_bind().dialect.name != "postgresql":
+        return _exact(db, model, filters)
+    table = model.__table__
+    if not filters:
+        # reltuples = -1 khi bảng chưa từng được ANALYZE
+        estimate = db.scalar(text("SELECT reltuples FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+                             {"table": table.name})
+        if estimate is not None and estimate >= 0:
+            return int(estimate)
+    query = select(table.c.id)
+    for column, value in filters.items():
+        query = query.where(table.c[column] == value)
+    sql = str(query.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True}))
+    plan = db.connection().exec_driver_sql("EXPLAIN (FORMAT JSON) " + sql).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_rows(db: Session, model, mode: str, **filters: Any) -> int:
+    """Row count of `model` where every given column equals its value (None = not filtered)."""
+    filters = {k: v for k, v in filters.items() if v is not None}
+    if mode == "exact":
+        return _exact(db, model, filters)
+    if mode == "estimated":
+        return _estimated(db, model, filters)
+    if mode == "cached":
+        return _cache.get_or_load(_filter_key(model, filters), lambda: _exact(db, model, filters))
+    raise ValueError(f"Unsupported count mode: {mode}")
+
+
+def count_headers(count: int, mode: str) -> Dict[str, str]:
+    return {"X-Total-Count": str(count), "X-Total-Count-Mode": mode}
+
+
+def invalidate_all() -> None:
+    _cache.clear()
+
+
+# Cộng/trừ vào count đang cache: snapshot các dòng thêm/xoá lúc flush, áp dụng sau commit
+@event.listens_for(Session, "after_flush")
+def _collect_count_deltas(session: Session, flush_context) -> None:
+    keys = _cache.keys()
+    if not keys:
+        return
+    # Chỉ chụp các cột đang dùng làm bộ lọc của bảng đó
+    columns: Dict[str, set] = {}
+    for table, filters in keys:
+        columns.setdefault(table, set()).update(column for column, _ in filters)
+    deltas: List[Tuple[str, dict, int]] = session.info.setdefault("count_deltas", [])
+    for objects, delta in ((session.new, 1), (session.deleted, -1)):
+        for obj in objects:
+            table = getattr(obj, "__tablename__", None)
+            if table in columns:
+                row = {column: getattr(obj, column, None) for column in columns[table]}
+                deltas.append((table, row, delta))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_count_deltas(session: Session) -> None:
+    deltas = session.info.pop("count_deltas", None)
+    if not deltas:
+        return
+    for key in _cache.keys():
+        table, filters = key
+        change = sum(delta for row_table, row, delta in deltas
+                     if row_table == table and all(row.get(c) == v for c, v in filters))
+        if change:
+            _cache.update(key, lambda n: max(0, n + change))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_count_deltas(session: Session) -> None:
+    session.info.pop("count_deltas", None)
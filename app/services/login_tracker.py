@@ -0,0 +1,73 @@
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import bindparam, or_
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.db.database import get_session_local
+from app.model.user import User
+
+# Write-behind cho users.last_login_at: login chỉ ghi vào buffer trong RAM
+# (gộp theo user, giữ thời điểm mới nhất), một task nền flush theo lô.
+# Mất tối đa một chu kỳ flush nếu worker chết đột ngột; chấp nhận được
+# cho một trường thống kê.
+_lock = threading.Lock()
+_pending: Dict[int, datetime] = {}
+
+_flushed = metrics.counter("last_login.flushed")
+_flush_seconds = metrics.histogram("last_login.flush_seconds")
+metrics.gauge("last_login.buffered", func=lambda: len(_pending))
+
+_users = User.__table__
+_update_last_login = (
+    _users.update()
+    .where(_users.c.id == bindparam("b_id"))
+    # Không ghi đè bằng giá trị cũ hơn (worker khác có thể flush trước)
+    .where(or_(_users.c.last_login_at.is_(None), _users.c.last_login_at < bindparam("b_at")))
+    # Giữ nguyên updated_at: onupdate của model chỉ dành cho sửa hồ sơ
+    .values(last_login_at=bindparam("b_at"), updated_at=_users.c.updated_at)
+)
+
+
+def record_login(user_id: int, at: Optional[datetime] = None) -> None:
+    at = at or datetime.utcnow()
+    with _lock:
+        previous = _pending.get(user_id)
+        if previous is None or at > previous:
+            _pending[user_id] = at
+
+
+def flush(db: Session, batch_size: int = 1000) -> int:
+    """Write buffered logins in executemany batches; returns how many users were flushed"""
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+    if not pending:
+        return 0
+
+    started = time.monotonic()
+    items = list(pending.items())
+    try:
+        for i in range(0, len(items), batch_size):
+            db.execute(_update_last_login, [{"b_id": uid, "b_at": at} for uid, at in items[i:i + batch_size]])
+        db.commit()
+    except Exception:
+        db.rollback()
+        # Trả lại buffer để lần flush sau thử lại (giữ giá trị mới hơn nếu có login mới)
+        for user_id, at in items:
+            record_login(user_id, at)
+        raise
+    _flushed.inc(len(items))
+    _flush_seconds.observe(time.monotonic() - started)
+    return len(items)
+
+
+def flush_with_session() -> int:
+    db = get_session_local()()
+    try:
+        return flush(db)
+    finally:
+        db.close()
@@ -0,0 +1,68 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from typing import FrozenSet, NamedTuple, Tuple
+
+from app.core import events
+from app.core.config import PERMISSION_CACHE_TTL_SECONDS, PERMISSION_CACHE_MAX_USERS
+from app.model.rbac import Permission, role_closure, user_roles
+from app.services.rbac import select_user_permission_ids
+from app.utils.cache import TTLCache
+
+
+class UserAuthz(NamedTuple):
+    """Effective RBAC data of one user, as cached per worker"""
+    role_ids: FrozenSet[int]  # Directly assigned roles
+    effective_role_ids: FrozenSet[int]  # Assigned roles plus everything they inherit from
+    permission_ids: FrozenSet[int]
+    permissions: FrozenSet[Tuple[str, str]]  # (resource, action)
+
+
+_cache = TTLCache("permissions", maxsize=PERMISSION_CACHE_MAX_USERS, ttl=PERMISSION_CACHE_TTL_SECONDS)
+
+
+def load_user_authz(db: Session, user_id: int) -> UserAuthz:
+    """Compute a user's effective roles and permissions from the database"""
+    role_ids = frozenset(db.scalars(select(user_roles.c.role_id).where(user_roles.c.user_id == user_id)))
+    effective_role_ids = frozenset(db.scalars(
+        select(role_closure.c.ancestor_id).where(role_closure.c.descendant_id.in_(role_ids))
+    )) if role_ids else frozenset()
+    rows = db.execute(
+        select(Permission.id, Permission.resource, Permission.action)
+        .where(Permission.id.in_(select_user_permission_ids(user_id)))
+    ).all()
+    return UserAuthz(
+        role_ids=role_ids,
+        effective_role_ids=effective_role_ids,
+        permission_ids=frozenset(r.id for r in rows),
+        permissions=frozenset((r.resource, r.action) for r in rows)
+    )
+
+
+def get_user_authz(db: Session, user_id: int) -> UserAuthz:
+    """Get a user's effective roles and permissions, from the worker cache if present"""
+    return _cache.get_or_load(user_id, lambda: load_user_authz(db, user_id))
+
+
+def has_permission(db: Session, user_id: int, resource: str, action: str) -> bool:
+    """Check a permission against the cached effective permission set"""
+    return (resource, action) in get_user_authz(db, user_id).permissions
+
+
+def invalidate_user(user_id: int) -> None:
+    _cache.pop(user_id)
+
+
+def invalidate_all() -> None:
+    _cache.clear()
+
+
+def _on_event(message: events.Message) -> None:
+    kind = message.get("type")
+    if kind == "rbac.users":
+        for user_id in message.get("user_ids", []):
+            invalidate_user(user_id)
+    elif kind in ("rbac.all", "reset"):
+        invalidate_all()
+
+
+events.subscribe(_on_event)
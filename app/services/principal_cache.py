@@ -0,0 +1,93 @@
+from datetime import date, datetime
+from typing import NamedTuple, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core import events
+from app.core.config import PRINCIPAL_CACHE_TTL_SECONDS, PRINCIPAL_CACHE_MAX_USERS
+from app.model.user import User
+from app.utils.cache import TTLCache
+
+
+class UserPrincipal(NamedTuple):
+    """Lightweight snapshot of an authenticated user (no password hash, no relationships)"""
+    id: int
+    email: str
+    name: Optional[str]
+    dob: Optional[date]
+    gender: Optional[str]
+    phone_number: Optional[str]
+    avatar_url: Optional[str]
+    is_verified: bool
+    is_active: bool
+    department: Optional[str]
+    position: Optional[str]
+    location: Optional[str]
+    clearance_level: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+
+_COLUMNS = [getattr(User, field) for field in UserPrincipal._fields]
+
+_cache = TTLCache("principals", maxsize=PRINCIPAL_CACHE_MAX_USERS, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+
+# Above this many users a change is broadcast as "everyone" (NOTIFY payload limit)
+MAX_INVALIDATION_USER_IDS = 500
+
+
+def load_principal(db: Session, user_id: int) -> Optional[UserPrincipal]:
+    """Read a user snapshot from the database (column select, no ORM identity map)"""
+    row = db.execute(
+        User.__table__.select().with_only_columns(*_COLUMNS).where(User.id == user_id)
+    ).first()
+    if row is None:
+        return None
+    return UserPrincipal(*row)
+
+
+def get_cached_principal(user_id: int) -> Optional[UserPrincipal]:
+    """Snapshot from the worker cache only; None on a miss (no I/O)"""
+    return _cache.get(user_id)
+
+
+def get_principal(db: Session, user_id: int) -> Optional[UserPrincipal]:
+    """Snapshot from the worker cache, loaded from the database on a miss"""
+    # Không cache user không tồn tại
+    return _cache.get_or_load(user_id, lambda: load_principal(db, user_id), cache_none=False)
+
+
+def invalidate_user(user_id: int) -> None:
+    _cache.pop(user_id)
+
+
+def invalidate_all() -> None:
+    _cache.clear()
+
+
+def _on_event(message: events.Message) -> None:
+    kind = message.get("type")
+    if kind == "users.changed":
+        for user_id in message.get("user_ids", []):
+            invalidate_user(user_id)
+    elif kind in ("users.all", "reset"):
+        invalidate_all()
+
+
+events.subscribe(_on_event)
+
+
+# Invalidation: id các User bị sửa/xoá trong mỗi flush được publish trong cùng
+# transaction, nên worker khác chỉ xoá cache sau commit (xoá trước commit thì
+# có thể load lại dữ liệu cũ vào cache) và không xoá gì nếu rollback
+@event.listens_for(Session, "after_flush")
+def _publish_changed_users(session: Session, flush_context) -> None:
+    changed: Set[int] = {
+        obj.id for obj in list(session.dirty) + list(session.deleted)
+        if isinstance(obj, User) and obj.id is not None
+    }
+    if len(changed) > MAX_INVALIDATION_USER_IDS:
+        events.publish(session, {"type": "users.all"})
+    elif changed:
+        events.publish(session, {"type": "users.changed", "user_ids": sorted(changed)})
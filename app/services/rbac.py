@@ -1,15 +1,80 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from typing import List, Optional
-from app.model.rbac import Role, Permission, Resource, user_roles, role_permissions
+from sqlalchemy import and_, or_, select, exists, text, update
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from datetime import datetime
+from app.model.rbac import Role, Permission, Resource, RbacState, user_roles, role_permissions, role_parents, role_closure
 from app.model.user import User
+from app.core import events
+from app.utils.pagination import keyset_paginate
 from app.schemas.rbac import RoleCreate, RoleUpdate, PermissionCreate, PermissionUpdate, ResourceCreate, ResourceUpdate
 
+# Above this many users a change is broadcast as "everyone" (NOTIFY payload limit)
+MAX_INVALIDATION_USER_IDS = 500
+# Arbitrary constant shared by every worker: Postgres advisory lock for role hierarchy changes
+_HIERARCHY_LOCK_KEY = 7_310_026_001
+
+def get_rbac_revision(db: Session) -> int:
+    """Get the global RBAC revision (0 before the first change)"""
+    revision = db.scalar(select(RbacState.revision).where(RbacState.id == 1))
+    return revision or 0
+
+def bump_rbac_revision(db: Session) -> int:
+    """Increment the global RBAC revision in the current transaction (no commit); returns the new value.
+    
+    The row stays locked until the caller commits, so concurrent RBAC
+    changes are serialized and each commits with its own revision.
+    """
+    bump = update(RbacState).where(RbacState.id == 1).values(revision=RbacState.revision + 1)
+    if not db.execute(bump).rowcount:
+        # First change ever: create the row (another worker may race us to it)
+        db.execute(text("INSERT INTO rbac_state (id, revision) VALUES (1, 0) ON CONFLICT (id) DO NOTHING"))
+        db.execute(bump)
+    return get_rbac_revision(db)
+
+def _users_with_roles(db: Session, role_ids: Set[int]) -> Optional[List[int]]:
+    """Ids of the users holding any of the roles, or None (everyone) above MAX_INVALIDATION_USER_IDS"""
+    if not role_ids:
+        return []
+    user_ids = list(db.scalars(
+        select(user_roles.c.user_id).where(user_roles.c.role_id.in_(role_ids)).distinct()
+        .limit(MAX_INVALIDATION_USER_IDS + 1)
+    ))
+    return user_ids if len(user_ids) <= MAX_INVALIDATION_USER_IDS else None
+
+def _publish_role_change(db: Session, role_id: int) -> None:
+    """Publish a change to what a role grants: it reaches the users of the role and of every role inheriting from it"""
+    user_ids = _users_with_roles(db, get_role_descendant_ids(db, role_id) | {role_id})
+    if user_ids != []:
+        _publish_rbac_change(db, user_ids)
+
+def _publish_rbac_change(db: Session, user_ids: Optional[Iterable[int]] = None) -> None:
+    """Bump the RBAC revision and tell every worker to drop cached RBAC data
+    for some users, or for everyone. Call before committing the change: both
+    go out with its transaction."""
+    revision = bump_rbac_revision(db)
+    user_ids = list(user_ids) if user_ids is not None else None
+    if user_ids is None or len(user_ids) > MAX_INVALIDATION_USER_IDS:
+        events.publish(db, {"type": "rbac.all", "revision": revision})
+    else:
+        events.publish(db, {"type": "rbac.users", "user_ids": user_ids, "revision": revision})
+
 # Role Services
 def create_role(db: Session, role_data: RoleCreate) -> Role:
-    """Create a new role"""
-    role = Role(**role_data.dict())
+    """Create a new role, optionally inheriting from parent roles"""
+    parent_ids = set(role_data.parent_ids)
+    _ensure_roles_exist(db, parent_ids)
+    
+    role = Role(**role_data.dict(exclude={"parent_ids"}))
     db.add(role)
+    db.flush()
+    
+    if parent_ids:
+        # The parents' closure rows must not change while this role's rows are derived from them
+        _lock_role_hierarchy(db, role.id)
+        db.execute(role_parents.insert(), [{"role_id": role.id, "parent_id": p} for p in parent_ids])
+    _rebuild_role_closure(db, {role.id})
+    
+    # Nobody holds a new role yet: no RBAC revision bump
     db.commit()
     db.refresh(role)
     return role
@@ -26,15 +91,30 @@ def get_all_roles(db: Session, skip: int = 0, limit: int = 100) -> List[Role]:
     """Get all roles with pagination"""
     return db.query(Role).offset(skip).limit(limit).all()
 
+def get_roles_page(db: Session, cursor: Optional[str], limit: int = 100) -> Tuple[List[Role], Optional[str]]:
+    """Keyset page of roles ordered by id"""
+    return keyset_paginate(db.query(Role), [Role.id], cursor, limit)
+
 def update_role(db: Session, role_id: int, role_data: RoleUpdate) -> Optional[Role]:
     """Update role"""
     role = db.query(Role).filter(Role.id == role_id).first()
     if not role:
         return None
     
-    for key, value in role_data.dict(exclude_unset=True).items():
+    update_data = role_data.dict(exclude_unset=True)
+    parent_ids = update_data.pop("parent_ids", None)
+    for key, value in update_data.items():
         setattr(role, key, value)
     
+    # Name / description changes do not change anyone's grants
+    if parent_ids is not None:
+        try:
+            changed = _replace_role_parents(db, role_id, set(parent_ids))
+        except ValueError:
+            db.rollback()
+            raise
+        if changed:
+            _publish_role_change(db, role_id)
     db.commit()
     db.refresh(role)
     return role
@@ -45,15 +125,184 @@ def delete_role(db: Session, role_id: int) -> bool:
     if not role or role.is_system:
         return False
     
+    _lock_role_hierarchy(db, role_id)
+    # Its users and the children's users lose whatever they got through this role
+    descendant_ids = get_role_descendant_ids(db, role_id) - {role_id}
+    user_ids = _users_with_roles(db, descendant_ids | {role_id})
+    db.execute(role_parents.delete().where(
+        or_(role_parents.c.role_id == role_id, role_parents.c.parent_id == role_id)
+    ))
+    db.execute(role_closure.delete().where(
+        or_(role_closure.c.ancestor_id == role_id, role_closure.c.descendant_id == role_id)
+    ))
+    _rebuild_role_closure(db, descendant_ids)
+    
     db.delete(role)
+    if user_ids != []:
+        _publish_rbac_change(db, user_ids)
+    db.commit()
+    return True
+
+# Role Hierarchy Services
+def _ensure_roles_exist(db: Session, role_ids: Set[int]) -> None:
+    """Raise ValueError if any of the given role ids does not exist"""
+    if not role_ids:
+        return
+    found = set(db.scalars(select(Role.id).where(Role.id.in_(role_ids))))
+    missing = role_ids - found
+    if missing:
+        raise ValueError(f"Roles not found: {sorted(missing)}")
+
+def _lock_role_hierarchy(db: Session, role_id: Optional[int] = None) -> None:
+    """Serialize role hierarchy changes until commit.
+    
+    Without it two concurrent edges (A -> B, B -> A) both pass the cycle
+    check. Postgres takes a transaction-level advisory lock; on SQLite,
+    touching the role takes the database write lock, so the reads that
+    follow see every committed edge.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _HIERARCHY_LOCK_KEY})
+    if role_id is not None:
+        db.execute(update(Role).where(Role.id == role_id).values(updated_at=datetime.utcnow()))
+
+def _rebuild_role_closure(db: Session, role_ids: Set[int]) -> None:
+    """Recompute closure rows for the given roles from the role_parents edges.
+    
+    The set must be closed under descendants (a role's closure depends on
+    its parents' closure), which is what every caller passes. Only the
+    edges of these roles are read; parents outside the set keep their
+    closure rows, which are read instead of walking further up.
+    """
+    if not role_ids:
+        return
+    
+    parents: Dict[int, List[int]] = {}
+    for child_id, parent_id in db.execute(
+        select(role_parents.c.role_id, role_parents.c.parent_id).where(role_parents.c.role_id.in_(role_ids))
+    ):
+        parents.setdefault(child_id, []).append(parent_id)
+    
+    closures: Dict[int, Dict[int, int]] = {}
+    outside = {p for parent_ids in parents.values() for p in parent_ids} - role_ids
+    if outside:
+        for ancestor_id, descendant_id, depth in db.execute(
+            select(role_closure.c.ancestor_id, role_closure.c.descendant_id, role_closure.c.depth)
+            .where(role_closure.c.descendant_id.in_(outside))
+        ):
+            closures.setdefault(descendant_id, {})[ancestor_id] = depth
+    
+    def closure_of(role_id: int) -> Dict[int, int]:
+        # Shortest depth per ancestor: one more than the closest parent's
+        if role_id not in closures:
+            depths = {role_id: 0}
+            for parent_id in parents.get(role_id, ()):
+                for ancestor_id, depth in closure_of(parent_id).items():
+                    if depth + 1 < depths.get(ancestor_id, depth + 2):
+                        depths[ancestor_id] = depth + 1
+            closures[role_id] = depths
+        return closures[role_id]
+    
+    rows = [
+        {"ancestor_id": ancestor_id, "descendant_id": role_id, "depth": depth}
+        for role_id in role_ids
+        for ancestor_id, depth in closure_of(role_id).items()
+    ]
+    
+    db.execute(role_closure.delete().where(role_closure.c.descendant_id.in_(role_ids)))
+    db.execute(role_closure.insert(), rows)
+
+def rebuild_role_closure(db: Session) -> int:
+    """Rebuild the whole closure table, e.g. after importing roles; returns row count"""
+    _lock_role_hierarchy(db)
+    role_ids = set(db.scalars(select(Role.id)))
+    db.execute(role_closure.delete())
+    _rebuild_role_closure(db, role_ids)
+    _publish_rbac_change(db)
     db.commit()
+    return db.query(role_closure).count()
+
+def get_role_ancestor_ids(db: Session, role_id: int) -> Set[int]:
+    """Get ids of the role and every role it inherits from"""
+    return set(db.scalars(
+        select(role_closure.c.ancestor_id).where(role_closure.c.descendant_id == role_id)
+    ))
+
+def get_role_descendant_ids(db: Session, role_id: int) -> Set[int]:
+    """Get ids of the role and every role inheriting from it"""
+    return set(db.scalars(
+        select(role_closure.c.descendant_id).where(role_closure.c.ancestor_id == role_id)
+    ))
+
+def get_role_parent_ids(db: Session, role_id: int) -> List[int]:
+    """Get ids of the direct parents of a role"""
+    return list(db.scalars(
+        select(role_parents.c.parent_id).where(role_parents.c.role_id == role_id).order_by(role_parents.c.parent_id)
+    ))
+
+def _replace_role_parents(db: Session, role_id: int, parent_ids: Set[int]) -> bool:
+    """Replace the direct parents of a role, rejecting cycles (no commit); returns True if they changed"""
+    _ensure_roles_exist(db, parent_ids)
+    _lock_role_hierarchy(db, role_id)
+    
+    # A cycle appears if a new parent already inherits from this role
+    descendant_ids = get_role_descendant_ids(db, role_id) | {role_id}
+    cyclic = parent_ids & descendant_ids
+    if cyclic:
+        raise ValueError(f"Role hierarchy cycle: roles {sorted(cyclic)} already inherit from role {role_id}")
+    
+    current = set(get_role_parent_ids(db, role_id))
+    to_remove = current - parent_ids
+    to_add = parent_ids - current
+    if not to_add and not to_remove:
+        return False
+    
+    if to_remove:
+        db.execute(role_parents.delete().where(
+            and_(role_parents.c.role_id == role_id, role_parents.c.parent_id.in_(to_remove))
+        ))
+    if to_add:
+        db.execute(role_parents.insert(), [{"role_id": role_id, "parent_id": p} for p in to_add])
+    _rebuild_role_closure(db, descendant_ids)
     return True
 
+def set_role_parents(db: Session, role_id: int, parent_ids: List[int]) -> bool:
+    """Set the direct parents of a role; raises ValueError on unknown roles or cycles"""
+    role = db.query(Role).filter(Role.id == role_id).first()
+    if not role:
+        return False
+    
+    try:
+        changed = _replace_role_parents(db, role_id, set(parent_ids))
+    except ValueError:
+        db.rollback()
+        raise
+    if changed:
+        _publish_role_change(db, role_id)
+    db.commit()
+    return True
+
+def add_role_parent(db: Session, role_id: int, parent_id: int) -> bool:
+    """Make role inherit from parent; raises ValueError on unknown roles or cycles"""
+    role = db.query(Role).filter(Role.id == role_id).first()
+    if not role:
+        return False
+    return set_role_parents(db, role_id, get_role_parent_ids(db, role_id) + [parent_id])
+
+def remove_role_parent(db: Session, role_id: int, parent_id: int) -> bool:
+    """Stop role from inheriting from parent"""
+    parent_ids = get_role_parent_ids(db, role_id)
+    if parent_id not in parent_ids:
+        return False
+    parent_ids.remove(parent_id)
+    return set_role_parents(db, role_id, parent_ids)
+
 # Permission Services
 def create_permission(db: Session, permission_data: PermissionCreate) -> Permission:
     """Create a new permission"""
     permission = Permission(**permission_data.dict())
     db.add(permission)
+    # No role grants it yet: no RBAC revision bump
     db.commit()
     db.refresh(permission)
     return permission
@@ -71,6 +320,13 @@ def get_all_permissions(db: Session, page: int = 1, page_size: int = 100) -> Lis
     skip = (page - 1) * page_size
     return db.query(Permission).offset(skip).limit(page_size).all()
 
+def get_permissions_page(db: Session, cursor: Optional[str], limit: int = 100, resource: Optional[str] = None) -> Tuple[List[Permission], Optional[str]]:
+    """Keyset page of permissions ordered by id"""
+    query = db.query(Permission)
+    if resource:
+        query = query.filter(Permission.resource == resource)
+    return keyset_paginate(query, [Permission.id], cursor, limit)
+
 def get_permissions_by_resource(db: Session, resource: str) -> List[Permission]:
     """Get permissions by resource"""
     return db.query(Permission).filter(Permission.resource == resource).all()
@@ -81,9 +337,16 @@ def update_permission(db: Session, permission_id: int, permission_data: Permissi
     if not permission:
         return None
     
-    for key, value in permission_data.dict(exclude_unset=True).items():
+    update_data = permission_data.dict(exclude_unset=True)
+    # What holders of the permission may do changes with resource / action only
+    granted_changed = any(
+        key in ("resource", "action") and getattr(permission, key) != value for key, value in update_data.items()
+    )
+    for key, value in update_data.items():
         setattr(permission, key, value)
     
+    if granted_changed:
+        _publish_rbac_change(db)
     db.commit()
     db.refresh(permission)
     return permission
@@ -94,7 +357,10 @@ def delete_permission(db: Session, permission_id: int) -> bool:
     if not permission:
         return False
     
+    granted = db.scalar(select(exists().where(role_permissions.c.permission_id == permission_id)))
     db.delete(permission)
+    if granted:
+        _publish_rbac_change(db)
     db.commit()
     return True
 
@@ -119,6 +385,10 @@ def get_all_resources(db: Session, skip: int = 0, limit: int = 100) -> List[Reso
     """Get all resources with pagination"""
     return db.query(Resource).offset(skip).limit(limit).all()
 
+def get_resources_page(db: Session, cursor: Optional[str], limit: int = 100) -> Tuple[List[Resource], Optional[str]]:
+    """Keyset page of resources ordered by id"""
+    return keyset_paginate(db.query(Resource), [Resource.id], cursor, limit)
+
 def update_resource(db: Session, resource_id: int, resource_data: ResourceUpdate) -> Optional[Resource]:
     """Update resource"""
     resource = db.query(Resource).filter(Resource.id == resource_id).first()
@@ -142,23 +412,100 @@ def delete_resource(db: Session, resource_id: int) -> bool:
     db.commit()
     return True
 
+# Assignment helpers
+ASSIGNMENT_CHUNK_SIZE = 500
+
+def _sync_assignments(db: Session, table, owner_col, target_col, owner_id: int, target_ids: Set[int]) -> Tuple[int, int]:
+    """Make the owner's rows in an association table match target_ids exactly.
+    
+    Only the difference is written: one DELETE for dropped ids and one
+    multi-row INSERT for new ones. Returns (rows_added, rows_removed).
+    """
+    current = set(db.scalars(select(target_col).where(owner_col == owner_id)))
+    to_add = target_ids - current
+    to_remove = current - target_ids
+    
+    if to_remove:
+        db.execute(table.delete().where(and_(owner_col == owner_id, target_col.in_(to_remove))))
+    if to_add:
+        db.execute(table.insert(), [{owner_col.key: owner_id, target_col.key: t} for t in to_add])
+    return len(to_add), len(to_remove)
+
 # User-Role Assignment Services
 def assign_roles_to_user(db: Session, user_id: int, role_ids: List[int]) -> bool:
-    """Assign roles to user"""
+    """Assign roles to user, replacing the current set"""
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         return False
     
-    # Remove existing role assignments
-    db.execute(user_roles.delete().where(user_roles.c.user_id == user_id))
-    
-    # Add new role assignments
-    for role_id in role_ids:
-        db.execute(user_roles.insert().values(user_id=user_id, role_id=role_id))
-    
+    if any(_sync_assignments(db, user_roles, user_roles.c.user_id, user_roles.c.role_id, user_id, set(role_ids))):
+        _publish_rbac_change(db, [user_id])
     db.commit()
     return True
 
+def bulk_assign_roles_to_users(
+    db: Session,
+    user_ids: List[int],
+    role_ids: List[int],
+    mode: str = "add",
+    chunk_size: int = ASSIGNMENT_CHUNK_SIZE
+) -> Dict[str, Any]:
+    """Assign a role set to many users, committing once per chunk of users.
+    
+    mode is "add" (keep other roles), "replace" (users end up with exactly
+    role_ids) or "remove" (drop role_ids). Returns a summary of rows changed.
+    """
+    if mode not in ("add", "replace", "remove"):
+        raise ValueError(f"Unknown assignment mode: {mode}")
+    target_ids = set(role_ids)
+    _ensure_roles_exist(db, target_ids)
+    
+    summary = {"users_processed": 0, "missing_user_ids": [], "rows_added": 0, "rows_removed": 0}
+    unique_user_ids = list(dict.fromkeys(user_ids))
+    for start in range(0, len(unique_user_ids), chunk_size):
+        chunk = unique_user_ids[start:start + chunk_size]
+        found = set(db.scalars(select(User.id).where(User.id.in_(chunk))))
+        summary["missing_user_ids"].extend(u for u in chunk if u not in found)
+        if not found:
+            continue
+        
+        current: Dict[int, Set[int]] = {u: set() for u in found}
+        for user_id, role_id in db.execute(
+            select(user_roles.c.user_id, user_roles.c.role_id).where(user_roles.c.user_id.in_(found))
+        ):
+            current[user_id].add(role_id)
+        
+        inserts = []
+        removed = 0
+        for user_id, assigned in current.items():
+            if mode != "remove":
+                inserts.extend({"user_id": user_id, "role_id": r} for r in target_ids - assigned)
+            if mode == "replace":
+                removed += len(assigned - target_ids)
+            elif mode == "remove":
+                removed += len(assigned & target_ids)
+        
+        if mode == "replace" and removed:
+            delete_stmt = user_roles.delete().where(user_roles.c.user_id.in_(found))
+            if target_ids:
+                delete_stmt = delete_stmt.where(user_roles.c.role_id.notin_(target_ids))
+            db.execute(delete_stmt)
+        elif mode == "remove" and removed:
+            db.execute(user_roles.delete().where(
+                and_(user_roles.c.user_id.in_(found), user_roles.c.role_id.in_(target_ids))
+            ))
+        if inserts:
+            db.execute(user_roles.insert(), inserts)
+        if inserts or removed:
+            _publish_rbac_change(db, found)
+        db.commit()
+        
+        summary["users_processed"] += len(found)
+        summary["rows_added"] += len(inserts)
+        summary["rows_removed"] += removed
+    
+    return summary
+
 def get_user_roles(db: Session, user_id: int) -> List[Role]:
     """Get user's roles"""
     user = db.query(User).filter(User.id == user_id).first()
@@ -168,29 +515,29 @@ def get_user_roles(db: Session, user_id: int) -> List[Role]:
 
 def remove_user_roles(db: Session, user_id: int, role_ids: List[int]) -> bool:
     """Remove specific roles from user"""
-    for role_id in role_ids:
-        db.execute(
+    if role_ids:
+        removed = db.execute(
             user_roles.delete().where(
-                and_(user_roles.c.user_id == user_id, user_roles.c.role_id == role_id)
+                and_(user_roles.c.user_id == user_id, user_roles.c.role_id.in_(role_ids))
             )
-        )
-    db.commit()
+        ).rowcount
+        if removed:
+            _publish_rbac_change(db, [user_id])
+        db.commit()
     return True
 
 # Role-Permission Assignment Services
 def assign_permissions_to_role(db: Session, role_id: int, permission_ids: List[int]) -> bool:
-    """Assign permissions to role"""
+    """Assign permissions to role, replacing the current set"""
     role = db.query(Role).filter(Role.id == role_id).first()
     if not role:
         return False
     
-    # Remove existing permission assignments
-    db.execute(role_permissions.delete().where(role_permissions.c.role_id == role_id))
-    
-    # Add new permission assignments
-    for permission_id in permission_ids:
-        db.execute(role_permissions.insert().values(role_id=role_id, permission_id=permission_id))
-    
+    if any(_sync_assignments(
+        db, role_permissions, role_permissions.c.role_id, role_permissions.c.permission_id,
+        role_id, set(permission_ids)
+    )):
+        _publish_role_change(db, role_id)
     db.commit()
     return True
 
@@ -201,24 +548,37 @@ def get_role_permissions(db: Session, role_id: int) -> List[Permission]:
         return []
     return role.permissions
 
+def get_role_inherited_permissions(db: Session, role_id: int) -> List[Permission]:
+    """Get permissions a role inherits from its ancestors but does not hold directly"""
+    direct = select(role_permissions.c.permission_id).where(role_permissions.c.role_id == role_id)
+    return db.query(Permission).filter(
+        Permission.id.in_(
+            select(role_permissions.c.permission_id)
+            .join(role_closure, role_closure.c.ancestor_id == role_permissions.c.role_id)
+            .where(role_closure.c.descendant_id == role_id, role_closure.c.depth > 0)
+        ),
+        Permission.id.notin_(direct)
+    ).all()
+
+def select_user_permission_ids(user_id: int):
+    """Select permission ids granted to a user through roles and their ancestors"""
+    return (
+        select(role_permissions.c.permission_id)
+        .join(role_closure, role_closure.c.ancestor_id == role_permissions.c.role_id)
+        .join(user_roles, user_roles.c.role_id == role_closure.c.descendant_id)
+        .where(user_roles.c.user_id == user_id)
+    )
+
 def get_user_permissions(db: Session, user_id: int) -> List[Permission]:
-    """Get all permissions for a user through their roles"""
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        return []
-    
-    permissions = []
-    for role in user.roles:
-        permissions.extend(role.permissions)
-    
-    # Remove duplicates
-    unique_permissions = list({p.id: p for p in permissions}.values())
-    return unique_permissions
+    """Get all permissions for a user through their roles, including inherited ones"""
+    return db.query(Permission).filter(Permission.id.in_(select_user_permission_ids(user_id))).all()
 
 def check_user_permission(db: Session, user_id: int, resource: str, action: str) -> bool:
     """Check if user has specific permission"""
-    user_permissions = get_user_permissions(db, user_id)
-    for permission in user_permissions:
-        if permission.resource == resource and permission.action == action:
-            return True
-    return False
+    return db.query(
+        exists().where(
+            Permission.id.in_(select_user_permission_ids(user_id)),
+            Permission.resource == resource,
+            Permission.action == action
+        )
+    ).scalar()
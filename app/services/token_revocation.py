@@ -0,0 +1,167 @@
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core import events, metrics
+from app.core.config import TOKEN_REVOCATION_BLOOM_CAPACITY, TOKEN_REVOCATION_BLOOM_ERROR_RATE
+from app.db.database import get_session_local
+from app.model.token import RevokedToken
+from app.utils.bloom import BloomFilter
+
+# Revoked keys (jti hoặc "family:<id>") -> expires_at, giữ đủ trong RAM của mỗi worker.
+# Bảng revoked_tokens là nguồn gốc; Bloom filter đứng trước để đường "chưa bị thu hồi"
+# (gần như mọi request) chỉ là vài phép test bit, không lock, không I/O.
+# Nạp từ bảng khi cần lần đầu (hoặc bởi task nền lúc startup), không chặn boot.
+# Code chạy trên event loop phải await ensure_loaded_async() trước khi gọi is_revoked:
+# lần nạp (và chờ _load_lock) chạy trong threadpool, không chặn loop.
+_lock = threading.Lock()
+_load_lock = threading.Lock()
+_loaded = False
+_revoked: Dict[str, datetime] = {}
+_bloom = BloomFilter(TOKEN_REVOCATION_BLOOM_CAPACITY, TOKEN_REVOCATION_BLOOM_ERROR_RATE)
+
+# Số dòng mỗi lần đọc khi nạp (keyset theo id)
+LOAD_BATCH_SIZE = 10000
+
+_bloom_hits = metrics.counter("token_revocation.bloom_hits")
+_false_positives = metrics.counter("token_revocation.bloom_false_positives")
+metrics.gauge("token_revocation.size", func=lambda: len(_revoked))
+
+
+def family_key(family_id: str) -> str:
+    return f"family:{family_id}"
+
+
+def _rebuild_bloom(keys: Iterable[str]) -> None:
+    global _bloom
+    keys = list(keys)
+    bloom = BloomFilter(max(TOKEN_REVOCATION_BLOOM_CAPACITY, len(keys) * 2), TOKEN_REVOCATION_BLOOM_ERROR_RATE)
+    for key in keys:
+        bloom.add(key)
+    _bloom = bloom
+
+
+def _add_local(key: str, expires_at: datetime) -> None:
+    with _lock:
+        _revoked[key] = expires_at
+        _bloom.add(key)
+        if len(_bloom) > _bloom.capacity:
+            _rebuild_bloom(_revoked)
+
+
+def is_revoked(key: Optional[str]) -> bool:
+    """True if the key was revoked (no I/O once the store is loaded; sync callers load inline)"""
+    if not _loaded:
+        ensure_loaded()
+    if not key or key not in _bloom:
+        return False
+    _bloom_hits.inc()
+    if key in _revoked:
+        return True
+    _false_positives.inc()
+    return False
+
+
+def is_token_revoked(payload: dict) -> bool:
+    """Token revoked by its own jti or through its refresh-token family"""
+    if is_revoked(payload.get("jti")):
+        return True
+    family_id = payload.get("fam")
+    return family_id is not None and is_revoked(family_key(family_id))
+
+
+def revoke(db: Session, key: str, reason: str, expires_at: datetime, user_id: Optional[int] = None) -> bool:
+    """Append a revocation; False if the key had already been revoked (possibly by another worker)"""
+    db.add(RevokedToken(jti=key, user_id=user_id, reason=reason, expires_at=expires_at))
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        _add_local(key, expires_at)
+        return False
+
+    # This worker adds the key when the commit dispatches the message
+    events.publish(db, {"type": "tokens.revoked", "key": key, "expires_at": expires_at.isoformat()})
+    db.commit()
+    return True
+
+
+def load(db: Session) -> int:
+    """Merge every unexpired revocation from the table into the store, in batches; returns how many"""
+    global _loaded
+    now = datetime.utcnow()
+    last_id, total = 0, 0
+    while True:
+        rows = db.execute(
+            select(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at)
+            .where(RevokedToken.id > last_id, RevokedToken.expires_at > now)
+            .order_by(RevokedToken.id)
+            .limit(LOAD_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        # Revocation không bao giờ bị gỡ: merge, không xoá key do message thêm vào trong lúc nạp
+        with _lock:
+            _revoked.update({r.jti: r.expires_at for r in rows})
+            _rebuild_bloom(_revoked)
+        last_id, total = rows[-1].id, total + len(rows)
+    _loaded = True
+    return total
+
+
+def ensure_loaded() -> None:
+    """Load the store once per worker (concurrent callers wait for the first load)"""
+    with _load_lock:
+        if not _loaded:
+            _reload_with_session()
+
+
+async def ensure_loaded_async() -> None:
+    """ensure_loaded for callers on the event loop: the load runs in the threadpool"""
+    if not _loaded:
+        await run_in_threadpool(ensure_loaded)
+
+
+def compact(db: Session) -> int:
+    """Delete expired revocations (the tokens are unusable anyway) and shrink the in-memory store"""
+    now = datetime.utcnow()
+    deleted = db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now)).rowcount
+    db.commit()
+    with _lock:
+        for key in [k for k, expires_at in _revoked.items() if expires_at <= now]:
+            del _revoked[key]
+        _rebuild_bloom(_revoked)
+    return deleted
+
+
+def compact_with_session() -> int:
+    db = get_session_local()()
+    try:
+        return compact(db)
+    finally:
+        db.close()
+
+
+def _reload_with_session() -> None:
+    db = get_session_local()()
+    try:
+        load(db)
+    finally:
+        db.close()
+
+
+def _on_event(message: events.Message) -> None:
+    kind = message.get("type")
+    if kind == "tokens.revoked":
+        _add_local(message["key"], datetime.fromisoformat(message["expires_at"]))
+    elif kind == "reset":
+        # Có thể đã lỡ message trong lúc mất kết nối
+        _reload_with_session()
+
+
+events.subscribe(_on_event)
@@ -1,40 +1,76 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import or_, desc
-from typing import List, Optional
+from typing import List, Optional, Sequence, Tuple
 from app.model.user import User
+from app.services import list_counts, user_search
+from app.utils.fast_json import as_dicts, with_columns
+from app.utils.pagination import keyset_paginate
+
+def user_filters(search: Optional[str] = None, is_active: Optional[bool] = None) -> list:
+    """WHERE clauses for the list filters (search as ILIKE on name / email / phone_number)"""
+    filters = []
+    if search:
+        filters.append(or_(
+            User.name.ilike(f"%{search}%"),
+            User.email.ilike(f"%{search}%"),
+            User.phone_number.ilike(f"%{search}%")
+        ))
+    if is_active is not None:
+        filters.append(User.is_active == is_active)
+    return filters
 
 def get_logged_in_users(
     db: Session, 
     page: int = 1, 
     page_size: int = 100, 
     search: Optional[str] = None,
-    is_active: Optional[bool] = None
+    is_active: Optional[bool] = None,
+    columns: Optional[Sequence] = None
 ) -> List[User]:
-    """Get all registered users in the system"""
-    query = db.query(User)
-    
-    # Apply search filter
+    """Get all registered users in the system (dicts of `columns` instead of User objects when given)"""
+    skip = (page - 1) * page_size
+
+    # Có index tìm kiếm: kết quả xếp theo độ liên quan thay vì created_at
     if search:
-        search_filter = or_(
-            User.name.ilike(f"%{search}%"),
-            User.email.ilike(f"%{search}%"),
-            User.phone_number.ilike(f"%{search}%")
-        )
-        query = query.filter(search_filter)
-    
-    # Apply active status filter
-    if is_active is not None:
-        query = query.filter(User.is_active == is_active)
+        results = user_search.search_users(db, search, is_active=is_active, offset=skip, limit=page_size, columns=columns)
+        if results is not None:
+            return results
+
+    query = db.query(*columns) if columns else db.query(User)
+    query = query.filter(*user_filters(search, is_active))
     
     # Order by creation time (newest first)
     query = query.order_by(desc(User.created_at))
     
     # Apply pagination
-    skip = (page - 1) * page_size
-    return query.offset(skip).limit(page_size).all()
+    rows = query.offset(skip).limit(page_size).all()
+    return as_dicts(rows) if columns else rows
+
+def get_users_page(
+    db: Session,
+    cursor: Optional[str],
+    limit: int = 100,
+    is_active: Optional[bool] = None,
+    columns: Optional[Sequence] = None
+) -> Tuple[List[User], Optional[str]]:
+    """Keyset page of users, newest first (same order as get_logged_in_users)"""
+    keys = [User.created_at, User.id]
+    # Cột sort key phải có trong select để dựng cursor từ dòng cuối
+    query = db.query(*with_columns(columns, keys)) if columns else db.query(User)
+    if is_active is not None:
+        query = query.filter(User.is_active == is_active)
+    items, next_cursor = keyset_paginate(query, keys, cursor, limit, descending=True)
+    return (as_dicts(items) if columns else items), next_cursor
+
+def count_users(db: Session, mode: str, is_active: Optional[bool] = None) -> int:
+    """Total for list_users (see app.services.list_counts for the modes)"""
+    return list_counts.count_rows(db, User, mode, is_active=is_active)
 
-def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
-    """Get user by ID"""
+def get_user_by_id(db: Session, user_id: int, columns: Optional[Sequence] = None) -> Optional[User]:
+    """Get user by ID (a dict of `columns` instead of the User object when given)"""
+    if columns:
+        row = db.query(*columns).filter(User.id == user_id).first()
+        return row._asdict() if row else None
     return db.query(User).filter(User.id == user_id).first()
 
 def get_user_by_email(db: Session, email: str) -> Optional[User]:
@@ -0,0 +1,142 @@
+"""
+Export user (GET /users/export) dạng NDJSON hoặc CSV, stream theo batch.
+
+- Một câu SELECT duy nhất, thứ tự theo id, đọc bằng yield_per: server-side
+  cursor (asyncpg / psycopg2 stream_results), mỗi lần chỉ giữ một batch
+  USER_EXPORT_BATCH_SIZE dòng trong RAM, không OFFSET.
+- Cùng bộ lọc search / is_active với GET /users (search là ILIKE: export đằng
+  nào cũng đọc hết bảng, không cần xếp theo độ liên quan).
+- include_roles: roles của mỗi batch lấy bằng một query `user_id IN (...)`
+  theo id của batch đó, không join (join nhân số dòng theo số role).
+- Service vẫn là generator sync nhận Session; stream_users() kéo từng batch
+  qua db.run_sync nên cursor chỉ được đọc trong greenlet của SQLAlchemy.
+"""
+import csv
+import io
+from collections import defaultdict
+from typing import AsyncContextManager, AsyncIterator, Dict, Iterator, List, Optional
+
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import USER_EXPORT_BATCH_SIZE
+from app.model.rbac import Role, user_roles
+from app.model.user import User
+from app.schemas.user import UserResponse, UserWithRoles
+from app.services.user import user_filters
+from app.utils.fast_json import as_dicts
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+_COLUMNS = [getattr(User, name) for name in UserResponse.model_fields]
+_user_rows = TypeAdapter(List[UserResponse])
+_user_rows_with_roles = TypeAdapter(List[UserWithRoles])
+
+
+def _roles_by_user(db: Session, user_ids: List[int]) -> Dict[int, List[dict]]:
+    roles = defaultdict(list)
+    stmt = (
+        select(user_roles.c.user_id, Role.id, Role.name)
+        .join(Role, Role.id == user_roles.c.role_id)
+        .where(user_roles.c.user_id.in_(user_ids))
+        .order_by(user_roles.c.user_id, Role.id)
+    )
+    for user_id, role_id, name in db.execute(stmt):
+        roles[user_id].append({"id": role_id, "name": name})
+    return roles
+
+
+def iter_user_batches(
+    db: Session,
+    search: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    include_roles: bool = False,
+    batch_size: int = USER_EXPORT_BATCH_SIZE,
+) -> Iterator[List[dict]]:
+    """Matching users as batches of dicts (UserResponse fields, plus "roles"), from one streamed SELECT"""
+    stmt = (
+        select(*_COLUMNS)
+        .where(*user_filters(search, is_active))
+        .order_by(User.id)
+        .execution_options(yield_per=batch_size)
+    )
+    result = db.execute(stmt)
+    try:
+        for partition in result.partitions():
+            rows = as_dicts(partition)
+            if include_roles:
+                roles = _roles_by_user(db, [row["id"] for row in rows])
+                for row in rows:
+                    row["roles"] = roles.get(row["id"], [])
+            yield rows
+    finally:
+        result.close()
+
+
+def encode_ndjson(rows: List[dict], include_roles: bool) -> bytes:
+    adapter = _user_rows_with_roles if include_roles else _user_rows
+    return "".join(user.model_dump_json() + "\n" for user in adapter.validate_python(rows)).encode("utf-8")
+
+
+def csv_header(include_roles: bool) -> bytes:
+    return _csv_lines([list(UserResponse.model_fields) + (["roles"] if include_roles else [])])
+
+
+def encode_csv(rows: List[dict], include_roles: bool) -> bytes:
+    adapter = _user_rows_with_roles if include_roles else _user_rows
+    lines = []
+    for row in adapter.dump_python(adapter.validate_python(rows), mode="json"):
+        values = [row[name] for name in UserResponse.model_fields]
+        if include_roles:
+            # Một ô: tên role ngăn cách bằng ";"
+            values.append(";".join(role["name"] for role in row["roles"]))
+        lines.append([_csv_value(value) for value in values])
+    return _csv_lines(lines)
+
+
+def _csv_value(value) -> str:
+    # Giống giá trị JSON: ô trống cho null, true/false viết thường
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value
+
+
+def _csv_lines(lines: List[list]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(lines)
+    return buffer.getvalue().encode("utf-8")
+
+
+async def stream_users(
+    session: AsyncContextManager[AsyncSession],
+    fmt: str,
+    search: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    include_roles: bool = False,
+    batch_size: int = USER_EXPORT_BATCH_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    Body of GET /users/export: one chunk per batch. `session` is opened here,
+    when the response starts streaming, and closed when it ends or the
+    client disconnects.
+    """
+    if fmt == "csv":
+        yield csv_header(include_roles)
+    async with session as db:
+        batches = iter_user_batches(db.sync_session, search, is_active, include_roles, batch_size)
+        try:
+            while True:
+                rows = await db.run_sync(lambda _: next(batches, None))
+                if rows is None:
+                    break
+                if fmt == "csv":
+                    yield encode_csv(rows, include_roles)
+                else:
+                    yield encode_ndjson(rows, include_roles)
+        finally:
+            # Đóng cursor phía server ngay cả khi client ngắt giữa chừng
+            await db.run_sync(lambda _: batches.close())
@@ -0,0 +1,202 @@
+import codecs
+import csv
+import json
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import BULK_IMPORT_BATCH_SIZE, BULK_IMPORT_HASH_WORKERS, BULK_IMPORT_MAX_ERRORS
+from app.model.user import User
+from app.schemas.user import UserCreate
+from app.utils.security import hash_password
+
+Row = Tuple[int, dict]  # (số dòng trong file, dữ liệu thô)
+
+
+# Đọc file theo dòng, không load cả file vào RAM
+def iter_csv(stream: BinaryIO) -> Iterator[Row]:
+    reader = csv.DictReader(codecs.iterdecode(stream, "utf-8-sig"))
+    for row in reader:
+        # Ô trống trong CSV = không có giá trị
+        yield reader.line_num, {k: v for k, v in row.items() if k and v not in (None, "")}
+
+
+def iter_ndjson(stream: BinaryIO) -> Iterator[Row]:
+    for line_no, line in enumerate(codecs.iterdecode(stream, "utf-8-sig"), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield line_no, {"__error__": f"Invalid JSON: {e}"}
+            continue
+        yield line_no, data if isinstance(data, dict) else {"__error__": "Expected a JSON object"}
+
+
+def iter_rows(stream: BinaryIO, fmt: str) -> Iterator[Row]:
+    if fmt == "csv":
+        return iter_csv(stream)
+    if fmt == "ndjson":
+        return iter_ndjson(stream)
+    raise ValueError(f"Unsupported import format: {fmt}")
+
+
+class ImportReport:
+    """Running totals of an import; errors are kept up to BULK_IMPORT_MAX_ERRORS."""
+
+    def __init__(self, max_errors: int = BULK_IMPORT_MAX_ERRORS):
+        self.processed = 0
+        self.created = 0
+        self.existing = 0
+        self.duplicates = 0
+        self.error_count = 0
+        self.errors: List[Dict] = []
+        self.max_errors = max_errors
+
+    def add_error(self, row: int, error: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row, "error": error})
+
+    def as_dict(self) -> dict:
+        return {
+            "processed": self.processed,
+            "created": self.created,
+            "existing": self.existing,
+            "duplicates": self.duplicates,
+            "error_count": self.error_count,
+            "errors": self.errors,
+            "errors_truncated": self.error_count > len(self.errors),
+        }
+
+
+def _validate(batch: List[Row], report: ImportReport) -> List[Tuple[int, UserCreate]]:
+    valid = []
+    seen = set()
+    for line_no, data in batch:
+        if "__error__" in data:
+            report.add_error(line_no, data["__error__"])
+            continue
+        try:
+            user = UserCreate.model_validate(data)
+        except ValidationError as e:
+            report.add_error(line_no, "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            ))
+            continue
+        if user.email in seen:
+            report.duplicates += 1
+            continue
+        seen.add(user.email)
+        valid.append((line_no, user))
+    return valid
+
+
+# render_nulls: cột optional None được ghi NULL thay vì bị bỏ khỏi câu lệnh;
+# không có nó ORM tách lô thành nhiều INSERT theo tập cột có giá trị
+_insert_users = insert(User).execution_options(render_nulls=True)
+
+
+def _insert_rows(db: Session, rows: List[dict], report: ImportReport) -> None:
+    try:
+        db.execute(_insert_users, rows)
+        db.commit()
+        report.created += len(rows)
+    except IntegrityError:
+        # Có user được tạo song song (register) giữa lúc check và insert: chèn từng dòng
+        db.rollback()
+        for row in rows:
+            try:
+                with db.begin_nested():
+                    db.execute(_insert_users, [row])
+                report.created += 1
+            except IntegrityError:
+                report.existing += 1
+        db.commit()
+
+
+def _import_batch(db: Session, batch: List[Row], report: ImportReport, hash_map: Callable) -> None:
+    report.processed += len(batch)
+    valid = _validate(batch, report)
+    if not valid:
+        return
+
+    # Dedupe với DB theo cả chunk, một query
+    emails = [user.email for _, user in valid]
+    existing = set(db.scalars(select(User.email).where(User.email.in_(emails))))
+    new_users = [user for _, user in valid if user.email not in existing]
+    report.existing += len(valid) - len(new_users)
+    if not new_users:
+        return
+
+    password_hashes = hash_map([user.password for user in new_users])
+    now = datetime.utcnow()
+    rows = []
+    for user, password_hash in zip(new_users, password_hashes):
+        row = user.model_dump(exclude={"password"})
+        row.update(password_hash=password_hash, created_at=now, updated_at=now)
+        rows.append(row)
+    _insert_rows(db, rows, report)
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_hash_pool() -> ProcessPoolExecutor:
+    """Process pool riêng cho import (không dùng chung hàng đợi giới hạn của login)"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=BULK_IMPORT_HASH_WORKERS or os.cpu_count() or 1)
+    return _pool
+
+
+def shutdown_hash_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def import_users(
+    db: Session,
+    rows: Iterator[Row],
+    batch_size: int = BULK_IMPORT_BATCH_SIZE,
+    pool: Optional[Executor] = None,
+    on_progress: Optional[Callable[[ImportReport], None]] = None,
+) -> ImportReport:
+    """
+    Import users from (line_no, data) rows: validate with UserCreate, dedupe against the
+    file and the database per batch, hash passwords on a process pool and insert each
+    batch with one multi-row INSERT. Only one batch is held in memory at a time.
+
+    Repeats of an email inside one batch count as `duplicates`; emails already in the
+    database (including ones inserted by earlier batches of the same file) as `existing`.
+    """
+    report = ImportReport()
+    pool = pool or get_hash_pool()
+    workers = getattr(pool, "_max_workers", 1) or 1
+
+    def hash_map(passwords: List[str]) -> List[str]:
+        chunksize = max(1, len(passwords) // (workers * 4))
+        return list(pool.map(hash_password, passwords, chunksize=chunksize))
+
+    batch: List[Row] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            _import_batch(db, batch, report, hash_map)
+            batch = []
+            if on_progress:
+                on_progress(report)
+    if batch:
+        _import_batch(db, batch, report, hash_map)
+        if on_progress:
+            on_progress(report)
+    return report
@@ -0,0 +1,117 @@
+"""
+Tìm user theo name / email / phone_number có index.
+
+Index do migration 0004 tạo (alembic/versions/0004_user_search_index.py),
+không tạo lúc boot; lần search đầu tiên trên mỗi DB kiểm tra index nào có.
+
+- Postgres: GIN index pg_trgm trên từng cột; ILIKE '%term%' dùng được index,
+  kết quả xếp theo match đầu chuỗi (prefix) trước, rồi độ tương đồng trigram.
+- SQLite: bảng FTS5 `users_fts` tokenizer trigram, xếp theo bm25. MATCH cả
+  term như một cụm là tìm chuỗi con trong từng cột, cùng ngữ nghĩa với
+  ILIKE '%term%': khớp giữa từ, số điện thoại khớp một đoạn bất kỳ.
+- Term dưới 3 ký tự (trigram không đủ), hoặc không có index (thiếu quyền
+  CREATE EXTENSION, SQLite không có FTS5 trigram...): trả None, caller dùng
+  ILIKE quét tuần tự như cũ.
+"""
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import case, func, or_, select, text
+from sqlalchemy.orm import Session
+
+from app.model.user import User
+from app.utils.fast_json import as_dicts
+
+# Index đang dùng được theo từng DB (URL): "trgm", "fts5" hoặc None
+_backends: Dict[str, Optional[str]] = {}
+
+_TRGM_COLUMNS = ("name", "email", "phone_number")
+# Trigram cần ít nhất 3 ký tự để dùng index
+MIN_INDEXED_TERM_LENGTH = 3
+
+
+def _detect_backend(db: Session) -> Optional[str]:
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        found = db.scalar(text(
+            "SELECT count(*) FROM pg_indexes WHERE tablename = 'users' AND indexname = ANY(:names)"
+        ), {"names": [f"ix_users_{column}_trgm" for column in _TRGM_COLUMNS]})
+        return "trgm" if found == len(_TRGM_COLUMNS) else None
+    if dialect == "sqlite":
+        found = db.scalar(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'"))
+        return "fts5" if found else None
+    return None
+
+
+def _bind_key(db: Session) -> str:
+    return db.get_bind().url.render_as_string(hide_password=True)
+
+
+def get_backend(db: Session) -> Optional[str]:
+    """Search index available on db's database (checked once per database)"""
+    key = _bind_key(db)
+    if key not in _backends:
+        _backends[key] = _detect_backend(db)
+    return _backends[key]
+
+
+def fts5_query(term: str) -> str:
+    """'john sm' -> '"john sm"' (một cụm: với tokenizer trigram là tìm chuỗi con)"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _results(db: Session, query, columns: Optional[Sequence]) -> list:
+    # columns: chỉ select các cột đó, trả dict (đường JSON nhanh) thay vì User
+    if columns:
+        return as_dicts(db.execute(query))
+    return list(db.scalars(query))
+
+
+def _search_fts5(db: Session, term: str, is_active: Optional[bool], offset: int, limit: int,
+                 columns: Optional[Sequence] = None) -> List[User]:
+    query = fts5_query(term)
+    selected = ", ".join(f"users.{c.key}" for c in columns) if columns else "users.*"
+    sql = (
+        f"SELECT {selected} FROM users_fts JOIN users ON users.id = users_fts.rowid "
+        "WHERE users_fts MATCH :query"
+        + (" AND users.is_active = :is_active" if is_active is not None else "")
+        + " ORDER BY users_fts.rank, users.id LIMIT :limit OFFSET :offset"
+    )
+    params = {"query": query, "limit": limit, "offset": offset}
+    if is_active is not None:
+        params["is_active"] = is_active
+    return _results(db, select(*(columns or [User])).from_statement(text(sql)).params(**params), columns)
+
+
+def _search_trgm(db: Session, term: str, is_active: Optional[bool], offset: int, limit: int,
+                 columns: Optional[Sequence] = None) -> List[User]:
+    pattern = f"%{term}%"
+    prefix = f"{term}%"
+    query = select(*(columns or [User])).where(or_(
+        User.name.ilike(pattern), User.email.ilike(pattern), User.phone_number.ilike(pattern)
+    ))
+    if is_active is not None:
+        query = query.where(User.is_active == is_active)
+    prefix_match = case(
+        (or_(User.name.ilike(prefix), User.email.ilike(prefix), User.phone_number.ilike(prefix)), 1), else_=0
+    )
+    similarity = func.greatest(
+        func.similarity(func.coalesce(User.name, ""), term),
+        func.similarity(User.email, term),
+        func.similarity(func.coalesce(User.phone_number, ""), term),
+    )
+    query = query.order_by(prefix_match.desc(), similarity.desc(), User.id).offset(offset).limit(limit)
+    return _results(db, query, columns)
+
+
+def search_users(db: Session, term: str, is_active: Optional[bool] = None, offset: int = 0, limit: int = 100,
+                 columns: Optional[Sequence] = None) -> Optional[List[User]]:
+    """Ranked search through the index; None when the index cannot serve the term (caller falls back)"""
+    term = term.strip()
+    if len(term) < MIN_INDEXED_TERM_LENGTH:
+        return None
+    backend = get_backend(db)
+    if backend == "fts5":
+        return _search_fts5(db, term, is_active, offset, limit, columns)
+    if backend == "trgm":
+        return _search_trgm(db, term, is_active, offset, limit, columns)
+    return None
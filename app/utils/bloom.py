@@ -0,0 +1,45 @@
+import math
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter for strings.
+
+    `key in bloom` is False for every key never added (no false negatives)
+    and True for at most ~`error_rate` of the others once `capacity` keys
+    are in. Keys cannot be removed; rebuild a new filter instead.
+
+    Positions come from Python's built-in str hash, which is randomized per
+    process: the filter is an in-memory index and must not be persisted or
+    shared between processes.
+    """
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001):
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        # Double hashing: h1 + i*h2 (hash() của str đã được cache, rất rẻ)
+        h1 = hash(key)
+        h2 = hash((key, 1)) | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        for position in self._positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __len__(self) -> int:
+        return self.count
@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from app.core import metrics
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds.
+
+    Hit/miss counters and the current size are published under
+    `cache.<name>.*` in app.core.metrics.
+    """
+
+    def __init__(self, name: str, maxsize: int = 10000, ttl: float = 60.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by pop()/clear() so a load racing an invalidation is not cached
+        self._generation = 0
+        self._hits = metrics.counter(f"cache.{name}.hits")
+        self._misses = metrics.counter(f"cache.{name}.misses")
+        metrics.gauge(f"cache.{name}.size", func=lambda: len(self._data))
+        metrics.gauge(f"cache.{name}.hit_rate", func=self.hit_rate)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self._hits.inc()
+                    return value
+                del self._data[key]
+        self._misses.inc()
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], cache_none: bool = True) -> Any:
+        """Return the cached value, calling loader() and caching its result on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            generation = self._generation
+            value = loader()
+            if generation == self._generation and (value is not None or cache_none):
+                self.set(key, value)
+        return value
+
+    def update(self, key: Hashable, func: Callable[[Any], Any]) -> None:
+        """Replace a live entry's value with func(value), keeping its expiry; no-op on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] > now:
+                self._data[key] = (func(entry[0]), entry[1])
+
+    def keys(self) -> list:
+        """Snapshot of the stored keys (expired entries included until they are next read)."""
+        with self._lock:
+            return list(self._data)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._generation += 1
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def hit_rate(self) -> float:
+        hits, misses = self._hits.value(), self._misses.value()
+        total = hits + misses
+        return round(hits / total, 4) if total else 0.0
@@ -0,0 +1,109 @@
+"""
+Đường trả JSON nhanh cho các list endpoint đọc nhiều (bật bằng JSON_FAST_PATH).
+
+Đường thường: service trả ORM object -> FastAPI validate từng object theo
+response_model (from_attributes, Union List/CursorPage nên thử cả hai),
+jsonable_encoder ra dict rồi json.dumps.
+
+Đường nhanh:
+- service chỉ select đúng các cột của schema, trả dict thay vì ORM object
+  (không dựng instance, không identity map, không đọc cột thừa như password_hash)
+- RowSerializer: TypeAdapter dựng sẵn một lần cho mỗi schema, validate dict và
+  dump thẳng ra bytes trong pydantic-core
+- endpoint trả Response bytes, FastAPI bỏ qua bước response_model
+- `?fields=` (sparse fieldset) đi cùng đường này với schema con: chỉ select
+  và chỉ trả các field được chọn, bật hay tắt JSON_FAST_PATH đều vậy
+- các response còn lại dùng ORJSONResponse làm default_response_class (nếu có orjson)
+
+Output giống hệt đường thường (cùng schema, cùng thứ tự field).
+"""
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+
+from app.schemas.fields import parse_fields, project
+from app.schemas.pagination import CursorPage
+
+try:
+    import orjson
+except ImportError:  # orjson là tuỳ chọn, thiếu thì dùng json stdlib
+    orjson = None
+
+
+def default_response_class() -> Type[JSONResponse]:
+    """ORJSONResponse when orjson is installed, else the stdlib JSONResponse"""
+    return ORJSONResponse if orjson is not None else JSONResponse
+
+
+def as_dicts(rows: Iterable[Any]) -> List[Dict[str, Any]]:
+    """Column-select rows (sqlalchemy Row) -> plain dicts"""
+    rows = list(rows)
+    if not rows:
+        return []
+    # zip với tên cột lấy một lần nhanh hơn Row._asdict() từng dòng
+    keys = rows[0]._fields
+    return [dict(zip(keys, row)) for row in rows]
+
+
+class RowSerializer:
+    """schema / List[schema] / CursorPage[schema] -> JSON bytes through TypeAdapters built once"""
+
+    def __init__(self, model: Any, schema: Type[BaseModel]):
+        # Cột ORM theo đúng thứ tự field của schema: truyền cho service làm `columns`
+        self.columns = [getattr(model, name) for name in schema.model_fields]
+        self._one = TypeAdapter(schema)
+        self._list = TypeAdapter(List[schema])
+        self._page = TypeAdapter(CursorPage[schema])
+
+    # from_attributes: rows là ORM object (chậm hơn dict một chút nên không bật mặc định)
+    def dump_one(self, row: Any, from_attributes: bool = False) -> bytes:
+        return self._one.dump_json(self._one.validate_python(row, from_attributes=from_attributes))
+
+    def dump_list(self, rows: List[Any], from_attributes: bool = False) -> bytes:
+        return self._list.dump_json(self._list.validate_python(rows, from_attributes=from_attributes))
+
+    def dump_page(self, rows: List[Any], next_cursor: Optional[str], from_attributes: bool = False) -> bytes:
+        page = {"items": rows, "next_cursor": next_cursor}
+        return self._page.dump_json(self._page.validate_python(page, from_attributes=from_attributes))
+
+    def one_response(self, response: Response, row: Any, from_attributes: bool = False) -> Response:
+        return _json_bytes(response, self.dump_one(row, from_attributes))
+
+    def list_response(self, response: Response, rows: List[Any], from_attributes: bool = False) -> Response:
+        return _json_bytes(response, self.dump_list(rows, from_attributes))
+
+    def page_response(self, response: Response, rows: List[Any], next_cursor: Optional[str],
+                      from_attributes: bool = False) -> Response:
+        return _json_bytes(response, self.dump_page(rows, next_cursor, from_attributes))
+
+
+@lru_cache(maxsize=256)
+def sparse_serializer(model: Any, schema: Type[BaseModel], fields: Tuple[str, ...]) -> RowSerializer:
+    """RowSerializer for `schema` trimmed to `fields` (see app.schemas.fields), built once per field set"""
+    return RowSerializer(model, project(schema, fields))
+
+
+def serializer_for(model: Any, schema: Type[BaseModel], fields: Optional[str],
+                   default: Optional[RowSerializer] = None) -> Optional[RowSerializer]:
+    """
+    Serializer for a `?fields=` value, or `default` (the JSON_FAST_PATH one,
+    None when off) when no fields were asked for. ValueError for an unknown field.
+    """
+    fieldset = parse_fields(schema, fields)
+    return sparse_serializer(model, schema, fieldset) if fieldset else default
+
+
+def with_columns(columns: Sequence, extra: Sequence) -> list:
+    """`columns` plus those of `extra` not already selected (e.g. keyset sort keys)"""
+    names = {c.key for c in columns}
+    return list(columns) + [c for c in extra if c.key not in names]
+
+
+def _json_bytes(response: Response, body: bytes) -> Response:
+    # Endpoint trả Response trực tiếp thì FastAPI không gộp header đã set trên
+    # `response` được inject (X-Total-Count...), phải tự chép sang
+    out = Response(content=body, media_type="application/json")
+    out.headers.raw.extend(response.headers.raw)
+    return out
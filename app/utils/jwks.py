@@ -0,0 +1,73 @@
+"""
+Verify access token của IAM ở service khác, không cần gọi mạng mỗi request.
+
+    verifier = JWKSVerifier("https://iam.example.com/.well-known/jwks.json")
+    claims = verifier.verify(token)   # jose.JWTError nếu không hợp lệ
+
+Khoá được parse sẵn và cache theo kid; JWKS chỉ được tải lại khi hết TTL
+hoặc gặp kid lạ (khoá vừa xoay), và không quá một lần mỗi
+`min_refresh_interval` giây để token rác không biến thành tải lên IAM.
+"""
+import json
+import threading
+import time
+import urllib.request
+from typing import Callable, Dict, Optional, Tuple
+
+from jose import jwk, jwt, JWTError
+from jose.backends.base import Key
+
+
+class JWKSVerifier:
+    def __init__(self, url: Optional[str] = None, fetch: Optional[Callable[[], dict]] = None,
+                 ttl: float = 3600, min_refresh_interval: float = 60, timeout: float = 5,
+                 audience: Optional[str] = None):
+        if url is None and fetch is None:
+            raise ValueError("JWKSVerifier needs a url or a fetch function")
+        self.url = url
+        self._fetch = fetch or self._fetch_url
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self.audience = audience
+        self._keys: Dict[str, Tuple[Key, str]] = {}  # kid -> (key, alg)
+        # -inf: lần dùng đầu luôn fetch, kể cả khi time.monotonic() còn nhỏ (máy vừa boot)
+        self._fetched_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def _fetch_url(self) -> dict:
+        with urllib.request.urlopen(self.url, timeout=self.timeout) as response:
+            return json.load(response)
+
+    def refresh(self, force: bool = False) -> None:
+        with self._lock:
+            age = time.monotonic() - self._fetched_at
+            if age < self.min_refresh_interval or (not force and age < self.ttl):
+                return
+            keys = {}
+            for entry in self._fetch().get("keys", []):
+                if entry.get("use", "sig") != "sig" or "kid" not in entry or "alg" not in entry:
+                    continue
+                keys[entry["kid"]] = (jwk.construct(entry, entry["alg"]), entry["alg"])
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+
+    def _get_key(self, kid: str) -> Tuple[Key, str]:
+        if time.monotonic() - self._fetched_at >= self.ttl:
+            self.refresh()
+        key = self._keys.get(kid)
+        if key is None:
+            self.refresh(force=True)
+            key = self._keys.get(kid)
+        if key is None:
+            raise JWTError("Unknown signing key")
+        return key
+
+    def verify(self, token: str) -> dict:
+        """Claims of a valid, unexpired token; raises JWTError otherwise."""
+        kid = jwt.get_unverified_header(token).get("kid")
+        if not kid:
+            raise JWTError("Token has no kid")
+        key, algorithm = self._get_key(kid)
+        options = {"verify_aud": self.audience is not None}
+        return jwt.decode(token, key, algorithms=[algorithm], audience=self.audience, options=options)
@@ -0,0 +1,71 @@
+"""
+Keyset (cursor) pagination.
+
+Cursor là chuỗi base64 opaque chứa giá trị sort key + id của dòng cuối
+trang trước; trang sau lọc `(sort_key, id) > cursor` thay vì OFFSET, nên
+trang sâu nhanh như trang đầu (cần index composite khớp thứ tự sort).
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Giá trị sort key trong cursor; ValueError nếu cursor hỏng"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list):
+            raise ValueError
+        return [_decode_value(v) for v in values]
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def keyset_paginate(query: Query, columns: Sequence, cursor: Optional[str], limit: int,
+                    descending: bool = False) -> Tuple[list, Optional[str]]:
+    """
+    One page of `query` ordered by `columns` (the last one must be unique, e.g. id).
+
+    `cursor` is None or "" for the first page. Returns (items, next_cursor);
+    next_cursor is None on the last page. Raises ValueError for a bad cursor.
+    """
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(columns):
+            raise ValueError("Invalid cursor")
+        keys, after = tuple_(*columns), tuple_(*values)
+        query = query.filter(keys < after if descending else keys > after)
+
+    order_by = [c.desc() if descending else c.asc() for c in columns]
+    rows = query.order_by(*order_by).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor([getattr(last, c.key) for c in columns])
@@ -1,10 +1,35 @@
+import uuid
 from datetime import datetime, timedelta
-from jose import jwt, JWTError
+from app.core.keys import get_keyring
 from passlib.context import CryptContext
 from fastapi import HTTPException
-from app.core.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS
+from app.core.config import (
+    ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS,
+    PASSWORD_HASH_SCHEME, BCRYPT_ROUNDS, ARGON2_TIME_COST, ARGON2_MEMORY_COST_KIB, ARGON2_PARALLELISM,
+)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+PASSWORD_SCHEMES = ("bcrypt", "argon2")
+
+
+def build_pwd_context(scheme: str = PASSWORD_HASH_SCHEME, bcrypt_rounds: int = BCRYPT_ROUNDS,
+                      argon2_time_cost: int = ARGON2_TIME_COST, argon2_memory_cost: int = ARGON2_MEMORY_COST_KIB,
+                      argon2_parallelism: int = ARGON2_PARALLELISM) -> CryptContext:
+    """CryptContext hash bằng `scheme`; scheme khác và cost thấp hơn cấu hình bị coi là cần update."""
+    if scheme not in PASSWORD_SCHEMES:
+        raise ValueError(f"Unsupported PASSWORD_HASH_SCHEME: {scheme}")
+    return CryptContext(
+        schemes=[scheme] + [s for s in PASSWORD_SCHEMES if s != scheme],
+        default=scheme,
+        deprecated="auto",
+        bcrypt__default_rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        argon2__time_cost=argon2_time_cost,
+        argon2__memory_cost=argon2_memory_cost,
+        argon2__parallelism=argon2_parallelism,
+    )
+
+
+pwd_context = build_pwd_context()
 
 
 def hash_password(password: str):
@@ -15,17 +40,27 @@ def verify_password(password: str, hashed: str):
     return pwd_context.verify(password, hashed)
 
 
+def verify_and_update_password(password: str, hashed: str):
+    """(ok, new_hash): new_hash khác None khi hash cũ dùng scheme/cost lỗi thời."""
+    return pwd_context.verify_and_update(password, hashed)
+
+
+def new_token_id() -> str:
+    return uuid.uuid4().hex
+
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    to_encode.update({"exp": expire, "jti": new_token_id(), "typ": "access"})
+    return get_keyring().sign(to_encode)
 
-def create_refresh_token(data: dict):
+def create_refresh_token(data: dict, family_id: str = None):
+    """Refresh token; tokens issued by rotating one another share a family id ("fam")."""
     expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode = data.copy()
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    to_encode.update({"exp": expire, "jti": new_token_id(), "typ": "refresh", "fam": family_id or new_token_id()})
+    return get_keyring().sign(to_encode)
 
 def decode_token(token: str):
-    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    return get_keyring().verify(token)
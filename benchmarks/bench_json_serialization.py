@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time to turn a page of users into JSON bytes, per 1000 rows.
+
+"before" is what GET /users does by default: User ORM objects returned through
+response_model=Union[List[UserResponse], CursorPage[UserResponse]] and encoded
+by JSONResponse. "after" is JSON_FAST_PATH: a column select that yields dicts,
+validated and dumped by RowSerializer's pre-built TypeAdapter. Query and
+serialization are timed separately. Exits non-zero if the two paths produce
+different JSON.
+
+    python benchmarks/bench_json_serialization.py [rows] [--repeat N]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+parser = argparse.ArgumentParser()
+parser.add_argument("rows", nargs="?", type=int, default=1000)
+parser.add_argument("--repeat", type=int, default=30)
+args = parser.parse_args()
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'json.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from typing import List, Union
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import insert
+
+from app.db.database import Base, get_engine, get_session_local
+from app.model import abac, rbac, token  # noqa: F401 (register mappers)
+from app.model.user import User
+from app.schemas.pagination import CursorPage
+from app.schemas.user import UserResponse
+from app.services import user as user_service
+from app.utils import fast_json
+
+# Cùng response_model với GET /users
+response_field = create_response_field(
+    name="Response_list_users", type_=Union[List[UserResponse], CursorPage[UserResponse]]
+)
+users_json = fast_json.RowSerializer(User, UserResponse)
+
+
+def per_1000(fn) -> float:
+    fn()  # warm-up
+    samples = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000 * 1000 / args.rows
+
+
+def main() -> None:
+    Base.metadata.create_all(bind=get_engine())
+    with get_engine().begin() as conn:
+        conn.execute(insert(User), [
+            {"email": f"user{i}@example.com", "password_hash": "x", "name": f"User {i}",
+             "department": "Engineering", "position": "Developer", "location": "Hanoi",
+             "avatar_url": f"https://cdn.example.com/avatars/{i}.png"}
+            for i in range(args.rows)
+        ])
+    db = get_session_local()()
+
+    def query_orm():
+        db.expunge_all()
+        return user_service.get_logged_in_users(db, page_size=args.rows)
+
+    def query_columns():
+        return user_service.get_logged_in_users(db, page_size=args.rows, columns=users_json.columns)
+
+    objects, rows = query_orm(), query_columns()
+
+    def serialize_orm():
+        content = asyncio.run(serialize_response(field=response_field, response_content=objects, is_coroutine=True))
+        return JSONResponse(content).body
+
+    def serialize_fast():
+        return users_json.dump_list(rows)
+
+    if json.loads(serialize_orm()) != json.loads(serialize_fast()):
+        sys.exit("❌ Fast path JSON differs from response_model output")
+
+    results = {
+        "before": (per_1000(query_orm), per_1000(serialize_orm)),
+        "after": (per_1000(query_columns), per_1000(serialize_fast)),
+    }
+    print(f"📊 {args.rows} users, median of {args.repeat} runs, ms per 1000 rows "
+          f"(orjson {'installed' if fast_json.orjson else 'missing'})")
+    print(f"\n{'path':<10}{'query':>10}{'serialize':>12}{'total':>10}")
+    for name, (query_ms, serialize_ms) in results.items():
+        print(f"{name:<10}{query_ms:>10.2f}{serialize_ms:>12.2f}{query_ms + serialize_ms:>10.2f}")
+    before, after = sum(results["before"]), sum(results["after"])
+    print(f"\n✅ Same JSON, {before / after:.1f}x faster end to end "
+          f"({results['before'][1] / results['after'][1]:.1f}x on serialization)")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark: how long a request holds its pooled connection, FastAPI's default
+route class vs DBRoute (session closed before response serialization).
+
+Both routes run user_service.get_logged_in_users for a page of users and
+return it through response_model=List[UserResponse], like GET /users. With
+the default route the connection is held until the response has been
+validated, encoded and sent; with DBRoute only while the query runs.
+
+    python benchmarks/bench_pool_hold.py [page_size] [--requests N]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+parser = argparse.ArgumentParser()
+parser.add_argument("page_size", nargs="?", type=int, default=1000)
+parser.add_argument("--requests", type=int, default=50)
+args = parser.parse_args()
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'hold.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from typing import List
+
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.db import database
+from app.db.database import Base, get_async_engine, get_engine
+from app.db.routing import DBRoute
+from app.model import abac, rbac, token  # noqa: F401 (register mappers)
+from app.model.user import User
+from app.schemas.user import UserResponse
+from app.services import user as user_service
+
+holds: List[float] = []
+
+
+def _record_holds(engine) -> None:
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, record, proxy):
+        record.info["bench_checkout"] = time.perf_counter()
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, record):
+        started = record.info.pop("bench_checkout", None)
+        if started:
+            holds.append(time.perf_counter() - started)
+
+
+async def get_db():
+    async with database.get_async_session_local()() as db:
+        yield db
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    for prefix, route_class in (("/default", APIRoute), ("/dbroute", DBRoute)):
+        router = APIRouter(prefix=prefix, route_class=route_class)
+
+        @router.get("/users", response_model=List[UserResponse])
+        async def list_users(db: AsyncSession = Depends(get_db)):
+            return await db.run_sync(user_service.get_logged_in_users, page=1, page_size=args.page_size)
+
+        app.include_router(router)
+    app.add_event_handler("shutdown", get_async_engine().dispose)
+    return app
+
+
+def main() -> None:
+    Base.metadata.create_all(bind=get_engine())
+    with get_engine().begin() as conn:
+        conn.execute(insert(User), [
+            {"email": f"user{i}@example.com", "password_hash": "x", "name": f"User {i}",
+             "department": "Engineering", "position": "Developer", "location": "Hanoi",
+             "avatar_url": f"https://cdn.example.com/avatars/{i}.png"}
+            for i in range(args.page_size)
+        ])
+    _record_holds(get_async_engine().sync_engine)
+
+    print(f"📊 {args.requests} requests, {args.page_size} users per response")
+    print(f"\n{'route class':<14}{'hold p50':>12}{'hold max':>12}{'request p50':>14}")
+    with TestClient(build_app()) as client:
+        for name, path in (("APIRoute", "/default/users"), ("DBRoute", "/dbroute/users")):
+            client.get(path)  # warm-up
+            holds.clear()
+            latencies = []
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                client.get(path).raise_for_status()
+                latencies.append(time.perf_counter() - start)
+            print(f"{name:<14}{statistics.median(holds) * 1000:>9.2f} ms{max(holds) * 1000:>9.2f} ms"
+                  f"{statistics.median(latencies) * 1000:>11.2f} ms")
+
+    print("\ndb.pool.hold_seconds (DBRoute routes):",
+          metrics.histogram("db.pool.hold_seconds").snapshot().get("GET /dbroute/users"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Benchmark: overhead of require_permission() per request.
+
+Measures the warm path (token already seen, permission decision cached)
+both directly on the dependency chain and end-to-end through the ASGI
+app, against an unprotected route. Exits non-zero if either the
+dependency overhead or the end-to-end difference exceeds the budget.
+
+    python benchmarks/bench_require_permission.py [iterations]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+BUDGET_US = 50.0
+
+_db_file = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_file}"
+os.environ["JWT_EMBED_AUTHZ_CLAIMS"] = "true"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import Depends, FastAPI
+from starlette.requests import Request
+
+from app.core.security import require_permission
+from app.db import database
+from app.db.database import Base, get_engine, get_session_local
+from app.model import abac as abac_model, rbac as rbac_model  # noqa: F401 (register mappers)
+from app.model.user import User
+from app.schemas.rbac import PermissionCreate, RoleCreate
+from app.services import authz as authz_service, rbac as rbac_service
+from app.utils.security import create_access_token
+
+
+def setup_token() -> str:
+    Base.metadata.create_all(bind=get_engine())
+    db = get_session_local()()
+    try:
+        permission = rbac_service.create_permission(db, PermissionCreate(
+            name="role.read", display_name="Read Roles", resource="role", action="read"
+        ))
+        role = rbac_service.create_role(db, RoleCreate(name="reader", display_name="Reader"))
+        rbac_service.assign_permissions_to_role(db, role.id, [permission.id])
+        user = User(email="bench@example.com", password_hash="x", name="Bench")
+        db.add(user)
+        db.commit()
+        rbac_service.assign_roles_to_user(db, user.id, [role.id])
+        claims = {"sub": str(user.id), **authz_service.build_authz_claims(db, user.id)}
+        return create_access_token(claims)
+    finally:
+        db.close()
+
+
+def bench_dependency(token: str, iterations: int) -> float:
+    """Mean µs for require_permission (token resolve + check) on a fresh request scope."""
+    check = require_permission("role", "read")
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"authorization", f"Bearer {token}".encode())]}
+
+    async def run(n: int) -> float:
+        start = time.perf_counter()
+        for _ in range(n):
+            await check(Request(dict(scope)))
+        return time.perf_counter() - start
+
+    asyncio.run(run(1000))  # warm up caches
+    return asyncio.run(run(iterations)) / iterations * 1e6
+
+
+def bench_endpoint(token: str, iterations: int) -> tuple:
+    """Mean µs per request for an unprotected and a protected route.
+
+    Requests are driven straight through the ASGI interface on one event
+    loop, so the numbers are not dominated by test-client thread hops.
+    """
+    app = FastAPI()
+
+    # Async endpoints keep threadpool scheduling noise out of the comparison
+    @app.get("/plain")
+    async def plain():
+        return {"ok": True}
+
+    @app.get("/guarded", dependencies=[Depends(require_permission("role", "read"))])
+    async def guarded():
+        return {"ok": True}
+
+    headers = [(b"authorization", f"Bearer {token}".encode())]
+
+    async def call(path: str) -> int:
+        scope = {
+            "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+            "headers": headers, "client": ("127.0.0.1", 1234), "server": ("test", 80),
+        }
+        status = 0
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        await app(scope, receive, send)
+        return status
+
+    async def run() -> dict:
+        timings = {"/plain": 0.0, "/guarded": 0.0}
+        for path in timings:
+            for _ in range(200):
+                assert await call(path) == 200
+        # Interleave so both routes see the same machine noise
+        for _ in range(iterations):
+            for path in timings:
+                start = time.perf_counter()
+                await call(path)
+                timings[path] += time.perf_counter() - start
+        return timings
+
+    timings = asyncio.run(run())
+    return tuple(timings[p] / iterations * 1e6 for p in ("/plain", "/guarded"))
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    token = setup_token()
+
+    dependency_us = bench_dependency(token, iterations)
+    plain_us, guarded_us = bench_endpoint(token, max(iterations // 4, 1000))
+    # Pool của async engine giữ connection aiosqlite (thread không daemon): đóng để script thoát được
+    if database.async_engine is not None:
+        asyncio.run(database.async_engine.dispose())
+
+    print(f"require_permission dependency (warm): {dependency_us:8.2f} µs/request")
+    print(f"GET /plain   end-to-end:              {plain_us:8.2f} µs/request")
+    print(f"GET /guarded end-to-end:              {guarded_us:8.2f} µs/request")
+    print(f"end-to-end difference:                {guarded_us - plain_us:8.2f} µs/request")
+
+    over = [name for name, us in (("dependency", dependency_us), ("end-to-end", guarded_us - plain_us))
+            if us > BUDGET_US]
+    if over:
+        print(f"❌ Over budget ({BUDGET_US:.0f} µs): {', '.join(over)}")
+        sys.exit(1)
+    print(f"✅ Within budget ({BUDGET_US:.0f} µs)")
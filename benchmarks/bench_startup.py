@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark: worker boot time (import app.main + startup event), phase by phase.
+
+Every boot is a fresh interpreter, like a worker restart. The first boot
+migrates an empty SQLite file and is reported separately. The following
+boots find the schema at head, which is the path every restart takes. Exits
+non-zero if the boot work after import goes over budget, if import goes over
+budget, or if a warm boot imports alembic.
+
+    python benchmarks/bench_startup.py [boots] [--database-url URL]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BUDGET_BOOT_MS = 150.0
+BUDGET_IMPORT_MS = 2500.0
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, sys
+from fastapi.testclient import TestClient
+from app.main import app
+with TestClient(app):
+    pass
+print("STARTUP_TIMINGS " + json.dumps({
+    "timings": app.state.startup_timings,
+    "alembic_imported": "alembic" in sys.modules,
+}))
+"""
+
+parser = argparse.ArgumentParser()
+parser.add_argument("boots", nargs="?", type=int, default=10)
+parser.add_argument("--database-url")
+args = parser.parse_args()
+
+env = dict(
+    os.environ,
+    DATABASE_URL=args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'startup.db')}",
+    PYTHONPATH=ROOT,
+)
+
+
+def boot() -> dict:
+    result = subprocess.run([sys.executable, "-c", CHILD], env=env, cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.exit(f"❌ Boot failed:\n{result.stdout}{result.stderr}")
+    line = next(l for l in result.stdout.splitlines() if l.startswith("STARTUP_TIMINGS "))
+    return json.loads(line.split(" ", 1)[1])
+
+
+def ms(timings: dict) -> str:
+    return ", ".join(f"{phase} {seconds * 1000:.1f}" for phase, seconds in timings.items())
+
+
+first = boot()
+print(f"📊 First boot (ms): {ms(first['timings'])}")
+
+runs = [boot() for _ in range(args.boots)]
+phases = list(runs[0]["timings"])
+print(f"\n{'phase':<14}{'median ms':>12}{'max ms':>10}")
+for phase in phases:
+    values = [run["timings"].get(phase, 0) * 1000 for run in runs]
+    print(f"{phase:<14}{statistics.median(values):>12.1f}{max(values):>10.1f}")
+
+import_ms = statistics.median(run["timings"]["import"] * 1000 for run in runs)
+boot_ms = statistics.median(
+    sum(seconds for phase, seconds in run["timings"].items() if phase != "import") * 1000 for run in runs
+)
+print(f"\nimport {import_ms:.0f} ms (budget {BUDGET_IMPORT_MS:.0f}), "
+      f"boot after import {boot_ms:.1f} ms (budget {BUDGET_BOOT_MS:.0f})")
+
+failed = False
+if any(run["alembic_imported"] for run in runs):
+    print("❌ Alembic was imported on a boot with the schema already at head")
+    failed = True
+if import_ms > BUDGET_IMPORT_MS or boot_ms > BUDGET_BOOT_MS:
+    print("❌ Over budget")
+    failed = True
+if failed:
+    sys.exit(1)
+print("✅ Within budget")
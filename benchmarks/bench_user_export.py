@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: peak memory and throughput of the user export stream as the table grows.
+
+Runs user_export.stream_users (the body of GET /users/export) over SQLite
+tables of increasing size and measures the Python heap peak with tracemalloc
+while the chunks are consumed and dropped, like a client download. Exits
+non-zero if the peak on the largest table grows past MAX_PEAK_GROWTH times
+the peak on the smallest.
+
+    python benchmarks/bench_user_export.py [sizes ...] [--format ndjson|csv] [--roles]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+MAX_PEAK_GROWTH = 1.5
+
+parser = argparse.ArgumentParser()
+parser.add_argument("sizes", nargs="*", type=int, default=[5000, 20000, 80000])
+parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+parser.add_argument("--roles", action="store_true", help="include_roles=true (every user gets 2 roles)")
+args = parser.parse_args()
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.config import USER_EXPORT_BATCH_SIZE
+from app.db.database import Base
+from app.model import abac, token  # noqa: F401 (register mappers)
+from app.model.rbac import Role, user_roles
+from app.model.user import User
+from app.services import user_export
+
+
+def seed(path: str, size: int) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Role), [{"name": name, "display_name": name} for name in ("staff", "auditor")])
+        for start in range(0, size, 10000):
+            ids = range(start + 1, min(start + 10000, size) + 1)
+            conn.execute(insert(User), [
+                {"id": i, "email": f"user{i}@example.com", "password_hash": "x", "name": f"User {i}",
+                 "department": "Engineering", "position": "Developer", "location": "Hanoi",
+                 "avatar_url": f"https://cdn.example.com/avatars/{i}.png"}
+                for i in ids
+            ])
+            if args.roles:
+                conn.execute(insert(user_roles), [{"user_id": i, "role_id": r} for i in ids for r in (1, 2)])
+    engine.dispose()
+
+
+async def export(path: str) -> tuple:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    total = 0
+    tracemalloc.start()
+    started = time.perf_counter()
+    async for chunk in user_export.stream_users(AsyncSession(engine), args.format, include_roles=args.roles):
+        total += len(chunk)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    await engine.dispose()
+    return total, peak, elapsed
+
+
+def main() -> None:
+    print(f"📊 {args.format}{' with roles' if args.roles else ''}, batch {USER_EXPORT_BATCH_SIZE} rows")
+    print(f"\n{'users':>8}{'output MB':>12}{'peak heap MB':>15}{'rows/s':>10}")
+    peaks = []
+    for size in args.sizes:
+        path = os.path.join(tempfile.mkdtemp(), "export.db")
+        seed(path, size)
+        total, peak, elapsed = asyncio.run(export(path))
+        peaks.append(peak)
+        print(f"{size:>8}{total / 1e6:>12.1f}{peak / 1e6:>15.2f}{size / elapsed:>10.0f}")
+
+    growth = peaks[-1] / peaks[0]
+    print(f"\npeak heap x{growth:.2f} from {args.sizes[0]} to {args.sizes[-1]} users (max x{MAX_PEAK_GROWTH})")
+    if growth > MAX_PEAK_GROWTH:
+        print("❌ Export memory grows with table size")
+        sys.exit(1)
+    print("✅ Constant memory")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: user search, ILIKE scan vs indexed search (FTS5 on SQLite, pg_trgm on Postgres).
+
+Fills a database with synthetic users, then times both paths of
+user_service.get_logged_in_users for a set of search-box terms.
+
+    python benchmarks/bench_user_search.py [users] [--database-url URL]
+
+Without --database-url a temporary SQLite file is used. Against Postgres,
+point it at a scratch database: the users table is filled with synthetic rows.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+parser = argparse.ArgumentParser()
+parser.add_argument("users", nargs="?", type=int, default=1_000_000)
+parser.add_argument("--database-url")
+parser.add_argument("--repeat", type=int, default=5)
+args = parser.parse_args()
+
+os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'search.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, insert, select
+
+from app.db import migrations
+from app.db.database import Base, get_engine, get_session_local
+from app.model import abac, rbac, token  # noqa: F401 (register mappers)
+from app.model.user import User
+from app.services import user as user_service, user_search
+
+FIRST = ["Anh", "Binh", "Chi", "Dung", "Giang", "Hoa", "Khanh", "Linh", "Minh", "Nam",
+         "Oanh", "Phuong", "Quang", "Son", "Thao", "Trung", "Uyen", "Viet", "Xuan", "Yen"]
+LAST = ["Nguyen", "Tran", "Le", "Pham", "Hoang", "Phan", "Vu", "Dang", "Bui", "Do",
+        "Ho", "Ngo", "Duong", "Ly", "Smith", "Johnson", "Garcia", "Miller", "Davis", "Wilson"]
+DOMAINS = ["gmail.com", "yahoo.com", "outlook.com", "example.org", "corp.vn"]
+TERMS = ["nguyen", "minh tran", "thao", "garcia@", "0912", "xuan.pham", "zzznomatch"]
+
+
+def fill(n: int, batch: int = 20000) -> None:
+    engine = get_engine()
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        existing = conn.execute(select(func.count()).select_from(User)).scalar()
+    rng = random.Random(42)
+    print(f"📦 Inserting {n - existing} synthetic users...")
+    for start in range(existing, n, batch):
+        rows = []
+        for i in range(start, min(start + batch, n)):
+            first, last = rng.choice(FIRST), rng.choice(LAST)
+            rows.append({
+                "email": f"{first}.{last}{i}@{rng.choice(DOMAINS)}".lower(),
+                "password_hash": "x",
+                "name": f"{first} {rng.choice(LAST)} {last}",
+                "phone_number": f"09{rng.randrange(10**8):08d}",
+                "is_active": rng.random() > 0.1,
+            })
+        with engine.begin() as conn:
+            conn.execute(insert(User), rows)
+
+
+def timed(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    fill(args.users)
+    started = time.perf_counter()
+    # Index do migration 0004 tạo
+    migrations.upgrade(get_engine())
+    db = get_session_local()()
+    backend = user_search.get_backend(db)
+    print(f"🔧 Search index: {backend} (migrated in {time.perf_counter() - started:.1f}s)")
+
+    key = user_search._bind_key(db)
+    print(f"\n{'term':<14}{'ILIKE scan':>14}{'indexed':>14}{'speedup':>10}  top hit")
+    for term in TERMS:
+        user_search._backends[key] = None
+        scan_ms = timed(lambda: user_service.get_logged_in_users(db, page_size=20, search=term), args.repeat)
+        user_search._backends[key] = backend
+        indexed_ms = timed(lambda: user_service.get_logged_in_users(db, page_size=20, search=term), args.repeat)
+        top = user_service.get_logged_in_users(db, page_size=1, search=term)
+        print(f"{term:<14}{scan_ms:>11.1f} ms{indexed_ms:>11.1f} ms{scan_ms / max(indexed_ms, 0.001):>9.1f}x  "
+              f"{top[0].email if top else '-'}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Chọn work factor cho password hash trên máy hiện tại.
+
+Đo thời gian verify của scheme đang cấu hình (PASSWORD_HASH_SCHEME) với
+các mức cost tăng dần, rồi chọn mức cao nhất mà median verify vẫn nằm
+trong ngân sách (PASSWORD_HASH_TARGET_MS hoặc --target-ms).
+
+    python calibrate_password_hash.py [--scheme bcrypt|argon2] [--target-ms 250] [--samples 5]
+
+Kết quả là các dòng env để dán vào cấu hình. Hash cũ có cost thấp hơn
+sẽ được hash lại khi user login.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import (
+    PASSWORD_HASH_SCHEME, PASSWORD_HASH_TARGET_MS,
+    ARGON2_MEMORY_COST_KIB, ARGON2_PARALLELISM,
+)
+from app.utils.security import build_pwd_context
+
+BCRYPT_ROUNDS_RANGE = range(8, 17)
+ARGON2_TIME_COST_RANGE = range(1, 11)
+
+
+def measure_verify_ms(context, samples: int) -> float:
+    """Median thời gian verify (ms) của một hash tạo bằng context"""
+    hashed = context.hash("calibration-password")
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.verify("calibration-password", hashed)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(scheme: str, target_ms: float, samples: int):
+    """(cost, median_ms) tốt nhất cho scheme; cost là bcrypt rounds hoặc argon2 time_cost"""
+    if scheme == "bcrypt":
+        costs = BCRYPT_ROUNDS_RANGE
+        make_context = lambda cost: build_pwd_context("bcrypt", bcrypt_rounds=cost)
+    else:
+        costs = ARGON2_TIME_COST_RANGE
+        make_context = lambda cost: build_pwd_context(
+            "argon2", argon2_time_cost=cost,
+            argon2_memory_cost=ARGON2_MEMORY_COST_KIB, argon2_parallelism=ARGON2_PARALLELISM,
+        )
+
+    chosen = None
+    for cost in costs:
+        median_ms = measure_verify_ms(make_context(cost), samples)
+        within = median_ms <= target_ms
+        print(f"  cost={cost:<3} verify median {median_ms:8.1f} ms {'✅' if within else '❌'}")
+        if not within:
+            break
+        chosen = (cost, median_ms)
+    return chosen
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate password hash work factor")
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2"], default=PASSWORD_HASH_SCHEME)
+    parser.add_argument("--target-ms", type=float, default=PASSWORD_HASH_TARGET_MS)
+    parser.add_argument("--samples", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"🔧 Calibrating {args.scheme} for a verify budget of {args.target_ms:.0f} ms ({os.cpu_count()} CPUs)")
+    chosen = calibrate(args.scheme, args.target_ms, args.samples)
+    if chosen is None:
+        print("❌ Even the lowest cost exceeds the budget; raise --target-ms or use a faster host.")
+        sys.exit(1)
+
+    cost, median_ms = chosen
+    print(f"\n✅ Recommended ({median_ms:.1f} ms per verify):")
+    print(f"PASSWORD_HASH_SCHEME={args.scheme}")
+    if args.scheme == "bcrypt":
+        print(f"BCRYPT_ROUNDS={cost}")
+    else:
+        print(f"ARGON2_TIME_COST={cost}")
+        print(f"ARGON2_MEMORY_COST_KIB={ARGON2_MEMORY_COST_KIB}")
+        print(f"ARGON2_PARALLELISM={ARGON2_PARALLELISM}")
+
+
+if __name__ == "__main__":
+    main()
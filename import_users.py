@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Import user hàng loạt từ CSV hoặc NDJSON (mỗi dòng một object UserCreate).
+
+    python import_users.py users.csv [--format csv|ndjson] [--batch-size 500] [--workers 8]
+
+File được đọc theo dòng; password được hash song song trên process pool,
+mỗi batch là một lần check email + một câu INSERT nhiều dòng.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import BULK_IMPORT_BATCH_SIZE
+from app.db.database import get_session_local
+from app.model import abac, rbac, user  # noqa: F401 (register mappers)
+from app.services import user_import
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import users")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "ndjson"])
+    parser.add_argument("--batch-size", type=int, default=BULK_IMPORT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--errors", help="Write per-row errors to this NDJSON file")
+    args = parser.parse_args()
+
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    started = time.monotonic()
+
+    def progress(report):
+        elapsed = time.monotonic() - started
+        print(f"  {report.processed:>9} rows  {report.created:>9} created  {report.existing:>7} existing  "
+              f"{report.error_count:>6} errors  {report.processed / elapsed:8.0f} rows/s")
+
+    print(f"📥 Importing {args.path} ({fmt}, batches of {args.batch_size}, {args.workers} hash workers)")
+    db = get_session_local()()
+    try:
+        with open(args.path, "rb") as f, ProcessPoolExecutor(max_workers=args.workers) as pool:
+            report = user_import.import_users(
+                db, user_import.iter_rows(f, fmt), batch_size=args.batch_size, pool=pool, on_progress=progress
+            )
+    finally:
+        db.close()
+
+    result = report.as_dict()
+    if args.errors:
+        with open(args.errors, "w") as f:
+            for error in result["errors"]:
+                f.write(json.dumps(error) + "\n")
+    else:
+        for error in result["errors"][:20]:
+            print(f"  ❌ row {error['row']}: {error['error']}")
+
+    print(f"✅ Done in {time.monotonic() - started:.1f}s: {result['created']} created, "
+          f"{result['existing']} already existed, {result['duplicates']} duplicates, {result['error_count']} errors")
+    sys.exit(1 if result["error_count"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,15 +4,16 @@ Initialize RBAC and ABAC system with default data
 Run this script after setting up the database
 """
 
+import os
 from sqlalchemy.orm import Session
-from app.db.database import SessionLocal
-from app.services import rbac as rbac_service, abac as abac_service
+from app.db.database import get_session_local
+from app.services import rbac as rbac_service, abac as abac_service, user as user_service
 from app.schemas.rbac import RoleCreate, PermissionCreate, ResourceCreate
 from app.schemas.abac import AttributeCreate, PolicyCreate, PolicyAssignmentCreate
 
 def init_database():
     """Initialize database with default RBAC and ABAC data"""
-    db = SessionLocal()
+    db = get_session_local()()
     
     try:
         print("Initializing RBAC and ABAC system...")
@@ -52,6 +53,11 @@ def init_database():
             PermissionCreate(name="permission.write", display_name="Write Permissions", resource="permission", action="write", description="Create and update permissions"),
             PermissionCreate(name="permission.delete", display_name="Delete Permissions", resource="permission", action="delete", description="Delete permissions"),
             
+            # Resource permissions
+            PermissionCreate(name="resource.read", display_name="Read Resources", resource="resource", action="read", description="View resource information"),
+            PermissionCreate(name="resource.write", display_name="Write Resources", resource="resource", action="write", description="Create and update resources"),
+            PermissionCreate(name="resource.delete", display_name="Delete Resources", resource="resource", action="delete", description="Delete resources"),
+            
             # Feature permissions
             PermissionCreate(name="feature.read", display_name="Read Features", resource="feature", action="read", description="View feature information"),
             PermissionCreate(name="feature.write", display_name="Write Features", resource="feature", action="write", description="Create and update features"),
@@ -121,6 +127,17 @@ def init_database():
         rbac_service.assign_permissions_to_role(db, created_roles["readonly"].id, readonly_permissions)
         print("  ✓ Assigned readonly permissions to readonly")
         
+        # Bootstrap admin: mọi route đều yêu cầu permission nên cần 1 user super_admin đầu tiên
+        admin_email = os.getenv("INIT_ADMIN_EMAIL")
+        if admin_email:
+            admin_user = user_service.get_user_by_email(db, admin_email)
+            if admin_user:
+                current_role_ids = [r.id for r in admin_user.roles]
+                rbac_service.assign_roles_to_user(db, admin_user.id, current_role_ids + [created_roles["super_admin"].id])
+                print(f"  ✓ Assigned super_admin to {admin_email}")
+            else:
+                print(f"  ⚠ INIT_ADMIN_EMAIL {admin_email} not found, register it first")
+        
         # Create default attributes for ABAC
         print("Creating default attributes...")
         attributes = [
@@ -0,0 +1,69 @@
+"""
+Test environment, set before any app module reads app.core.config.
+
+The app runs on a temporary SQLite file; a second file is its read replica
+(see test_replicas.py). Service tests get their own database per test from
+the fixtures below; a module overrides `seed` (and `create_schema`) for its data.
+"""
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'primary.db')}"
+os.environ["DATABASE_REPLICA_URLS"] = f"sqlite:///{os.path.join(_tmp, 'replica.db')}"
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+import pytest
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import Session
+
+from app.db.database import Base
+from app.model import abac, feature, rbac, token, user  # noqa: F401 (register mappers)
+
+
+@pytest.fixture
+def seed():
+    """(table, rows) pairs inserted before the test starts"""
+    return []
+
+
+@pytest.fixture
+def create_schema():
+    return Base.metadata.create_all
+
+
+@pytest.fixture
+def engine(tmp_path, create_schema, seed):
+    """A fresh SQLite file with the schema and the module's seed rows"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    create_schema(engine)
+    with engine.begin() as conn:
+        for table, rows in seed:
+            conn.execute(insert(table), rows)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def url(engine) -> str:
+    return engine.url.render_as_string(hide_password=False)
+
+
+@pytest.fixture
+def statements(engine):
+    """SQL the engine runs during the test (seeding not included)"""
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+@pytest.fixture
+def session(engine):
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def db(session, statements):
+    return session, statements
@@ -0,0 +1,75 @@
+"""
+Async database stack: URL translation and sync services run through AsyncSession.run_sync.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.database import Base, to_async_url
+from app.model import abac, token  # noqa: F401 (register mappers)
+from app.model.rbac import Role, user_roles
+from app.model.user import User
+from app.services import auth as auth_service, login_tracker, rbac as rbac_service
+
+
+@pytest.mark.parametrize("url, expected, connect_args", [
+    ("postgresql://iam:pw@db/iam", "postgresql+asyncpg://iam:***@db/iam", {}),
+    ("postgresql://iam:pw@db/iam?sslmode=require", "postgresql+asyncpg://iam:***@db/iam", {"ssl": "require"}),
+    ("sqlite:///./iam.db", "sqlite+aiosqlite:///./iam.db", {}),
+])
+def test_to_async_url(url, expected, connect_args):
+    parsed, args = to_async_url(url)
+    assert parsed.render_as_string() == expected and args == connect_args
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    path = tmp_path / "async.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"email": "a@example.com", "password_hash": "x"}])
+        conn.execute(insert(Role), [{"name": "staff", "display_name": "Staff"}])
+        conn.execute(insert(user_roles), [{"user_id": 1, "role_id": 1}])
+    engine.dispose()
+    monkeypatch.setattr(login_tracker, "_pending", {})
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    yield async_sessionmaker(async_engine, expire_on_commit=False), async_engine
+
+
+def _run(session_factory, scenario):
+    factory, engine = session_factory
+
+    async def main():
+        try:
+            return await scenario(factory)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+def test_register_and_login_on_an_async_session(session_factory):
+    async def scenario(factory):
+        async with factory() as db:
+            created = await auth_service.create_user_async(db, "b@example.com", "s3cret", "B")
+        async with factory() as db:
+            ok = await auth_service.authenticate_user_async(db, "b@example.com", "s3cret")
+            wrong = await auth_service.authenticate_user_async(db, "b@example.com", "nope")
+        return created, ok, wrong
+
+    created, ok, wrong = _run(session_factory, scenario)
+    # expire_on_commit=False: object vẫn đọc được sau khi session đóng
+    assert created.email == "b@example.com" and ok.id == created.id and wrong is False
+    assert created.id in login_tracker._pending
+
+
+def test_lazy_relationships_load_inside_run_sync(session_factory):
+    async def scenario(factory):
+        async with factory() as db:
+            roles = await db.run_sync(rbac_service.get_user_roles, 1)
+            return [role.name for role in roles]
+
+    assert _run(session_factory, scenario) == ["staff"]
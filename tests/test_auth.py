@@ -1,2 +1,81 @@
-def test_placeholder():
-    assert True
\ No newline at end of file
+"""
+Login and refresh: outdated hashes upgraded once, one rotation winner per token, reuse and inactive users revoke the family.
+"""
+import pytest
+from sqlalchemy import event
+
+from app.model.user import User
+from app.services import auth as auth_service, login_tracker, principal_cache, token_revocation
+from app.utils import security
+from app.utils.security import create_access_token, create_refresh_token
+
+
+@pytest.fixture
+def seed():
+    return [(User, [
+        {"email": "active@example.com", "password_hash": "x", "is_active": True},
+        {"email": "locked@example.com", "password_hash": "x", "is_active": False},
+    ])]
+
+
+@pytest.fixture
+def db(session, monkeypatch):
+    monkeypatch.setattr(token_revocation, "_loaded", True)
+    monkeypatch.setattr(token_revocation, "_revoked", {})
+    monkeypatch.setattr(token_revocation, "_bloom", token_revocation._bloom)
+    token_revocation._rebuild_bloom([])
+    principal_cache.invalidate_all()
+    yield session
+    principal_cache.invalidate_all()
+
+
+def test_refresh_is_refused_for_inactive_or_deleted_users(db):
+    token = create_refresh_token({"sub": "2"}, "fam-locked")
+    assert auth_service.rotate_refresh_token(db, token) is None
+    assert token_revocation.is_revoked(token_revocation.family_key("fam-locked"))
+
+    token = create_refresh_token({"sub": "99"}, "fam-deleted")
+    assert auth_service.rotate_refresh_token(db, token) is None
+    assert token_revocation.is_revoked(token_revocation.family_key("fam-deleted"))
+
+    assert auth_service.rotate_refresh_token(db, create_refresh_token({"sub": "1"}, "fam-ok")) == (1, "fam-ok")
+
+
+def test_outdated_hash_is_upgraded_on_login_once(db, monkeypatch):
+    weak = security.build_pwd_context(bcrypt_rounds=4)
+    db.get(User, 1).password_hash = weak.hash("s3cret")
+    db.commit()
+    strong = security.build_pwd_context(bcrypt_rounds=5)
+    monkeypatch.setattr(auth_service, "verify_and_update_password", strong.verify_and_update)
+    monkeypatch.setattr(login_tracker, "_pending", {})
+    updates = []
+    event.listen(db.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: updates.append(statement) if statement.startswith("UPDATE") else None)
+
+    assert not auth_service.authenticate_user(db, "active@example.com", "wrong")
+    assert updates == []
+    user = auth_service.authenticate_user(db, "active@example.com", "s3cret")
+    assert user.password_hash.startswith("$2b$05$") and len(updates) == 1
+    # Hash đã theo cấu hình hiện tại: login sau không ghi DB, last_login_at chỉ được đệm
+    assert auth_service.authenticate_user(db, "active@example.com", "s3cret")
+    assert len(updates) == 1 and 1 in login_tracker._pending
+
+
+def test_unknown_hash_scheme_is_a_configuration_error():
+    with pytest.raises(ValueError):
+        security.build_pwd_context("md5")
+
+
+def test_refresh_token_rotates_once_and_reuse_revokes_the_family(db):
+    first = create_refresh_token({"sub": "1"}, "fam-1")
+    assert auth_service.rotate_refresh_token(db, first) == (1, "fam-1")
+    second = create_refresh_token({"sub": "1"}, "fam-1")
+    # Token đã xoay vòng được dùng lại: coi như bị lộ, cả family bị thu hồi
+    assert auth_service.rotate_refresh_token(db, first) is None
+    assert token_revocation.is_revoked(token_revocation.family_key("fam-1"))
+    assert auth_service.rotate_refresh_token(db, second) is None
+
+
+def test_access_tokens_are_not_refresh_tokens(db):
+    assert auth_service.rotate_refresh_token(db, create_access_token({"sub": "1", "fam": "fam-1"})) is None
+    assert auth_service.rotate_refresh_token(db, "not-a-token") is None
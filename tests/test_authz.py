@@ -0,0 +1,111 @@
+"""
+Revision-stamped authz claims: revision tracking, bit-packed permission ids, token fast path.
+"""
+import pytest
+from sqlalchemy import insert
+
+from app.model.rbac import Permission, Role, role_closure, role_permissions, user_roles
+from app.model.user import User
+from app.services import authz, permission_cache, rbac as rbac_service
+from app.utils.security import create_access_token, decode_token
+
+
+@pytest.fixture
+def seed():
+    return [
+        (User, [{"email": "a@example.com", "password_hash": "x"}]),
+        (Role, [{"name": "staff", "display_name": "Staff"}]),
+        (role_closure, [{"ancestor_id": 1, "descendant_id": 1, "depth": 0}]),
+        (Permission, [
+            {"id": i, "name": f"p{i}", "display_name": f"P{i}", "resource": "doc", "action": f"a{i}"}
+            for i in (1, 5, 9)
+        ]),
+        (role_permissions, [{"role_id": 1, "permission_id": i} for i in (1, 9)]),
+        (user_roles, [{"user_id": 1, "role_id": 1}]),
+    ]
+
+
+@pytest.fixture
+def db(session, monkeypatch):
+    monkeypatch.setattr(authz, "_current_revision", None)
+    monkeypatch.setattr(authz, "_revision_expires_at", 0.0)
+    monkeypatch.setattr(authz, "_catalog_revision", None)
+    permission_cache.invalidate_all()
+    return session
+
+
+def test_pack_ids_round_trip_and_cap():
+    packed = authz.pack_ids({0, 3, 64, 200})
+    assert authz.unpack_ids(packed) == frozenset({0, 3, 64, 200})
+    assert authz.unpack_ids(authz.pack_ids([])) == frozenset()
+    assert authz.pack_ids({1, 3000}, max_id=2048) is None
+
+
+def test_claims_are_omitted_when_ids_are_too_large(db, monkeypatch):
+    assert authz.build_authz_claims(db, 1)["perms"] == authz.pack_ids({1, 9})
+    monkeypatch.setattr(authz, "JWT_AUTHZ_MAX_PERMISSION_ID", 4)
+    assert authz.build_authz_claims(db, 1) == {}
+    # Không có claims: quyền đọc từ DB
+    context = authz.resolve_authz(db, 1, {"sub": "1"})
+    assert not context.from_token and context.permission_ids == frozenset({1, 9})
+
+
+def test_fresh_claims_are_used_without_the_database(db):
+    claims = authz.build_authz_claims(db, 1)
+    authz.get_current_revision(db)
+    context = authz.resolve_authz_from_token(1, claims)
+    assert context.from_token and context.permission_ids == frozenset({1, 9})
+    assert authz.context_has_permission(db, context, "doc", "a9")
+    assert not authz.context_has_permission(db, context, "doc", "a5")
+
+
+def test_rbac_change_makes_claims_stale(db):
+    claims = authz.build_authz_claims(db, 1)
+    authz.get_current_revision(db)
+    assert rbac_service.assign_permissions_to_role(db, 1, [5])
+    # Revision được bump trong cùng transaction và áp dụng cho worker này khi commit
+    assert authz.current_revision() == claims["rev"] + 1
+    assert authz.resolve_authz_from_token(1, claims) is None
+    context = authz.resolve_authz(db, 1, claims)
+    assert not context.from_token and context.permission_ids == frozenset({5})
+
+
+def test_revision_expires_and_is_reread(db, monkeypatch):
+    claims = authz.build_authz_claims(db, 1)
+    authz.get_current_revision(db)
+    # Một worker khác đổi RBAC và message bị lỡ: sau TTL revision được đọc lại
+    rbac_service.bump_rbac_revision(db)
+    db.commit()
+    assert authz.resolve_authz_from_token(1, claims) is not None
+    monkeypatch.setattr(authz, "_revision_expires_at", 0.0)
+    assert authz.current_revision() is None
+    assert authz.resolve_authz_from_token(1, claims) is None
+    assert authz.get_current_revision(db) == claims["rev"] + 1
+
+
+def test_claims_survive_signing(db):
+    claims = authz.build_authz_claims(db, 1)
+    token = create_access_token({"sub": "1", **claims})
+    authz.get_current_revision(db)
+    context = authz.resolve_authz_from_token(1, decode_token(token))
+    assert context.from_token and context.role_ids == frozenset({1}) and context.permission_ids == frozenset({1, 9})
+
+
+def test_bus_messages_only_move_the_revision_forward(db):
+    authz.get_current_revision(db)
+    authz._on_event({"type": "rbac.users", "user_ids": [1], "revision": 5})
+    assert authz.current_revision() == 5
+    authz._on_event({"type": "rbac.all", "revision": 3})
+    assert authz.current_revision() == 5
+    authz._on_event({"type": "reset"})
+    assert authz.current_revision() is None
+
+
+def test_catalog_follows_the_revision(db):
+    assert ("doc", "a5") in authz.get_permission_catalog(db)
+    db.execute(insert(Permission), [{"id": 12, "name": "p12", "display_name": "P12", "resource": "doc", "action": "a12"}])
+    db.commit()
+    # Thêm permission không đổi quyền của ai: catalog chỉ nạp lại khi revision đổi
+    assert ("doc", "a12") not in authz.get_permission_catalog(db)
+    rbac_service.assign_permissions_to_role(db, 1, [1, 9, 12])
+    assert authz.get_permission_catalog(db)[("doc", "a12")] == 12
@@ -0,0 +1,100 @@
+"""
+Invalidation bus: messages go out with the transaction of the change they describe.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core import events
+from app.model.rbac import Role
+from app.model.user import User
+from app.services import principal_cache, rbac as rbac_service  # noqa: F401 (principal_cache: after_flush hook)
+
+
+class RecordingBus(events.LocalBus):
+    """LocalBus that records what would be NOTIFYed, and on which connection"""
+
+    def __init__(self, fail: bool = False):
+        super().__init__()
+        self.fail = fail
+        self.notified = []
+        self.received = []
+        self.subscribe(self.received.append)
+
+    def notify(self, db, message):
+        if self.fail:
+            raise RuntimeError("NOTIFY failed")
+        self.notified.append((db.connection(), message))
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    bus = RecordingBus()
+    monkeypatch.setattr(events, "_bus", bus)
+    return bus
+
+
+@pytest.fixture
+def seed():
+    return [(User, [{"email": "a@example.com", "password_hash": "x"}]), (Role, [{"name": "staff", "display_name": "Staff"}])]
+
+
+@pytest.fixture
+def db(session):
+    return session
+
+
+def test_message_is_sent_on_the_session_connection_and_dispatched_on_commit(bus, db):
+    events.publish(db, {"type": "test"})
+    assert bus.notified == [(db.connection(), {"type": "test"})]
+    assert bus.received == []
+    db.commit()
+    assert bus.received == [{"type": "test"}]
+
+
+def test_rollback_drops_the_message(bus, db):
+    events.publish(db, {"type": "test"})
+    db.rollback()
+    db.commit()
+    assert bus.received == []
+
+
+def test_notify_failure_fails_the_write(monkeypatch, db):
+    monkeypatch.setattr(events, "_bus", RecordingBus(fail=True))
+    user = db.get(User, 1)
+    user.name = "Changed"
+    # after_flush publishes users.changed: the flush (and so the commit) fails
+    with pytest.raises(RuntimeError):
+        db.commit()
+    db.rollback()
+    assert db.get(User, 1).name is None
+
+
+def test_user_change_publishes_in_its_transaction(bus, db):
+    db.get(User, 1).name = "Changed"
+    db.flush()
+    assert [message for _, message in bus.notified] == [{"type": "users.changed", "user_ids": [1]}]
+    assert bus.received == []
+    db.commit()
+    assert bus.received == [{"type": "users.changed", "user_ids": [1]}]
+
+
+def test_async_mutation_publishes_on_its_own_connection(bus, url):
+    async def assign():
+        engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"))
+        checkouts = []
+        event.listen(engine.sync_engine, "checkout", lambda *args: checkouts.append(args[0]))
+        try:
+            async with AsyncSession(engine) as db:
+                assert await db.run_sync(rbac_service.assign_roles_to_user, 1, [1])
+        finally:
+            await engine.dispose()
+        return checkouts
+
+    checkouts = asyncio.run(assign())
+    # Một connection cho cả write lẫn NOTIFY, không có connection sync nào khác
+    assert len(checkouts) == 1
+    assert [message["type"] for _, message in bus.notified] == ["rbac.users"]
+    assert bus.received[-1]["user_ids"] == [1]
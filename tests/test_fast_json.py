@@ -0,0 +1,98 @@
+"""
+JSON_FAST_PATH: column selects + RowSerializer give the same JSON as ORM objects + response_model.
+"""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+
+from app.db import migrations
+from app.model.abac import AccessLog
+from app.model.user import User
+from app.schemas.abac import AccessLogResponse
+from app.schemas.user import UserResponse
+from app.services import abac as abac_service, user as user_service, user_search
+from app.utils.fast_json import RowSerializer
+
+users_json = RowSerializer(User, UserResponse)
+access_logs_json = RowSerializer(AccessLog, AccessLogResponse)
+
+
+@pytest.fixture
+def create_schema():
+    # Schema từ migrations: có cả users_fts (0004)
+    return migrations.upgrade
+
+
+@pytest.fixture
+def seed():
+    created = datetime(2024, 1, 1)
+    return [
+        (User, [
+            {"email": f"user{i}@example.com", "password_hash": "x", "name": f"User {i}",
+             "is_active": i % 3 != 0, "department": "Engineering" if i % 2 else None,
+             "dob": None if i % 2 else datetime(1990, 1, i + 1).date(),
+             "created_at": created + timedelta(minutes=i), "updated_at": created}
+            for i in range(25)
+        ]),
+        (AccessLog, [
+            {"user_id": i % 4 + 1, "resource_type": "document", "resource_id": i, "action": "read",
+             "decision": "allow" if i % 2 else "deny", "context": {"ip": f"10.0.0.{i}"} if i % 3 else None,
+             "created_at": created + timedelta(seconds=i)}
+            for i in range(25)
+        ]),
+    ]
+
+
+@pytest.fixture
+def db(session):
+    assert user_search.get_backend(session) == "fts5"
+    return session
+
+
+def _expected(schema, objects):
+    return jsonable_encoder([schema.model_validate(o) for o in objects])
+
+
+@pytest.mark.parametrize("filters", [{}, {"is_active": False}, {"search": "user1"}, {"page": 2, "page_size": 10}])
+def test_user_list_matches_orm_path(db, filters):
+    expected = _expected(UserResponse, user_service.get_logged_in_users(db, **filters))
+    rows = user_service.get_logged_in_users(db, columns=users_json.columns, **filters)
+    assert all(type(row) is dict for row in rows)
+    assert json.loads(users_json.dump_list(rows)) == expected
+    assert expected
+
+
+def test_user_cursor_pages_match_orm_path(db):
+    cursor, seen = "", 0
+    while cursor is not None:
+        objects, next_cursor = user_service.get_users_page(db, cursor, 10, is_active=True)
+        rows, fast_cursor = user_service.get_users_page(db, cursor, 10, is_active=True, columns=users_json.columns)
+        assert fast_cursor == next_cursor
+        page = json.loads(users_json.dump_page(rows, fast_cursor))
+        assert page == {"items": _expected(UserResponse, objects), "next_cursor": next_cursor}
+        cursor, seen = next_cursor, seen + len(rows)
+    assert seen == 16
+
+
+def test_access_logs_match_orm_path(db):
+    expected = _expected(AccessLogResponse, abac_service.get_access_logs(db, user_id=2))
+    rows = abac_service.get_access_logs(db, user_id=2, columns=access_logs_json.columns)
+    assert json.loads(access_logs_json.dump_list(rows)) == expected
+
+    objects, next_cursor = abac_service.get_access_logs_page(db, "", 5)
+    rows, _ = abac_service.get_access_logs_page(db, "", 5, columns=access_logs_json.columns)
+    assert json.loads(access_logs_json.dump_page(rows, next_cursor))["items"] == _expected(AccessLogResponse, objects)
+
+
+def test_response_keeps_headers_set_on_injected_response(db):
+    injected = Response()
+    del injected.headers["content-length"]
+    injected.headers["X-Total-Count"] = "25"
+    rows = user_service.get_logged_in_users(db, page_size=3, columns=users_json.columns)
+    response = users_json.list_response(injected, rows)
+    assert response.headers["x-total-count"] == "25"
+    assert response.headers["content-type"] == "application/json"
+    assert len(json.loads(response.body)) == 3
@@ -0,0 +1,118 @@
+"""
+Sparse fieldsets (?fields=): parsing, trimmed serializers and column-restricted selects.
+"""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.model.abac import Attribute, UserAttribute
+from app.model.user import User
+from app.schemas.abac import UserAttributeResponse
+from app.schemas.fields import parse_fields, project
+from app.schemas.user import UserResponse
+from app.services import abac as abac_service, user as user_service
+from app.utils import fast_json
+
+
+@pytest.fixture
+def seed():
+    created = datetime(2024, 1, 1)
+    return [
+        (User, [
+            {"email": f"user{i}@example.com", "password_hash": "x", "name": f"User {i}",
+             "avatar_url": f"https://cdn.example.com/{i}.png", "created_at": created + timedelta(minutes=i)}
+            for i in range(5)
+        ]),
+        (Attribute, [
+            {"name": name, "display_name": name.title(), "attribute_type": "string", "data_type": "subject"}
+            for name in ("department", "level")
+        ]),
+        (UserAttribute, [
+            {"user_id": 1, "attribute_id": 1, "value": "eng"},
+            {"user_id": 1, "attribute_id": 2, "value": "3"},
+        ]),
+    ]
+
+
+def test_parse_fields_is_canonical():
+    assert parse_fields(UserResponse, None) is None
+    assert parse_fields(UserResponse, " , ") is None
+    assert parse_fields(UserResponse, "name, id,email,id") == ("id", "email", "name")
+    assert parse_fields(UserAttributeResponse, "attribute.name,value,attribute.id") == ("value", "attribute.name", "attribute.id")
+    # Cả model lồng thắng các field con
+    assert parse_fields(UserAttributeResponse, "attribute.name,attribute") == ("attribute",)
+    with pytest.raises(ValueError, match="password_hash"):
+        parse_fields(UserResponse, "id,password_hash")
+    with pytest.raises(ValueError):
+        parse_fields(UserResponse, "email.domain")
+    with pytest.raises(ValueError):
+        parse_fields(UserAttributeResponse, "attribute.bogus")
+
+
+def test_projected_schema_is_cached_and_trimmed():
+    fields = parse_fields(UserAttributeResponse, "value,attribute.name")
+    model = project(UserAttributeResponse, fields)
+    assert model is project(UserAttributeResponse, fields)
+    assert list(model.model_fields) == ["value", "attribute"]
+    assert list(model.model_fields["attribute"].annotation.model_fields) == ["name"]
+    assert fast_json.sparse_serializer(User, UserResponse, ("id",)) is fast_json.sparse_serializer(User, UserResponse, ("id",))
+
+
+def test_user_list_selects_only_requested_columns(db):
+    session, statements = db
+    serializer = fast_json.serializer_for(User, UserResponse, "id,email,name")
+    rows = user_service.get_logged_in_users(session, page_size=2, columns=serializer.columns)
+    assert json.loads(serializer.dump_list(rows)) == [
+        {"id": 5, "email": "user4@example.com", "name": "User 4"},
+        {"id": 4, "email": "user3@example.com", "name": "User 3"},
+    ]
+    assert "avatar_url" not in statements[-1] and "password_hash" not in statements[-1]
+
+
+def test_cursor_pages_work_without_sort_keys_in_fields(db):
+    session, _ = db
+    serializer = fast_json.serializer_for(User, UserResponse, "email")
+    emails, cursor = [], ""
+    while cursor is not None:
+        rows, cursor = user_service.get_users_page(session, cursor, 2, columns=serializer.columns)
+        page = json.loads(serializer.dump_page(rows, cursor))
+        assert all(list(item) == ["email"] for item in page["items"])
+        emails += [item["email"] for item in page["items"]]
+    assert emails == [f"user{i}@example.com" for i in reversed(range(5))]
+
+
+def test_user_detail_with_fields(db):
+    session, statements = db
+    serializer = fast_json.serializer_for(User, UserResponse, "name")
+    row = user_service.get_user_by_id(session, 2, columns=serializer.columns)
+    assert json.loads(serializer.dump_one(row)) == {"name": "User 1"}
+    assert user_service.get_user_by_id(session, 99, columns=serializer.columns) is None
+
+
+def test_user_attributes_load_only_requested_fields(db):
+    session, statements = db
+    fields = parse_fields(UserAttributeResponse, "value,attribute.name")
+    serializer = fast_json.sparse_serializer(UserAttribute, UserAttributeResponse, fields)
+    attributes = abac_service.get_user_attributes(session, 1, fields=fields)
+    assert json.loads(serializer.dump_list(attributes, from_attributes=True)) == [
+        {"value": "eng", "attribute": {"name": "department"}},
+        {"value": "3", "attribute": {"name": "level"}},
+    ]
+    assert len(statements) == 1 and "display_name" not in statements[0] and "created_at" not in statements[0]
+
+    session.expunge_all()
+    statements.clear()
+    fields = parse_fields(UserAttributeResponse, "id,value")
+    abac_service.get_user_attributes(session, 1, fields=fields)
+    assert "JOIN attributes" not in statements[0]
+
+
+def test_full_user_attributes_are_loaded_in_one_query(db):
+    session, statements = db
+    attributes = abac_service.get_user_attributes(session, 1)
+    session.close()
+    # Session đã đóng (như sau DBRoute): attribute phải đã được nạp sẵn
+    payload = [UserAttributeResponse.model_validate(a).attribute.name for a in attributes]
+    assert payload == ["department", "level"]
+    assert len(statements) == 1
@@ -0,0 +1,73 @@
+"""
+HashExecutor: bounded queue, fast rejection, slots held until the job finishes.
+"""
+import asyncio
+import threading
+
+import pytest
+
+from app.core import hashing
+
+
+@pytest.fixture
+def executor():
+    executor = hashing.HashExecutor("thread", workers=1, queue_size=0)
+    yield executor
+    executor.shutdown()
+
+
+def test_cancelled_request_keeps_the_slot_until_the_job_ends(executor):
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "done"
+
+    async def scenario():
+        task = asyncio.create_task(executor.run(slow))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # Job vẫn chạy trong pool: chưa có chỗ cho job mới
+        with pytest.raises(hashing.PasswordHasherBusy):
+            await executor.run(str, "x")
+        release.set()
+        for _ in range(100):
+            if executor._pending == 0:
+                break
+            await asyncio.sleep(0.01)
+        return await executor.run(str.upper, "x")
+
+    assert asyncio.run(scenario()) == "X"
+
+
+def test_full_queue_is_rejected_at_once(executor):
+    release = threading.Event()
+
+    async def scenario():
+        task = asyncio.create_task(executor.run(release.wait, 5))
+        await asyncio.sleep(0)
+        rejected = executor._rejected.value()
+        with pytest.raises(hashing.PasswordHasherBusy):
+            await executor.run(str, "x")
+        assert executor._rejected.value() == rejected + 1
+        release.set()
+        return await task
+
+    assert asyncio.run(scenario()) is True
+    assert executor._pending == 0
+
+
+def test_hash_and_verify_run_off_the_event_loop():
+    async def scenario():
+        loop_thread = threading.get_ident()
+        hashed = await hashing.hash_password("s3cret")
+        ok, new_hash = await hashing.verify_and_update_password("s3cret", hashed)
+        worker_thread = await hashing.get_executor().run(threading.get_ident)
+        return hashed, ok, new_hash, loop_thread != worker_thread
+
+    hashed, ok, new_hash, off_loop = asyncio.run(scenario())
+    assert hashed.startswith("$2") and ok and new_hash is None and off_loop
+    assert not asyncio.run(hashing.verify_password("wrong", hashed))
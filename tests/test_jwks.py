@@ -0,0 +1,70 @@
+"""
+Asymmetric signing key ring, JWKS publication and the JWKSVerifier of other services.
+"""
+import argparse
+
+import pytest
+from jose import JWTError, jwt
+
+from app.core import keys
+from app.utils import jwks
+
+
+def test_first_use_fetches_even_right_after_boot(monkeypatch):
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return {"keys": []}
+
+    # Máy vừa boot: time.monotonic() nhỏ hơn cả min_refresh_interval lẫn ttl
+    monkeypatch.setattr(jwks.time, "monotonic", lambda: 5.0)
+    verifier = jwks.JWKSVerifier(fetch=fetch, ttl=3600, min_refresh_interval=60)
+    verifier.refresh()
+    assert calls == [1]
+    verifier.refresh(force=True)
+    assert calls == [1]
+
+
+@pytest.fixture
+def keys_dir(tmp_path):
+    for kid in ("2024-01", "2024-02"):
+        keys._generate(argparse.Namespace(alg="ES256", kid=kid, dir=str(tmp_path), bits=0))
+    return tmp_path
+
+
+def test_keyring_signs_with_the_active_kid_and_publishes_every_key(keys_dir):
+    ring = keys.load_keyring("ES256", str(keys_dir), active_kid="2024-01")
+    token = ring.sign({"sub": "1"})
+    assert jwt.get_unverified_header(token)["kid"] == "2024-01"
+    assert ring.verify(token)["sub"] == "1"
+    assert sorted(k["kid"] for k in ring.jwks()["keys"]) == ["2024-01", "2024-02"]
+    assert all("d" not in k for k in ring.jwks()["keys"])
+    # Mặc định: kid mới nhất ký
+    assert keys.load_keyring("ES256", str(keys_dir), active_kid=None).active_kid == "2024-02"
+    with pytest.raises(RuntimeError):
+        keys.load_keyring("ES256", str(keys_dir), active_kid="2023-12")
+
+
+def test_verifier_picks_up_a_rotated_key_once(keys_dir):
+    old = keys.load_keyring("ES256", str(keys_dir), active_kid="2024-01")
+    keys._generate(argparse.Namespace(alg="ES256", kid="2024-03", dir=str(keys_dir), bits=0))
+    new = keys.load_keyring("ES256", str(keys_dir), active_kid="2024-03")
+    published = [old.jwks()]
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return published[-1]
+
+    verifier = jwks.JWKSVerifier(fetch=fetch, min_refresh_interval=0)
+    assert verifier.verify(old.sign({"sub": "1"}))["sub"] == "1"
+    published.append(new.jwks())
+    # kid lạ: tải lại JWKS một lần rồi verify được
+    assert verifier.verify(new.sign({"sub": "2"}))["sub"] == "2"
+    assert len(calls) == 2
+
+    throttled = jwks.JWKSVerifier(fetch=lambda: old.jwks(), min_refresh_interval=60)
+    throttled.refresh()
+    with pytest.raises(JWTError):
+        throttled.verify(new.sign({"sub": "2"}))
@@ -0,0 +1,64 @@
+"""
+List totals: exact / estimated / cached counts, cached ones kept current by ORM writes.
+"""
+import pytest
+
+from app.model.user import User
+from app.services import list_counts
+
+
+@pytest.fixture
+def seed():
+    return [(User, [{"email": f"user{i}@example.com", "password_hash": "x", "is_active": i % 3 != 0} for i in range(9)])]
+
+
+@pytest.fixture
+def db(db):
+    list_counts.invalidate_all()
+    yield db
+    list_counts.invalidate_all()
+
+
+def _counts(statements):
+    return sum("count(*)" in s for s in statements)
+
+
+@pytest.mark.parametrize("mode", list_counts.COUNT_MODES)
+def test_modes_agree_on_a_quiet_table(db, mode):
+    session, _ = db
+    assert list_counts.count_rows(session, User, mode) == 9
+    assert list_counts.count_rows(session, User, mode, is_active=True) == 6
+    assert list_counts.count_rows(session, User, mode, is_active=None) == 9
+
+
+def test_unknown_mode_is_rejected(db):
+    session, _ = db
+    with pytest.raises(ValueError):
+        list_counts.count_rows(session, User, "approximate")
+
+
+def test_cached_count_follows_orm_writes(db):
+    session, statements = db
+    assert list_counts.count_rows(session, User, "cached", is_active=False) == 3
+    assert list_counts.count_rows(session, User, "cached") == 9
+    statements.clear()
+    session.add(User(email="new@example.com", password_hash="x", is_active=False))
+    session.commit()
+    session.delete(session.get(User, 2))
+    session.commit()
+    assert list_counts.count_rows(session, User, "cached", is_active=False) == 4
+    assert list_counts.count_rows(session, User, "cached") == 9
+    assert _counts(statements) == 0
+
+
+def test_rolled_back_insert_does_not_count(db):
+    session, _ = db
+    list_counts.count_rows(session, User, "cached")
+    session.add(User(email="new@example.com", password_hash="x"))
+    session.flush()
+    session.rollback()
+    assert list_counts.count_rows(session, User, "cached") == 9
+
+
+def test_count_headers():
+    assert list_counts.count_headers(42, "estimated") == {"X-Total-Count": "42", "X-Total-Count-Mode": "estimated"}
@@ -0,0 +1,72 @@
+"""
+Write-behind last_login_at: logins are buffered per user and flushed in batches.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from app.model.user import User
+from app.services import login_tracker
+
+T0 = datetime(2024, 1, 1, 12, 0)
+
+
+@pytest.fixture
+def seed():
+    return [(User, [{"email": f"user{i}@example.com", "password_hash": "x"} for i in range(3)])]
+
+
+@pytest.fixture
+def db(db, monkeypatch):
+    monkeypatch.setattr(login_tracker, "_pending", {})
+    return db
+
+
+def _last_logins(session):
+    return dict(session.execute(select(User.id, User.last_login_at)).all())
+
+
+def test_logins_are_merged_and_flushed_in_one_batch(db):
+    session, statements = db
+    login_tracker.record_login(1, T0)
+    login_tracker.record_login(1, T0 + timedelta(minutes=5))
+    login_tracker.record_login(1, T0 + timedelta(minutes=1))
+    login_tracker.record_login(2, T0)
+    assert login_tracker.flush(session) == 2
+    assert sum(s.startswith("UPDATE users") for s in statements) == 1
+    assert _last_logins(session) == {1: T0 + timedelta(minutes=5), 2: T0, 3: None}
+    assert login_tracker.flush(session) == 0
+
+
+def test_older_value_does_not_overwrite_a_newer_one(db):
+    session, _ = db
+    # Worker khác đã flush một lần login mới hơn
+    login_tracker.record_login(1, T0 + timedelta(hours=1))
+    login_tracker.flush(session)
+    login_tracker.record_login(1, T0)
+    login_tracker.flush(session)
+    assert _last_logins(session)[1] == T0 + timedelta(hours=1)
+
+
+def test_failed_flush_keeps_the_buffer(db, monkeypatch):
+    session, _ = db
+    login_tracker.record_login(1, T0)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("database down")
+
+    monkeypatch.setattr(session, "execute", fail)
+    with pytest.raises(RuntimeError):
+        login_tracker.flush(session)
+    assert login_tracker._pending == {1: T0}
+
+
+def test_flush_leaves_updated_at_alone(db):
+    session, _ = db
+    session.execute(update(User).values(updated_at=datetime(2020, 1, 1)))
+    session.commit()
+    login_tracker.record_login(1, T0)
+    login_tracker.flush(session)
+    assert session.scalar(select(User.updated_at).where(User.id == 1)) == datetime(2020, 1, 1)
+    assert _last_logins(session)[1] == T0
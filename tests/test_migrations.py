@@ -0,0 +1,151 @@
+"""
+Alembic migrations and the hot-query index check, on a temporary SQLite file.
+"""
+import pytest
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+from app.db import migrations, query_plans
+from app.db.database import Base
+from app.model import abac, feature, rbac, token, user  # noqa: F401 (register mappers)
+from app.services import abac as abac_service
+
+
+def _alembic_config(url: str) -> Config:
+    config = migrations.alembic_config()
+    config.set_main_option("sqlalchemy.url", url)
+    return config
+
+
+@pytest.fixture
+def migrated(tmp_path):
+    url = f"sqlite:///{tmp_path / 'migrations.db'}"
+    config = _alembic_config(url)
+    command.upgrade(config, "head")
+    engine = create_engine(url)
+    yield config, engine
+    engine.dispose()
+
+
+def test_migrations_match_models(migrated):
+    config, _ = migrated
+    # Raises if autogenerate would still produce operations
+    command.check(config)
+
+
+def test_downgrade_and_upgrade_again(migrated):
+    config, _ = migrated
+    command.downgrade(config, "base")
+    command.upgrade(config, "head")
+    command.check(config)
+
+
+def test_schema_head_matches_revisions():
+    config = _alembic_config("sqlite://")
+    assert ScriptDirectory.from_config(config).get_current_head() == migrations.SCHEMA_HEAD
+
+
+def test_ensure_schema_migrates_once(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'boot.db'}")
+    try:
+        with pytest.raises(RuntimeError):
+            migrations.ensure_schema(engine, migrate=False)
+        assert migrations.ensure_schema(engine, migrate=True) == "migrated"
+        assert migrations.ensure_schema(engine, migrate=True) == "current"
+        assert migrations.ensure_schema(engine, migrate=False) == "current"
+    finally:
+        engine.dispose()
+
+
+def test_hot_queries_use_indexes(migrated):
+    _, engine = migrated
+    assert query_plans.check(engine) == {}
+
+
+def test_check_reports_missing_index(migrated):
+    _, engine = migrated
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_policy_assignments_assignment_type_assignment_id_is_active"))
+    problems = query_plans.check(engine)
+    assert problems["user_policy_assignments"] == ["policy_assignments"]
+    assert problems["global_policies"] == ["policy_assignments"]
+
+
+def test_pre_alembic_database_gets_later_tables(tmp_path):
+    # DB tạo bởi create_all của baseline: đúng schema 0001, chưa có alembic_version
+    url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    config = _alembic_config(url)
+    command.upgrade(config, "0001")
+    engine = create_engine(url)
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE alembic_version"))
+            conn.execute(text("INSERT INTO roles (id, name, display_name) VALUES (1, 'admin', 'Admin')"))
+        assert migrations.ensure_schema(engine, migrate=True) == "migrated"
+        tables = set(inspect(engine).get_table_names())
+        assert {"role_parents", "role_closure", "rbac_state", "revoked_tokens"} <= tables
+        assert "last_login_at" in {c["name"] for c in inspect(engine).get_columns("users")}
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT ancestor_id, descendant_id, depth FROM role_closure")).all() == [(1, 1, 0)]
+        command.check(config)
+    finally:
+        engine.dispose()
+
+
+def test_create_all_database_is_adopted(tmp_path):
+    # DB tạo bởi create_all của một bản giữa chừng: mọi bảng đã có
+    url = f"sqlite:///{tmp_path / 'create_all.db'}"
+    engine = create_engine(url)
+    try:
+        Base.metadata.create_all(bind=engine)
+        assert migrations.ensure_schema(engine, migrate=True) == "migrated"
+        command.check(_alembic_config(url))
+    finally:
+        engine.dispose()
+
+
+def test_missing_closure_rows_are_backfilled(tmp_path):
+    # Role / cạnh cha-con có trước khi closure được duy trì (trước đây startup backfill)
+    url = f"sqlite:///{tmp_path / 'closure.db'}"
+    config = _alembic_config(url)
+    command.upgrade(config, "0004")
+    engine = create_engine(url)
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO roles (id, name, display_name) VALUES (1, 'a', 'A'), (2, 'b', 'B'), (3, 'c', 'C')"))
+            conn.execute(text("INSERT INTO role_parents (role_id, parent_id) VALUES (2, 1), (3, 2), (3, 1)"))
+            conn.execute(text("INSERT INTO role_closure (ancestor_id, descendant_id, depth) VALUES (1, 1, 0)"))
+        command.upgrade(config, "head")
+        with engine.connect() as conn:
+            rows = set(conn.execute(text("SELECT ancestor_id, descendant_id, depth FROM role_closure")).all())
+        assert rows == {(1, 1, 0), (2, 2, 0), (3, 3, 0), (1, 2, 1), (2, 3, 1), (1, 3, 1)}
+    finally:
+        engine.dispose()
+
+
+def test_null_sort_keys_are_backfilled_so_keyset_pages_see_every_row(tmp_path):
+    url = f"sqlite:///{tmp_path / 'keyset.db'}"
+    config = _alembic_config(url)
+    command.upgrade(config, "0005")
+    engine = create_engine(url)
+    try:
+        with engine.begin() as conn:
+            for i in range(5):
+                conn.execute(text(
+                    "INSERT INTO policies (name, policy_type, effect, priority) VALUES (:name, 'allow', 'allow', :priority)"
+                ), {"name": f"p{i}", "priority": None if i % 2 else 10 * i})
+            conn.execute(text("INSERT INTO access_logs (resource_type, action, decision) VALUES ('doc', 'read', 'allow')"))
+        command.upgrade(config, "head")
+        seen, cursor = [], ""
+        with Session(engine) as db:
+            while cursor is not None:
+                page, cursor = abac_service.get_policies_page(db, cursor, 2)
+                seen += [policy.name for policy in page]
+            assert sorted(seen) == [f"p{i}" for i in range(5)]
+            logs, _ = abac_service.get_access_logs_page(db, "", 10)
+            assert len(logs) == 1
+    finally:
+        engine.dispose()
@@ -0,0 +1,61 @@
+"""
+Keyset pagination: opaque cursors, ties on the sort key, bad cursors.
+"""
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.model.user import User
+from app.services import user as user_service
+from app.utils.pagination import decode_cursor, encode_cursor
+
+T0 = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def seed():
+    # Ba user cùng created_at: thứ tự trong nhóm do id quyết định
+    return [(User, [
+        {"email": f"user{i}@example.com", "password_hash": "x", "is_active": i != 4,
+         "created_at": T0 + timedelta(minutes=min(i, 3)), "updated_at": T0}
+        for i in range(7)
+    ])]
+
+
+def test_cursor_round_trip():
+    values = [T0, date(2024, 2, 29), 7, "x", None]
+    cursor = encode_cursor(values)
+    assert "=" not in cursor and decode_cursor(cursor) == values
+
+
+@pytest.mark.parametrize("cursor", ["%%%", "bm90IGpzb24", encode_cursor([1])[:-2] + "!!", "eyJhIjoxfQ"])
+def test_bad_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_pages_cover_every_row_once_newest_first(db):
+    session, statements = db
+    cursor, emails = "", []
+    statements.clear()
+    while cursor is not None:
+        page, cursor = user_service.get_users_page(session, cursor, 2)
+        emails += [u.email for u in page]
+    assert emails == [f"user{i}@example.com" for i in (6, 5, 4, 3, 2, 1, 0)]
+    # Trang sau lọc theo (created_at, id) của dòng cuối thay vì bỏ qua N dòng
+    pages = [s for s in statements if "FROM users" in s]
+    assert all("(users.created_at, users.id) < (?, ?)" in s for s in pages[1:])
+
+
+def test_filters_apply_to_every_page(db):
+    session, _ = db
+    page, cursor = user_service.get_users_page(session, "", 3, is_active=True)
+    rest, last = user_service.get_users_page(session, cursor, 10, is_active=True)
+    assert last is None
+    assert "user4@example.com" not in [u.email for u in page + rest] and len(page + rest) == 6
+
+
+def test_cursor_of_the_wrong_shape_is_rejected(db):
+    session, _ = db
+    with pytest.raises(ValueError):
+        user_service.get_users_page(session, encode_cursor([1]), 2)
@@ -0,0 +1,95 @@
+"""
+Per-worker permission cache: filled on first use, dropped by bus messages after commit.
+"""
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.core import events
+from app.model.rbac import Permission, Role, role_closure, role_permissions
+from app.model.user import User
+from app.services import permission_cache, rbac as rbac_service
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    bus = events.LocalBus()
+    bus.subscribe(permission_cache._on_event)
+    monkeypatch.setattr(events, "_bus", bus)
+    permission_cache.invalidate_all()
+    yield bus
+    permission_cache.invalidate_all()
+
+
+@pytest.fixture
+def seed():
+    return [
+        (User, [{"email": f"user{i}@example.com", "password_hash": "x"} for i in range(2)]),
+        (Role, [{"name": f"r{i}", "display_name": f"R{i}"} for i in range(1, 3)]),
+        (role_closure, [{"ancestor_id": i, "descendant_id": i, "depth": 0} for i in range(1, 3)]),
+        (Permission, [
+            {"name": "read", "display_name": "Read", "resource": "doc", "action": "read"},
+            {"name": "write", "display_name": "Write", "resource": "doc", "action": "write"},
+        ]),
+        (role_permissions, [{"role_id": 1, "permission_id": 1}, {"role_id": 2, "permission_id": 2}]),
+    ]
+
+
+@pytest.fixture
+def db(bus, db):
+    # Mọi test có db đều chạy trên bus của test
+    return db
+
+
+def test_cached_authz_needs_no_query(db):
+    session, statements = db
+    rbac_service.assign_roles_to_user(session, 1, [1])
+    assert permission_cache.has_permission(session, 1, "doc", "read")
+    statements.clear()
+    assert permission_cache.has_permission(session, 1, "doc", "read")
+    assert not permission_cache.has_permission(session, 1, "doc", "write")
+    assert statements == []
+
+
+def test_assignment_drops_only_the_changed_user(db):
+    session, _ = db
+    rbac_service.assign_roles_to_user(session, 1, [1])
+    rbac_service.assign_roles_to_user(session, 2, [1])
+    permission_cache.get_user_authz(session, 1)
+    other = permission_cache.get_user_authz(session, 2)
+    rbac_service.assign_roles_to_user(session, 1, [2])
+    assert permission_cache.has_permission(session, 1, "doc", "write")
+    assert permission_cache.get_user_authz(session, 2) is other
+
+
+def test_rolled_back_change_keeps_the_cache(db):
+    session, _ = db
+    cached = permission_cache.get_user_authz(session, 1)
+    rbac_service._publish_rbac_change(session, [1])
+    session.rollback()
+    assert permission_cache.get_user_authz(session, 1) is cached
+
+
+@pytest.mark.parametrize("kind", ["rbac.all", "reset"])
+def test_broadcasts_clear_every_user(db, bus, kind):
+    session, _ = db
+    cached = permission_cache.get_user_authz(session, 1)
+    bus.publish({"type": kind})
+    assert permission_cache.get_user_authz(session, 1) is not cached
+
+
+def test_failing_subscriber_does_not_stop_the_others(bus):
+    received = []
+    bus.subscribe(lambda message: 1 / 0)
+    bus.subscribe(received.append)
+    bus.publish({"type": "test"})
+    assert received == [{"type": "test"}]
+
+
+def test_postgres_notify_failure_is_raised_and_counted(db):
+    session, _ = db
+    bus = events.PostgresBus("postgresql://iam@localhost/iam", "iam_cache")
+    errors = events._errors.value()
+    # SQLite không có pg_notify: lỗi phải ném ra để write fail theo
+    with pytest.raises(OperationalError):
+        bus.notify(session, {"type": "test"})
+    assert events._errors.value() == errors + 1
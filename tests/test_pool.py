@@ -0,0 +1,102 @@
+"""
+Connection pool: per-strategy engine kwargs, pool metrics and warm-up.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core import metrics
+from app.db import pool
+
+FILE_URL = make_url("postgresql://iam@db/iam")
+
+
+@pytest.mark.parametrize("liveness, expected", [
+    ("pre_ping", {"pool_pre_ping": True}),
+    ("recycle", {"pool_pre_ping": False, "pool_recycle": 300}),
+    ("invalidate", {"pool_pre_ping": False}),
+])
+def test_engine_kwargs_follow_the_liveness_strategy(monkeypatch, liveness, expected):
+    monkeypatch.setattr(pool, "DB_POOL_LIVENESS", liveness)
+    monkeypatch.setattr(pool, "DB_POOL_RECYCLE_SECONDS", 300)
+    kwargs = pool.engine_kwargs(FILE_URL, pool_size=5, max_overflow=2, is_async=False)
+    assert {k: v for k, v in kwargs.items() if k.startswith("pool_pre") or k == "pool_recycle"} == expected
+    assert kwargs["poolclass"] is pool.InstrumentedQueuePool
+    assert (kwargs["pool_size"], kwargs["max_overflow"]) == (5, 2)
+
+
+def test_engine_kwargs_pick_the_async_pool_and_leave_memory_sqlite_alone(monkeypatch):
+    monkeypatch.setattr(pool, "DB_POOL_LIVENESS", "pre_ping")
+    assert pool.engine_kwargs(FILE_URL, 5, 2, is_async=True)["poolclass"] is pool.InstrumentedAsyncQueuePool
+    assert pool.engine_kwargs(make_url("sqlite://"), 5, 2, is_async=False) == {"pool_pre_ping": True}
+
+
+def test_unknown_liveness_strategy_is_rejected(monkeypatch):
+    monkeypatch.setattr(pool, "DB_POOL_LIVENESS", "ping")
+    with pytest.raises(RuntimeError, match="DB_POOL_LIVENESS"):
+        pool.engine_kwargs(FILE_URL, 5, 2, is_async=False)
+
+
+@pytest.fixture
+def engine(tmp_path, request):
+    url = make_url(f"sqlite:///{tmp_path / 'pool.db'}")
+    engine = create_engine(url, **pool.engine_kwargs(url, pool_size=3, max_overflow=1, is_async=False))
+    # Gauge đăng ký theo tên (lần đầu thắng): mỗi test một label riêng
+    label = request.node.name
+    pool.instrument(engine, label)
+    yield engine, label
+    engine.dispose()
+
+
+def _gauge(name, label):
+    return metrics.gauge(f"db.pool.{name}.{label}").value()
+
+
+def test_gauges_and_counters_track_the_pool(engine):
+    engine, label = engine
+    connects = metrics.counter("db.pool.connects")
+    checkouts = metrics.histogram("db.pool.checkout_seconds")
+    before = checkouts.snapshot().get("sync", {}).get("count", 0)
+    with engine.connect() as first, engine.connect():
+        assert (_gauge("in_use", label), _gauge("size", label)) == (2, 3)
+        first.invalidate()
+    assert connects.value(label) == 2
+    assert metrics.counter("db.pool.invalidations").value(label) == 1
+    assert checkouts.snapshot()["sync"]["count"] == before + 2
+    assert (_gauge("in_use", label), _gauge("idle", label)) == (0, 2)
+    # Record đã invalidate mở connection mới ở lần checkout sau
+    with engine.connect(), engine.connect():
+        pass
+    assert connects.value(label) == 3
+
+
+def test_gauges_read_the_new_pool_after_dispose(engine):
+    engine, label = engine
+    pool.warm_up(engine, 2)
+    engine.dispose()
+    assert _gauge("idle", label) == 0
+    pool.warm_up(engine, 1)
+    assert _gauge("idle", label) == 1
+
+
+def test_warm_up_fills_the_pool(engine):
+    engine, label = engine
+    assert pool.warm_up(engine, 3) == 3
+    assert (_gauge("in_use", label), _gauge("idle", label)) == (0, 3)
+    assert metrics.counter("db.pool.connects").value(label) == 3
+
+
+def test_warm_up_async_opens_connections_concurrently(tmp_path):
+    url = make_url(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}")
+    engine = create_async_engine(url, **pool.engine_kwargs(url, pool_size=4, max_overflow=0, is_async=True))
+    pool.instrument(engine.sync_engine, "pool_async_test")
+
+    async def main():
+        try:
+            return await pool.warm_up_async(engine, 4), engine.sync_engine.pool.checkedin()
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(main()) == (4, 4)
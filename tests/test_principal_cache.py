@@ -0,0 +1,96 @@
+"""
+User-principal cache: bearer tokens verified without a query, dropped when the user changes.
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import events, security
+from app.model.user import User
+from app.services import principal_cache, token_revocation
+from app.utils.security import create_access_token
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    bus = events.LocalBus()
+    bus.subscribe(principal_cache._on_event)
+    monkeypatch.setattr(events, "_bus", bus)
+    principal_cache.invalidate_all()
+    yield bus
+    principal_cache.invalidate_all()
+
+
+@pytest.fixture
+def seed():
+    return [(User, [
+        {"email": f"user{i}@example.com", "password_hash": "x", "name": f"User {i}", "is_active": i != 2}
+        for i in range(3)
+    ])]
+
+
+@pytest.fixture
+def db(bus, db):
+    # Mọi test có db đều chạy trên bus của test
+    return db
+
+
+def test_principal_is_loaded_once(db):
+    session, statements = db
+    principal = principal_cache.get_principal(session, 1)
+    assert principal.email == "user0@example.com" and not hasattr(principal, "password_hash")
+    statements.clear()
+    assert principal_cache.get_principal(session, 1) is principal
+    assert statements == []
+    assert principal_cache.get_principal(session, 99) is None
+
+
+def test_user_change_drops_the_principal_after_commit(db):
+    session, _ = db
+    principal_cache.get_principal(session, 1)
+    session.get(User, 1).name = "Renamed"
+    session.flush()
+    # Chưa commit: worker khác (và cache) vẫn thấy dữ liệu cũ
+    assert principal_cache.get_cached_principal(1) is not None
+    session.commit()
+    assert principal_cache.get_cached_principal(1) is None
+    assert principal_cache.get_principal(session, 1).name == "Renamed"
+
+
+def test_rolled_back_change_keeps_the_principal(db):
+    session, _ = db
+    principal = principal_cache.get_principal(session, 1)
+    session.get(User, 1).name = "Renamed"
+    session.flush()
+    session.rollback()
+    assert principal_cache.get_cached_principal(1) is principal
+
+
+def test_large_changes_are_broadcast_as_all_users(db, bus, monkeypatch):
+    session, _ = db
+    received = []
+    bus.subscribe(received.append)
+    monkeypatch.setattr(principal_cache, "MAX_INVALIDATION_USER_IDS", 1)
+    for user in session.query(User).all():
+        user.department = "Ops"
+    session.commit()
+    assert received == [{"type": "users.all"}]
+
+
+def test_bearer_token_is_verified_from_the_cache(db, monkeypatch):
+    session, _ = db
+    monkeypatch.setattr(token_revocation, "_loaded", True)
+
+    async def no_database(*args):
+        raise AssertionError("database used")
+
+    principal_cache.get_principal(session, 1)
+    monkeypatch.setattr(security, "run_with_async_session", no_database)
+    user = asyncio.run(security.get_current_user(create_access_token({"sub": "1"})))
+    assert user.id == 1
+
+    principal_cache.get_principal(session, 3)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(security.get_current_user(create_access_token({"sub": "3"})))
+    assert error.value.status_code == 403
@@ -0,0 +1,93 @@
+"""
+Token-bucket rate limiter: bursts, refill, idle sweep and the ASGI middleware.
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import rate_limit
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def backend(clock, monkeypatch):
+    backend = rate_limit.LocalBackend(shards=4, clock=clock)
+    monkeypatch.setattr(rate_limit, "_backend", backend)
+    return backend
+
+
+def test_parse_rate():
+    assert rate_limit.parse_rate("20/60") == rate_limit.Rate(per_second=20 / 60, burst=20)
+
+
+def test_burst_then_refill(backend, clock):
+    rate = rate_limit.parse_rate("3/3")
+    assert [backend.hit("k", rate)[0] for _ in range(4)] == [True, True, True, False]
+    assert backend.hit("k", rate) == (False, pytest.approx(1.0))
+    # Bucket khác không bị ảnh hưởng
+    assert backend.hit("other", rate)[0]
+    clock.now += 1
+    assert backend.hit("k", rate)[0] and not backend.hit("k", rate)[0]
+
+
+def test_sweep_drops_only_refilled_buckets(backend, clock):
+    rate = rate_limit.parse_rate("2/10")
+    backend.hit("early", rate)
+    backend.hit("early", rate)
+    clock.now += 5
+    backend.hit("late", rate)
+    backend.hit("late", rate)
+    assert backend.sweep() == 0
+    # "early" đầy lại sau 10 s, "late" vẫn còn thiếu token
+    clock.now += 6
+    assert backend.sweep() == 1
+    assert [key for _, buckets in backend._shards for key in buckets] == ["late"]
+
+
+def test_check_raises_with_retry_after(backend):
+    rate = rate_limit.parse_rate("1/2")
+    rate_limit.check("login-ip", "1.2.3.4", rate)
+    with pytest.raises(rate_limit.RateLimitExceeded) as error:
+        rate_limit.check("login-ip", "1.2.3.4", rate)
+    assert error.value.rule == "login-ip" and error.value.retry_after == pytest.approx(2.0)
+
+
+def test_middleware_limits_only_matching_routes(backend):
+    app = FastAPI()
+
+    @app.post("/auth/login")
+    def login():
+        return {"ok": True}
+
+    @app.get("/auth/login")
+    def login_page():
+        return {"ok": True}
+
+    app.add_middleware(rate_limit.RateLimitMiddleware, rules=[
+        rate_limit.RateLimitRule("login-ip", "POST", "/auth/login", rate_limit.parse_rate("2/60"), rate_limit.client_ip),
+    ])
+    client = TestClient(app)
+    assert [client.post("/auth/login").status_code for _ in range(3)] == [200, 200, 429]
+    response = client.post("/auth/login")
+    assert response.headers["retry-after"] == "30" and response.json() == {"detail": "Too many requests"}
+    assert client.get("/auth/login").status_code == 200
+
+
+def test_client_ip_trusts_only_the_last_forwarded_hop(monkeypatch):
+    scope = {"headers": [(b"x-forwarded-for", b"6.6.6.6, 10.0.0.7")], "client": ("10.0.0.1", 5000)}
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_TRUST_X_FORWARDED_FOR", False)
+    assert rate_limit.client_ip(scope) == "10.0.0.1"
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_TRUST_X_FORWARDED_FOR", True)
+    assert rate_limit.client_ip(scope) == "10.0.0.7"
@@ -0,0 +1,83 @@
+"""
+Role / permission assignment writes only the difference; bulk assignment by chunks.
+"""
+import pytest
+from sqlalchemy import select
+
+from app.core import events
+from app.model.rbac import Permission, Role, role_closure, user_roles
+from app.model.user import User
+from app.services import rbac as rbac_service
+
+
+@pytest.fixture
+def seed():
+    return [
+        (User, [{"email": f"user{i}@example.com", "password_hash": "x"} for i in range(5)]),
+        (Role, [{"name": f"r{i}", "display_name": f"R{i}"} for i in range(1, 5)]),
+        (role_closure, [{"ancestor_id": i, "descendant_id": i, "depth": 0} for i in range(1, 5)]),
+        (Permission, [{"name": f"p{i}", "display_name": f"P{i}", "resource": "doc", "action": f"a{i}"} for i in range(1, 4)]),
+    ]
+
+
+@pytest.fixture
+def db(db, monkeypatch):
+    monkeypatch.setattr(events, "_bus", events.LocalBus())
+    return db
+
+
+def _writes(statements):
+    return [s.split()[0] + " " + s.split()[2] for s in statements if s.lstrip().startswith(("INSERT", "DELETE"))]
+
+
+def _roles(session, user_id):
+    return set(session.scalars(select(user_roles.c.role_id).where(user_roles.c.user_id == user_id)))
+
+
+def test_only_the_difference_is_written(db):
+    session, statements = db
+    rbac_service.assign_roles_to_user(session, 1, [1, 2])
+    statements.clear()
+    rbac_service.assign_roles_to_user(session, 1, [2, 3])
+    # Một DELETE cho role bị bỏ, một INSERT cho role mới; role 2 không bị động tới
+    assert _writes(statements) == ["DELETE user_roles", "INSERT user_roles"]
+    assert _roles(session, 1) == {2, 3}
+
+    statements.clear()
+    rbac_service.assign_roles_to_user(session, 1, [3, 2])
+    assert _writes(statements) == []
+
+
+def test_permission_assignment_replaces_the_set(db):
+    session, statements = db
+    rbac_service.assign_permissions_to_role(session, 1, [1, 2])
+    statements.clear()
+    rbac_service.assign_permissions_to_role(session, 1, [2])
+    assert _writes(statements) == ["DELETE role_permissions"]
+    assert [p.id for p in rbac_service.get_role_permissions(session, 1)] == [2]
+
+
+def test_unknown_user_is_not_assigned(db):
+    session, _ = db
+    assert not rbac_service.assign_roles_to_user(session, 99, [1])
+
+
+@pytest.mark.parametrize("mode, expected", [
+    ("add", {1: {1, 2, 3}, 2: {2, 3}}),
+    ("replace", {1: {2, 3}, 2: {2, 3}}),
+    ("remove", {1: {1}, 2: set()}),
+])
+def test_bulk_modes(db, mode, expected):
+    session, _ = db
+    rbac_service.assign_roles_to_user(session, 1, [1, 2])
+    summary = rbac_service.bulk_assign_roles_to_users(session, [1, 2, 2, 42], [2, 3], mode=mode, chunk_size=1)
+    assert {user_id: _roles(session, user_id) for user_id in (1, 2)} == expected
+    assert summary["users_processed"] == 2 and summary["missing_user_ids"] == [42]
+
+
+def test_bulk_rejects_unknown_roles_and_modes(db):
+    session, _ = db
+    with pytest.raises(ValueError):
+        rbac_service.bulk_assign_roles_to_users(session, [1], [99])
+    with pytest.raises(ValueError):
+        rbac_service.bulk_assign_roles_to_users(session, [1], [1], mode="merge")
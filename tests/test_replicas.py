@@ -0,0 +1,111 @@
+"""
+Read-replica routing, with two SQLite files standing in for primary and replica.
+
+The replica file gets the same schema but different rows, so every response
+shows which database served it.
+"""
+import asyncio
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+
+from app.db import database
+from app.db.database import Base, get_session_local
+from app.db.replicas import ReplicaSet
+from app.main import app
+from app.model.rbac import Role
+from app.schemas.rbac import PermissionCreate, RoleCreate
+from app.services import rbac as rbac_service
+
+# Set in conftest.py
+REPLICA = os.environ["DATABASE_REPLICA_URLS"][len("sqlite:///"):]
+
+
+def _role_names(response):
+    assert response.status_code == 200, response.text
+    return {role["name"] for role in response.json()}
+
+
+@pytest.fixture(scope="module")
+def client():
+    replica_engine = create_engine(f"sqlite:///{REPLICA}")
+    Base.metadata.create_all(bind=replica_engine)
+    with Session(replica_engine) as db:
+        db.add(Role(name="replica-only", display_name="Replica"))
+        db.commit()
+    replica_engine.dispose()
+
+    with TestClient(app) as c:
+        admin = c.post("/auth/register", json={"email": "admin@example.com", "password": "pw", "name": "Admin"})
+        db = get_session_local()()
+        permissions = [
+            rbac_service.create_permission(db, PermissionCreate(
+                name=f"role.{action}", display_name=action, resource="role", action=action
+            ))
+            for action in ("read", "write")
+        ]
+        role = rbac_service.create_role(db, RoleCreate(name="admin", display_name="Admin"))
+        rbac_service.assign_permissions_to_role(db, role.id, [p.id for p in permissions])
+        rbac_service.assign_roles_to_user(db, admin.json()["id"], [role.id])
+        db.close()
+        token = c.post("/auth/login", json={"email": "admin@example.com", "password": "pw"}).json()["access_token"]
+        c.headers["Authorization"] = f"Bearer {token}"
+        yield c
+
+
+def test_reads_go_to_replica(client):
+    client.cookies.clear()
+    assert _role_names(client.get("/rbac/roles")) == {"replica-only"}
+
+
+def test_writes_go_to_primary_and_stick(client):
+    client.cookies.clear()
+    response = client.post("/rbac/roles", json={"name": "written", "display_name": "Written"})
+    assert response.status_code == 200, response.text
+    assert response.cookies.get("db_primary_until")
+
+    # Read-your-writes: this client reads from the primary for a short window
+    assert {"admin", "written"} <= _role_names(client.get("/rbac/roles"))
+
+    client.cookies.clear()
+    assert _role_names(client.get("/rbac/roles")) == {"replica-only"}
+
+
+def test_expired_sticky_cookie_reads_replica(client):
+    client.cookies.clear()
+    client.cookies.set("db_primary_until", "1")
+    assert _role_names(client.get("/rbac/roles")) == {"replica-only"}
+
+
+def test_unhealthy_replica_falls_back_to_primary(client):
+    client.cookies.clear()
+    replica_set = database.get_replica_set()
+    replica_set.healthy[0] = False
+    try:
+        assert "admin" in _role_names(client.get("/rbac/roles"))
+    finally:
+        replica_set.healthy[0] = True
+
+
+def test_health_check_and_round_robin():
+    async def check():
+        # The second replica lives in a directory that does not exist, so connecting fails
+        replica_set = ReplicaSet([
+            create_async_engine(f"sqlite+aiosqlite:///{REPLICA}"),
+            create_async_engine(f"sqlite+aiosqlite:///{os.path.dirname(REPLICA)}/missing/replica.db"),
+            create_async_engine(f"sqlite+aiosqlite:///{REPLICA}"),
+        ])
+        try:
+            assert await replica_set.check_health() == [True, False, True]
+            first, third = replica_set.engines[0], replica_set.engines[2]
+            assert [replica_set.choose() for _ in range(4)] == [first, third, first, third]
+            replica_set.healthy = [False, False, False]
+            assert replica_set.choose() is None
+        finally:
+            await replica_set.dispose()
+
+    asyncio.run(check())
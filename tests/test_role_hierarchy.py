@@ -0,0 +1,158 @@
+"""
+Role hierarchy: closure table maintenance, locking and RBAC revision bumps.
+"""
+import pytest
+from sqlalchemy import insert, select
+
+from app.core import events
+from app.model.rbac import Role, role_closure, role_parents, user_roles
+from app.model.user import User
+from app.schemas.rbac import PermissionCreate, PermissionUpdate, RoleCreate
+from app.services import rbac as rbac_service
+
+
+@pytest.fixture
+def seed():
+    return [(User, [{"email": f"user{i}@example.com", "password_hash": "x"} for i in range(3)])]
+
+
+@pytest.fixture
+def published(monkeypatch):
+    bus = events.LocalBus()
+    messages = []
+    bus.subscribe(messages.append)
+    monkeypatch.setattr(events, "_bus", bus)
+    return messages
+
+
+def _role(session, name, parents=()):
+    return rbac_service.create_role(session, RoleCreate(name=name, display_name=name, parent_ids=list(parents))).id
+
+
+def _closure(session):
+    return {tuple(row) for row in session.execute(
+        select(role_closure.c.ancestor_id, role_closure.c.descendant_id, role_closure.c.depth)
+    )}
+
+
+def test_closure_keeps_shortest_depth(db):
+    session, _ = db
+    root = _role(session, "root")
+    mid = _role(session, "mid", [root])
+    leaf = _role(session, "leaf", [mid, root])
+    assert _closure(session) == {
+        (root, root, 0), (mid, mid, 0), (leaf, leaf, 0),
+        (root, mid, 1), (mid, leaf, 1), (root, leaf, 1),
+    }
+
+
+def test_rebuild_reads_only_the_affected_roles(db):
+    session, statements = db
+    root = _role(session, "root")
+    other = _role(session, "other")
+    _role(session, "unrelated", [other])
+    mid = _role(session, "mid")
+    leaf = _role(session, "leaf", [mid])
+    statements.clear()
+    assert rbac_service.add_role_parent(session, mid, root)
+    # Cạnh của role khác không được đọc: mọi SELECT trên role_parents đều có WHERE
+    edge_reads = [s for s in statements if s.lstrip().startswith("SELECT") and "FROM role_parents" in s]
+    assert edge_reads and all("WHERE" in s for s in edge_reads)
+    assert {(root, leaf, 2), (mid, leaf, 1), (root, mid, 1)} <= _closure(session)
+
+
+def test_cycles_are_rejected(db):
+    session, _ = db
+    a = _role(session, "a")
+    b = _role(session, "b", [a])
+    c = _role(session, "c", [b])
+    with pytest.raises(ValueError, match="cycle"):
+        rbac_service.add_role_parent(session, a, c)
+    with pytest.raises(ValueError, match="cycle"):
+        rbac_service.add_role_parent(session, a, a)
+    assert rbac_service.get_role_parent_ids(session, a) == []
+
+
+def test_hierarchy_change_takes_the_write_lock_first(db):
+    session, statements = db
+    a = _role(session, "a")
+    b = _role(session, "b")
+    statements.clear()
+    rbac_service.add_role_parent(session, b, a)
+    writes = [i for i, s in enumerate(statements) if s.lstrip().startswith(("UPDATE", "INSERT", "DELETE"))]
+    cycle_check = next(i for i, s in enumerate(statements) if "FROM role_closure" in s)
+    # SQLite: UPDATE roles lấy write lock trước khi kiểm tra cycle
+    assert statements[writes[0]].lstrip().startswith("UPDATE roles") and writes[0] < cycle_check
+
+
+def test_revision_bumps_only_when_grants_change(db, published):
+    session, _ = db
+    role = _role(session, "staff")
+    permission = rbac_service.create_permission(
+        session, PermissionCreate(name="doc.read", display_name="Read", resource="doc", action="read")
+    )
+    rbac_service.update_permission(session, permission.id, PermissionUpdate(display_name="Read docs"))
+    # Role chưa có user: gán permission không đổi quyền của ai
+    rbac_service.assign_permissions_to_role(session, role, [permission.id])
+    assert published == [] and rbac_service.get_rbac_revision(session) == 0
+
+    session.execute(insert(user_roles), [{"user_id": 1, "role_id": role}])
+    session.commit()
+    rbac_service.assign_roles_to_user(session, 1, [role])
+    assert published == []
+    child = _role(session, "child", [role])
+    rbac_service.assign_roles_to_user(session, 2, [child])
+    assert published[-1] == {"type": "rbac.users", "user_ids": [2], "revision": 1}
+
+    rbac_service.assign_permissions_to_role(session, role, [])
+    assert published[-1]["type"] == "rbac.users" and sorted(published[-1]["user_ids"]) == [1, 2]
+    rbac_service.update_permission(session, permission.id, PermissionUpdate(action="write"))
+    assert published[-1] == {"type": "rbac.all", "revision": 3}
+
+
+def _permission(session, name):
+    return rbac_service.create_permission(
+        session, PermissionCreate(name=name, display_name=name, resource="doc", action=name)
+    ).id
+
+
+def test_permissions_are_inherited_from_every_ancestor(db):
+    session, _ = db
+    root = _role(session, "root")
+    mid = _role(session, "mid", [root])
+    leaf = _role(session, "leaf", [mid])
+    read, write = _permission(session, "read"), _permission(session, "write")
+    rbac_service.assign_permissions_to_role(session, root, [read])
+    rbac_service.assign_permissions_to_role(session, mid, [write])
+    rbac_service.assign_roles_to_user(session, 1, [leaf])
+
+    assert {p.id for p in rbac_service.get_user_permissions(session, 1)} == {read, write}
+    assert {p.id for p in rbac_service.get_role_inherited_permissions(session, leaf)} == {read, write}
+    assert rbac_service.check_user_permission(session, 1, "doc", "read")
+    rbac_service.remove_role_parent(session, mid, root)
+    assert not rbac_service.check_user_permission(session, 1, "doc", "read")
+    assert rbac_service.check_user_permission(session, 1, "doc", "write")
+
+
+def test_deleting_a_role_cuts_its_descendants_off(db, published):
+    session, _ = db
+    root = _role(session, "root")
+    mid = _role(session, "mid", [root])
+    leaf = _role(session, "leaf", [mid])
+    rbac_service.assign_roles_to_user(session, 1, [leaf])
+    assert rbac_service.delete_role(session, mid)
+    assert _closure(session) == {(root, root, 0), (leaf, leaf, 0)}
+    assert rbac_service.get_role_parent_ids(session, leaf) == []
+    assert published[-1]["user_ids"] == [1]
+
+
+def test_rebuild_role_closure_recomputes_everything(db):
+    session, _ = db
+    root = _role(session, "root")
+    mid = _role(session, "mid", [root])
+    _role(session, "leaf", [mid])
+    before = _closure(session)
+    session.execute(role_closure.delete())
+    session.commit()
+    assert rbac_service.rebuild_role_closure(session) == len(before)
+    assert _closure(session) == before
@@ -0,0 +1,80 @@
+"""
+DBRoute: the injected session gives its connection back before the response is serialized.
+"""
+import pytest
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from pydantic import BaseModel, field_validator
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core import metrics
+from app.db import pool
+from app.db.routing import DBRoute
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'routing.db'}", poolclass=AsyncAdaptedQueuePool)
+    pool.instrument(engine.sync_engine, "routing_test")
+    return engine
+
+
+def _app(engine, route_class):
+    in_use_while_serializing = []
+
+    class Out(BaseModel):
+        value: int
+
+        @field_validator("value")
+        @classmethod
+        def _record_pool(cls, value):
+            in_use_while_serializing.append(engine.sync_engine.pool.checkedout())
+            return value
+
+    async def get_session():
+        async with AsyncSession(engine) as db:
+            yield db
+
+    router = APIRouter(route_class=route_class)
+
+    @router.get("/value/{value}", response_model=Out)
+    async def read_value(value: int, db: AsyncSession = Depends(get_session)):
+        return {"value": (await db.execute(text("SELECT :v"), {"v": value})).scalar()}
+
+    @router.get("/cached")
+    async def cached(db: AsyncSession = Depends(get_session)):
+        return {"value": 1}
+
+    app = FastAPI()
+    app.include_router(router)
+    # The pool belongs to TestClient's event loop: close its connections before the loop stops
+    app.add_event_handler("shutdown", engine.dispose)
+    return app, in_use_while_serializing
+
+
+def test_plain_route_holds_connection_while_serializing(engine):
+    app, in_use = _app(engine, APIRoute)
+    with TestClient(app) as client:
+        assert client.get("/value/7").json() == {"value": 7}
+    assert in_use == [1]
+
+
+def test_db_route_releases_connection_before_serializing(engine):
+    app, in_use = _app(engine, DBRoute)
+    with TestClient(app) as client:
+        assert client.get("/value/7").json() == {"value": 7}
+    assert in_use == [0]
+
+
+def test_hold_time_is_labelled_by_route_and_unused_session_never_checks_out(engine):
+    hold = metrics.histogram("db.pool.hold_seconds")
+    app, _ = _app(engine, DBRoute)
+    with TestClient(app) as client:
+        client.get("/value/1")
+        client.get("/cached")
+    snapshot = hold.snapshot()
+    assert snapshot["GET /value/{value}"]["count"] >= 1
+    assert "GET /cached" not in snapshot
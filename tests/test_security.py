@@ -0,0 +1,97 @@
+"""
+require_permission decision caching and the /metrics guard.
+"""
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app import main
+from app.core import security
+from app.services.authz import AuthzContext
+
+
+@pytest.fixture
+def evaluations(monkeypatch):
+    calls = []
+
+    def evaluate(db, request, authz, resource, action, abac):
+        calls.append((resource, action, abac))
+        return True
+
+    monkeypatch.setattr(security, "_evaluate_permission", evaluate)
+    security._decision_cache.clear()
+    return calls
+
+
+def _context(revision: int) -> AuthzContext:
+    return AuthzContext(user_id=1, role_ids=frozenset(), permission_ids=frozenset(), revision=revision, from_token=False)
+
+
+def test_rbac_decisions_are_cached_per_revision(evaluations):
+    assert security._check_permission_cached(None, None, _context(1), "doc", "read", False)
+    assert security._check_permission_cached(None, None, _context(1), "doc", "read", False)
+    assert len(evaluations) == 1
+    security._check_permission_cached(None, None, _context(2), "doc", "read", False)
+    assert len(evaluations) == 2
+
+
+def test_abac_decisions_are_not_cached(evaluations):
+    for _ in range(2):
+        security._check_permission_cached(None, None, _context(1), "doc", "read", True)
+    assert evaluations == [("doc", "read", True)] * 2
+
+
+@pytest.fixture
+def client(evaluations, monkeypatch):
+    async def request_authz(request, token):
+        return _context(1)
+
+    sessions = []
+
+    async def run_with_async_session(fn, *args):
+        sessions.append(fn)
+        return fn(None, *args)
+
+    monkeypatch.setattr(security, "_get_request_authz", request_authz)
+    monkeypatch.setattr(security, "run_with_async_session", run_with_async_session)
+    app = FastAPI()
+    read = security.require_permission("doc", "read")
+
+    @app.get("/doc", dependencies=[Depends(read), Depends(security.require_permission("doc", "read"))])
+    def doc():
+        return {"ok": True}
+
+    @app.get("/denied", dependencies=[Depends(security.require_permission("doc", "delete"))])
+    def denied():
+        return {"ok": True}
+
+    return TestClient(app), sessions
+
+
+def test_require_permission_checks_once_per_request_then_from_cache(client, evaluations):
+    client, sessions = client
+    headers = {"Authorization": "Bearer token"}
+    assert client.get("/doc", headers=headers).status_code == 200
+    # Hai dependency cùng permission trong một request: một lần kiểm tra, một session
+    assert len(evaluations) == 1 and len(sessions) == 1
+    assert client.get("/doc", headers=headers).status_code == 200
+    assert len(sessions) == 1
+
+
+def test_require_permission_rejects(client, evaluations, monkeypatch):
+    client, _ = client
+    assert client.get("/doc").status_code == 401
+    monkeypatch.setattr(security, "_evaluate_permission", lambda *args: False)
+    response = client.get("/denied", headers={"Authorization": "Bearer token"})
+    assert response.status_code == 403 and response.json()["detail"] == "Missing permission doc.delete"
+
+
+def test_metrics_need_the_token(monkeypatch):
+    client = TestClient(main.app)
+    # TestClient không phải localhost: không có token thì 404
+    assert client.get("/metrics").status_code == 404
+    monkeypatch.setattr(main, "METRICS_TOKEN", "scrape-me")
+    assert client.get("/metrics").status_code == 404
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 404
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-me"})
+    assert response.status_code == 200 and isinstance(response.json(), dict)
@@ -0,0 +1,97 @@
+"""
+Token revocation store: a Bloom filter in front of revoked_tokens, loaded on first use.
+"""
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.model.token import RevokedToken
+from app.services import token_revocation
+from app.utils.bloom import BloomFilter
+
+
+class AlwaysContains:
+    def __contains__(self, key):
+        return True
+
+
+@pytest.fixture
+def engine(engine, monkeypatch):
+    monkeypatch.setattr(token_revocation, "get_session_local", lambda: sessionmaker(bind=engine))
+    monkeypatch.setattr(token_revocation, "_loaded", False)
+    monkeypatch.setattr(token_revocation, "_revoked", {})
+    monkeypatch.setattr(token_revocation, "_bloom", token_revocation._bloom)
+    token_revocation._rebuild_bloom([])
+    return engine
+
+
+def test_store_is_loaded_on_first_check_in_batches(engine, monkeypatch):
+    future, past = datetime.utcnow() + timedelta(hours=1), datetime.utcnow() - timedelta(hours=1)
+    with engine.begin() as conn:
+        conn.execute(insert(RevokedToken), [
+            {"jti": f"jti-{i}", "reason": "logout", "expires_at": future if i != 3 else past} for i in range(7)
+        ])
+    monkeypatch.setattr(token_revocation, "LOAD_BATCH_SIZE", 2)
+    assert token_revocation.is_revoked("jti-5")
+    assert not token_revocation.is_revoked("jti-3")
+    assert len(token_revocation._revoked) == 6
+
+
+def test_async_callers_load_off_the_event_loop(engine, monkeypatch):
+    loop_thread, load_threads = threading.get_ident(), []
+    reload = token_revocation._reload_with_session
+    monkeypatch.setattr(token_revocation, "_reload_with_session",
+                        lambda: (load_threads.append(threading.get_ident()), reload()))
+    asyncio.run(token_revocation.ensure_loaded_async())
+    asyncio.run(token_revocation.ensure_loaded_async())
+    assert token_revocation._loaded
+    assert len(load_threads) == 1 and load_threads[0] != loop_thread
+
+
+def test_reload_keeps_keys_added_meanwhile(engine):
+    with Session(engine) as db:
+        assert token_revocation.load(db) == 0
+        token_revocation._add_local("jti-new", datetime.utcnow() + timedelta(hours=1))
+        token_revocation.load(db)
+    assert token_revocation.is_revoked("jti-new")
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    keys = [f"jti-{i}" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_false_positive_is_answered_from_the_store(engine, monkeypatch):
+    monkeypatch.setattr(token_revocation, "_loaded", True)
+    monkeypatch.setattr(token_revocation, "_bloom", AlwaysContains())
+    before = token_revocation._false_positives.value()
+    assert not token_revocation.is_revoked("jti-clean")
+    assert token_revocation._false_positives.value() == before + 1
+
+
+def test_revoke_is_idempotent_and_covers_the_family(engine, monkeypatch):
+    monkeypatch.setattr(token_revocation, "_loaded", True)
+    expires_at = datetime.utcnow() + timedelta(hours=1)
+    with Session(engine) as db:
+        assert token_revocation.revoke(db, token_revocation.family_key("fam-1"), "logout", expires_at, 1)
+        assert not token_revocation.revoke(db, token_revocation.family_key("fam-1"), "logout", expires_at, 1)
+    assert token_revocation.is_token_revoked({"jti": "jti-1", "fam": "fam-1"})
+    assert not token_revocation.is_token_revoked({"jti": "jti-1", "fam": "fam-2"})
+
+
+def test_compaction_drops_expired_revocations(engine, monkeypatch):
+    monkeypatch.setattr(token_revocation, "_loaded", True)
+    with Session(engine) as db:
+        token_revocation.revoke(db, "old", "logout", datetime.utcnow() - timedelta(seconds=1))
+        token_revocation.revoke(db, "new", "logout", datetime.utcnow() + timedelta(hours=1))
+        assert token_revocation.compact(db) == 1
+    assert set(token_revocation._revoked) == {"new"}
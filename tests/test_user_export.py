@@ -0,0 +1,82 @@
+"""
+User export: batches from one streamed SELECT, roles in one IN query per batch, NDJSON / CSV bodies.
+"""
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.model.rbac import Role, user_roles
+from app.model.user import User
+from app.schemas.user import UserResponse
+from app.services import user_export
+
+
+@pytest.fixture
+def seed():
+    return [
+        (User, [
+            {"email": f"user{i}@example.com", "password_hash": "x", "name": f"User {i}",
+             "is_active": i % 5 != 0, "created_at": datetime(2024, 1, 1), "updated_at": datetime(2024, 1, 1)}
+            for i in range(25)
+        ]),
+        (Role, [{"name": name, "display_name": name} for name in ("admin", "auditor")]),
+        (user_roles, [{"user_id": 1, "role_id": 1}, {"user_id": 1, "role_id": 2}, {"user_id": 12, "role_id": 2}]),
+    ]
+
+
+def _stream(url, fmt, **kwargs) -> bytes:
+    async def collect():
+        engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"))
+        try:
+            chunks = [chunk async for chunk in user_export.stream_users(AsyncSession(engine), fmt, batch_size=10, **kwargs)]
+        finally:
+            await engine.dispose()
+        return b"".join(chunks)
+    return asyncio.run(collect())
+
+
+def test_batches_come_from_one_select_with_one_role_query_each(db):
+    session, statements = db
+    batches = list(user_export.iter_user_batches(session, include_roles=True, batch_size=10))
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    assert [row["id"] for batch in batches for row in batch] == list(range(1, 26))
+    assert batches[0][0]["roles"] == [{"id": 1, "name": "admin"}, {"id": 2, "name": "auditor"}]
+    assert batches[1][1]["roles"] == [{"id": 2, "name": "auditor"}]
+    assert batches[2][0]["roles"] == []
+    assert sum("FROM users" in s for s in statements) == 1
+    assert sum("user_roles" in s for s in statements) == 3
+    assert not any("OFFSET" in s for s in statements)
+
+
+def test_ndjson_export_matches_user_response(url):
+    lines = _stream(url, "ndjson", is_active=False).decode().splitlines()
+    users = [json.loads(line) for line in lines]
+    assert [user["id"] for user in users] == [1, 6, 11, 16, 21]
+    assert users[0] == json.loads(UserResponse(**users[0]).model_dump_json())
+    assert "roles" not in users[0]
+
+    users = [json.loads(line) for line in _stream(url, "ndjson", search="user1", include_roles=True).decode().splitlines()]
+    assert [user["email"] for user in users][:2] == ["user1@example.com", "user10@example.com"]
+    roles = {user["email"]: user["roles"] for user in users}
+    assert len(roles) == 11
+    assert roles["user11@example.com"] == [{"id": 2, "name": "auditor"}]
+    assert roles["user1@example.com"] == []
+
+
+def test_csv_export(url):
+    rows = list(csv.DictReader(io.StringIO(_stream(url, "csv", include_roles=True).decode())))
+    assert len(rows) == 25
+    assert rows[0]["email"] == "user0@example.com"
+    assert rows[0]["roles"] == "admin;auditor"
+    assert rows[0]["is_active"] == "false" and rows[1]["is_active"] == "true"
+    assert rows[0]["dob"] == ""
+    assert rows[0]["created_at"] == "2024-01-01T00:00:00"
+
+
+def test_csv_export_without_matches_is_just_the_header(url):
+    assert _stream(url, "csv", search="nobody").decode().splitlines() == [",".join(UserResponse.model_fields)]
@@ -0,0 +1,82 @@
+"""
+Bulk user import: streaming CSV / NDJSON, per-batch dedupe, one INSERT per batch.
+"""
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import select
+
+from app.model.user import User
+from app.services import user_import
+from app.utils.security import verify_password
+
+
+@pytest.fixture
+def seed():
+    return [(User, [{"email": "taken@example.com", "password_hash": "x", "name": "Taken"}])]
+
+
+@pytest.fixture
+def db(session, statements):
+    with ThreadPoolExecutor(2) as pool:
+        yield session, statements, pool
+
+
+def _ndjson(*lines):
+    return io.BytesIO("\n".join(line if isinstance(line, str) else json.dumps(line) for line in lines).encode())
+
+
+def test_ndjson_import_reports_every_row(db):
+    session, statements, pool = db
+    stream = _ndjson(
+        {"email": "a@example.com", "password": "pw-a", "name": "A"},
+        {"email": "a@example.com", "password": "pw-a2", "name": "A again"},
+        {"email": "taken@example.com", "password": "pw", "name": "Taken"},
+        {"email": "not-an-email", "password": "pw", "name": "Bad"},
+        "{broken",
+        "",
+        {"email": "b@example.com", "password": "pw-b", "name": "B"},
+    )
+    report = user_import.import_users(session, user_import.iter_rows(stream, "ndjson"), batch_size=10, pool=pool)
+    assert report.as_dict() | {"errors": None} == {
+        "processed": 6, "created": 2, "existing": 1, "duplicates": 1, "error_count": 2,
+        "errors": None, "errors_truncated": False,
+    }
+    assert [e["row"] for e in report.errors] == [4, 5]
+    assert sum(s.startswith("INSERT INTO users") for s in statements) == 1
+    user = session.scalars(select(User).where(User.email == "a@example.com")).one()
+    assert user.name == "A" and verify_password("pw-a", user.password_hash)
+
+
+def test_csv_import_runs_batch_by_batch(db):
+    session, statements, pool = db
+    lines = ["email,password,name,department"] + [f"user{i}@example.com,pw{i},User {i},{'Ops' if i % 2 else ''}" for i in range(5)]
+    progress = []
+    report = user_import.import_users(
+        session, user_import.iter_rows(io.BytesIO("\n".join(lines).encode()), "csv"), batch_size=2, pool=pool,
+        on_progress=lambda r: progress.append(r.processed),
+    )
+    assert report.created == 5 and progress == [2, 4, 5]
+    assert sum(s.startswith("INSERT INTO users") for s in statements) == 3
+    assert session.scalars(select(User.department).where(User.email == "user0@example.com")).one() is None
+
+
+def test_later_batches_see_earlier_ones_as_existing(db):
+    session, _, pool = db
+    stream = _ndjson(*[{"email": "same@example.com", "password": "pw", "name": "Same"}] * 3)
+    report = user_import.import_users(session, user_import.iter_rows(stream, "ndjson"), batch_size=1, pool=pool)
+    assert (report.created, report.existing, report.duplicates) == (1, 2, 0)
+
+
+def test_error_list_is_capped():
+    report = user_import.ImportReport(max_errors=2)
+    for row in range(5):
+        report.add_error(row, "bad")
+    assert report.as_dict()["error_count"] == 5 and len(report.errors) == 2 and report.as_dict()["errors_truncated"]
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        user_import.iter_rows(io.BytesIO(b""), "xml")
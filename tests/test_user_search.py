@@ -0,0 +1,94 @@
+"""
+Indexed user search (migration 0004): same matches as the ILIKE '%term%' scan.
+"""
+import pytest
+
+from app.db import migrations
+from app.model.user import User
+from app.services import user as user_service, user_search
+
+USERS = [
+    {"email": "nguyen.van.an@example.com", "name": "Nguyen Van An", "phone_number": "0912345678"},
+    {"email": "tran.thi.binh@corp.vn", "name": "Tran Thi Binh", "phone_number": "0987654321"},
+    {"email": "garcia@example.org", "name": "Maria Garcia", "phone_number": None},
+    {"email": "an.le@example.com", "name": "Le An", "phone_number": "0934567812"},
+]
+
+
+@pytest.fixture
+def create_schema():
+    return migrations.upgrade
+
+
+@pytest.fixture
+def seed():
+    return [(User, [{**user, "password_hash": "x"} for user in USERS])]
+
+
+@pytest.fixture
+def db(session):
+    assert user_search.get_backend(session) == "fts5"
+    return session
+
+
+def _emails(users):
+    return {user.email for user in users}
+
+
+def _scan(db, term):
+    # Đường ILIKE, như khi không có index
+    return _emails(
+        u for u in db.query(User) if any(term.lower() in (v or "").lower() for v in (u.name, u.email, u.phone_number))
+    )
+
+
+@pytest.mark.parametrize("term", ["guye", "345", "4567", "example.com", "ARCI", "thi bi", "an"])
+def test_indexed_search_matches_the_scan(db, term):
+    assert _emails(user_service.get_logged_in_users(db, search=term)) == _scan(db, term)
+
+
+def test_mid_word_and_phone_substrings_use_the_index(db):
+    assert _emails(user_search.search_users(db, "uyen")) == {"nguyen.van.an@example.com"}
+    assert _emails(user_search.search_users(db, "6543")) == {"tran.thi.binh@corp.vn"}
+
+
+def test_short_terms_fall_back_to_the_scan(db):
+    assert user_search.search_users(db, "an") is None
+    assert _emails(user_service.get_logged_in_users(db, search="an")) == _scan(db, "an")
+
+
+def test_index_follows_user_updates(db):
+    user = db.query(User).filter_by(email="garcia@example.org").one()
+    user.phone_number = "0900111222"
+    db.commit()
+    assert _emails(user_search.search_users(db, "0111")) == {"garcia@example.org"}
+    db.delete(user)
+    db.commit()
+    assert user_search.search_users(db, "garcia") == []
+
+
+def test_quotes_in_the_term_are_literal(db):
+    assert user_search.search_users(db, 'an"') == []
+
+
+def test_filters_and_paging_apply_to_indexed_results(db):
+    db.query(User).filter_by(email="an.le@example.com").one().is_active = False
+    db.commit()
+    everyone = user_search.search_users(db, "example")
+    assert len(everyone) == 3
+    assert _emails(user_search.search_users(db, "example", is_active=False)) == {"an.le@example.com"}
+    pages = [user_search.search_users(db, "example", offset=offset, limit=2) for offset in (0, 2)]
+    assert [u.email for page in pages for u in page] == [u.email for u in everyone]
+
+
+def test_rows_matching_in_more_columns_rank_first(db):
+    # id nhỏ hơn: xếp trước nếu thứ tự chỉ theo id
+    db.add(User(id=0, email="garcia.fan@example.net", password_hash="x", name="Fan"))
+    db.commit()
+    # "garcia" có cả trong name lẫn email của Maria Garcia
+    assert [u.email for u in user_search.search_users(db, "garcia")][0] == "garcia@example.org"
+
+
+def test_column_projection_returns_dicts(db):
+    rows = user_search.search_users(db, "binh", columns=[User.id, User.email])
+    assert rows == [{"id": 2, "email": "tran.thi.binh@corp.vn"}]
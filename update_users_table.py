@@ -77,6 +77,11 @@ def update_users_table():
             print("Adding updated_at column...")
             db.execute(text("ALTER TABLE users ADD COLUMN updated_at TIMESTAMP DEFAULT NOW()"))
         
+        # Add last_login_at column if not exists
+        if 'last_login_at' not in existing_columns:
+            print("Adding last_login_at column...")
+            db.execute(text("ALTER TABLE users ADD COLUMN last_login_at TIMESTAMP"))
+        
         # Update existing records with default values
         print("\n📝 Updating existing records...")
         db.execute(text("""